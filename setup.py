@@ -22,8 +22,9 @@ setup(
         'testproject.*',
     ]),
     include_package_data=True,
+    python_requires='>=3.7',
     install_requires=[
-        'Django>=2.1,<3.0',
+        'Django>=2.2,<3.3',
         'django-diffable>=1.0.0'
     ],
     extras_require={
@@ -44,7 +45,7 @@ setup(
         'Framework :: Django',
         'Intended Audience :: Developers',
         'Operating System :: OS Independent',
-        'Programming Language :: Python :: 3.6',
+        'Programming Language :: Python :: 3.7',
         'Programming Language :: Python :: 3.8',
         'Programming Language :: Python :: 3.10',
     ],
@@ -0,0 +1,65 @@
+"""Micro-benchmarks of the history capturing and reading paths.
+
+Run them from the testproject directory, e.g.::
+
+    $ python -m benchmarks.value_mappers
+"""
+import os
+import timeit
+from typing import Callable
+
+
+def setup_django():
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'testapp.settings')
+    import django
+    django.setup()
+
+
+def report(name: str, statement: Callable, number: int = 10000, repeat: int = 5):
+    """Print the best time of a single call of the statement."""
+    best = min(timeit.repeat(statement, number=number, repeat=repeat)) / number
+    print('{:<60} {:>12.3f} us'.format(name, best * 10 ** 6))
+
+
+def setup_test_database():
+    """Create a test database and return a function destroying it."""
+    from django.db import connection
+    from django.test.utils import (
+        setup_test_environment,
+        teardown_test_environment,
+    )
+
+    setup_test_environment()
+    old_name = connection.settings_dict['NAME']
+    connection.creation.create_test_db(verbosity=0)
+
+    def teardown():
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
+
+    return teardown
+
+
+def create_history_model(name: str, model_class, **kwargs):
+    """Generate a history class for the model and create its table."""
+    from django.db import connection
+    from wicked_historian.utils import generate_history_class
+
+    class Meta:
+        app_label = model_class._meta.app_label
+
+    history_class = type(name, (generate_history_class(model_class, __name__, abstract=True, **kwargs), ), {
+        '__module__': __name__,
+        'Meta': Meta,
+    })
+    with connection.schema_editor() as schema_editor:
+        schema_editor.create_model(history_class)
+    return history_class
+
+
+def get_table_size(model) -> int:
+    """Get total length of stored values in the history table."""
+    from django.db.models import Sum
+    from django.db.models.functions import Length
+
+    return model.objects.aggregate(size=Sum(Length('old_value')) + Sum(Length('new_value')))['size'] or 0
@@ -0,0 +1,62 @@
+"""Compare writing and reading history of a large text field stored in full and stored as patches."""
+import time
+
+from benchmarks import (
+    create_history_model,
+    get_table_size,
+    setup_django,
+    setup_test_database,
+)
+
+
+NUMBER_OF_EDITS = 30
+TEXT_SIZE = 2 * 1024 * 1024
+
+
+def main():
+    setup_django()
+    teardown = setup_test_database()
+    try:
+        run()
+    finally:
+        teardown()
+
+
+def run():
+    from wicked_historian.delta import reconstructed_values_cache
+    from wicked_historian.usersmuggler import usersmuggler
+    from testapp.models import Document
+
+    history_classes = [
+        create_history_model('FullCopyDocumentEditHistory', Document),
+        create_history_model('DeltaDocumentEditHistory', Document, delta_encoded_fields={'content': 10}),
+    ]
+    texts = ['x' * TEXT_SIZE]
+    for edit in range(NUMBER_OF_EDITS):
+        position = (edit * 7919) % TEXT_SIZE
+        texts.append(texts[-1][:position] + 'y' + texts[-1][position + 1:])
+
+    with usersmuggler.set_user(None):
+        for history_class in history_classes:
+            document = Document.objects.create(title='Benchmark', content=texts[0])
+            start = time.perf_counter()
+            for old_value, new_value in zip(texts, texts[1:]):
+                history_class.create_history(document, [('content', (old_value, new_value))])
+            write_time = time.perf_counter() - start
+
+            reconstructed_values_cache.clear()
+            start = time.perf_counter()
+            history = history_class.get_for(document)
+            read_time = time.perf_counter() - start
+            assert [entry['new_value'] for entry in history] == texts[:0:-1]
+
+            print('{:<30} write {:>8.1f} ms/edit  read {:>8.1f} ms/entry  stored {:>10.1f} kB/edit'.format(
+                history_class.__name__,
+                write_time * 1000 / NUMBER_OF_EDITS,
+                read_time * 1000 / NUMBER_OF_EDITS,
+                get_table_size(history_class) / 1024 / NUMBER_OF_EDITS,
+            ))
+
+
+if __name__ == '__main__':
+    main()
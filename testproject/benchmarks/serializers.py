@@ -0,0 +1,32 @@
+"""Compare serializing history values with `json.dumps(..., cls=JSONEncoder)` and with `wicked_historian.encoder.dumps`."""
+import json
+
+from benchmarks import (
+    report,
+    setup_django,
+)
+
+
+def main():
+    setup_django()
+    from wicked_historian.encoder import (
+        JSON_NULL,
+        JSONEncoder,
+        dumps,
+    )
+
+    values = [
+        ('null', JSON_NULL),
+        ('integer', 1223372036854775808),
+        ('short text', 'Macbeth'),
+        ('2 MB text', 'To be, or not to be ' * 100000),
+        ('100 related objects', [{'pk': pk, 'str': 'Author #{}'.format(pk)} for pk in range(100)]),
+    ]
+    for name, value in values:
+        number = 10 if len(str(value)) > 10000 else 10000
+        report('json.dumps(cls=JSONEncoder) {}'.format(name), lambda: json.dumps(value, cls=JSONEncoder, allow_nan=False), number)
+        report('dumps                       {}'.format(name), lambda: dumps(value), number)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,50 @@
+"""Compare memory and time of loading instances with and without history tracking."""
+import time
+import tracemalloc
+
+from benchmarks import (
+    setup_django,
+    setup_test_database,
+)
+
+
+NUMBER_OF_INSTANCES = 20000
+
+
+def main():
+    setup_django()
+    teardown = setup_test_database()
+    try:
+        run()
+    finally:
+        teardown()
+
+
+def run():
+    from testapp.models import Document
+
+    Document.objects.bulk_create(
+        Document(title='Document #%d' % number, content='Content of document #%d' % number) for number in range(NUMBER_OF_INSTANCES)
+    )
+    for name, queryset in [
+        ('tracked', Document.objects.all()),
+        ('without_history_tracking', Document.objects.without_history_tracking()),
+    ]:
+        tracemalloc.start()
+        start = time.perf_counter()
+        documents = list(queryset)
+        load_time = time.perf_counter() - start
+        size, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        assert len(documents) == NUMBER_OF_INSTANCES
+        del documents
+
+        print('{:<30} load {:>8.2f} us/instance  memory {:>8.0f} B/instance'.format(
+            name,
+            load_time * 10 ** 6 / NUMBER_OF_INSTANCES,
+            size / NUMBER_OF_INSTANCES,
+        ))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,37 @@
+"""Compare per-value overhead of calling DefaultFieldValueMapper with using mappers compiled per field."""
+from datetime import (
+    date,
+    time,
+    timedelta,
+)
+from decimal import Decimal
+
+from benchmarks import (
+    report,
+    setup_django,
+)
+
+
+def main():
+    setup_django()
+    from django.db import models
+    from wicked_historian.utils import DefaultFieldValueMapper
+
+    mapper = DefaultFieldValueMapper()
+    values = [
+        (models.CharField(), 'foo'),
+        (models.IntegerField(), None),
+        (models.DateField(), date(2005, 4, 2)),
+        (models.DurationField(), timedelta(hours=3)),
+        (models.DecimalField(), Decimal('666.66')),
+        (models.TimeField(), time(hour=1)),
+    ]
+    for field, value in values:
+        compiled_mapper = mapper.compile(field)
+        name = '{}({!r})'.format(field.__class__.__name__, value)
+        report('mapper(field, value) {}'.format(name), lambda: mapper(field, value))
+        report('compiled(value)      {}'.format(name), lambda: compiled_mapper(value))
+
+
+if __name__ == '__main__':
+    main()
@@ -6,6 +6,14 @@ class TestAppConfig(AppConfig):
     name = 'testapp'
 
     def ready(self):
-        from testapp.models import BookEditHistory
+        from testapp.models import (
+            BookEditHistory,
+            DocumentEditHistory,
+            NoteEditHistory,
+            ReviewEditHistory,
+        )
         super().ready()
         BookEditHistory.register_m2m_signals()
+        DocumentEditHistory.register_m2m_signals()
+        NoteEditHistory.register_m2m_signals()
+        ReviewEditHistory.register_m2m_signals()
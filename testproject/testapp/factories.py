@@ -18,7 +18,9 @@ from testapp.models import (
     BookShelf,
     BookShelfSlot,
     Chapter,
+    Document,
     Language,
+    Note,
     Pirate,
     Printer,
 )
@@ -113,3 +115,17 @@ class ChapterFactory(DjangoModelFactory):
 
     class Meta:
         model = Chapter
+
+
+class DocumentFactory(DjangoModelFactory):
+    title = Sequence(lambda n: 'Document #%d' % n)
+
+    class Meta:
+        model = Document
+
+
+class NoteFactory(DjangoModelFactory):
+    text = Sequence(lambda n: 'Note #%d' % n)
+
+    class Meta:
+        model = Note
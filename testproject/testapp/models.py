@@ -2,6 +2,8 @@ from django.conf import settings
 from django.db import models
 
 from wicked_historian.models import DiffableHistoryModel
+from wicked_historian.predicates import changed_ignoring_whitespace
+from wicked_historian.representation import RelatedObjectRepresentation
 from wicked_historian.utils import (
     ObsoleteFieldDescription,
     generate_history_class,
@@ -60,6 +62,41 @@ class Book(DiffableHistoryModel):
         return self.title
 
 
+class Document(DiffableHistoryModel):
+    title = models.CharField(max_length=100)
+    content = models.TextField(blank=True)
+    attachment = models.BinaryField(blank=True, null=True)
+
+    class Meta:
+        history_class = 'testapp.models.DocumentEditHistory'
+
+    def __str__(self):
+        return self.title
+
+
+class Note(DiffableHistoryModel):
+    text = models.TextField()
+    tags = models.ManyToManyField('Language', blank=True)
+
+    class Meta:
+        history_class = 'testapp.models.NoteEditHistory'
+
+    def __str__(self):
+        return self.text
+
+
+class Review(DiffableHistoryModel):
+    author = models.ForeignKey(Author, on_delete=models.CASCADE)
+    rating = models.DecimalField(max_digits=3, decimal_places=1)
+    published_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        history_class = 'testapp.models.ReviewEditHistory'
+
+    def __str__(self):
+        return '{} ({})'.format(self.author, self.rating)
+
+
 class BookShelf(models.Model):
     name = models.CharField(max_length=200)
 
@@ -72,6 +109,11 @@ class BookShelfSlot(models.Model):
     shelf_number = models.IntegerField()
     slot_number = models.IntegerField()
 
+    class Meta:
+        history_representation = RelatedObjectRepresentation(
+            'shelf_number', 'slot_number', 'book_shelf__name', template='Slot {shelf_number}:{slot_number} of {book_shelf__name}',
+        )
+
     def __str__(self):
         return 'Slot {0.shelf_number}:{0.slot_number} of {0.book_shelf}'.format(self)
 
@@ -142,4 +184,34 @@ BookEditHistory = generate_history_class(  # pylint: disable=invalid-name
     __name__,
     excluded_fields=['description'],
     obsolete_field_choices=OBSOLETE_BOOK_FIELD_CHOICES,
+    debounced_fields={'number_of_downloads_on_torrents': 60},
+)
+
+
+DocumentEditHistory = generate_history_class(  # pylint: disable=invalid-name
+    Document,
+    __name__,
+    delta_encoded_fields={'content': 3},
+    compression_threshold=1000,
+    content_addressed_fields=['attachment'],
+    derive_old_values=True,
+    history_on_delete='delete',
+    change_feed=True,
+    change_predicates={'title': changed_ignoring_whitespace},
+)
+
+
+NoteEditHistory = generate_history_class(  # pylint: disable=invalid-name
+    Note,
+    __name__,
+    database='history',
+    write_on_commit=True,
+)
+
+
+ReviewEditHistory = generate_history_class(  # pylint: disable=invalid-name
+    Review,
+    __name__,
+    deferred=True,
+    numeric_delta_fields=['rating'],
 )
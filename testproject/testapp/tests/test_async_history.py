@@ -0,0 +1,59 @@
+import asyncio
+
+from django.contrib.auth.models import User
+from django.test import TransactionTestCase
+
+from wicked_historian.usersmuggler import usersmuggler
+
+from testapp.factories import (
+    BookFactory,
+    DocumentFactory,
+)
+from testapp.models import (
+    Book,
+    BookEditHistory,
+    Document,
+    DocumentEditHistory,
+)
+
+
+class AsyncHistoryTestCase(TransactionTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create(username='john.smith')
+        with usersmuggler.set_user(self.user):
+            self.book = BookFactory(title='Macbeth')  # type: Book
+            self.book = Book.objects.get(pk=self.book.pk)
+            for title in ['Hamlet', 'Othello', 'King Lear', 'Romeo and Juliet']:
+                self.book.title = title
+                self.book.save()
+
+    def test_getting_page_of_history(self):
+        history = asyncio.run(BookEditHistory.aget_for(self.book, offset=1, limit=2))
+
+        self.assertListEqual(history, BookEditHistory.get_for(self.book)[1:3])
+
+    def test_iterating_over_history(self):
+        async def get_history():
+            return [entry async for entry in BookEditHistory.aiter_for(self.book, chunk_size=2)]
+
+        self.assertListEqual(asyncio.run(get_history()), BookEditHistory.get_for(self.book))
+
+    def test_iterating_over_derived_old_values(self):
+        with usersmuggler.set_user(self.user):
+            document = DocumentFactory(title='first')  # type: Document
+            document = Document.objects.get(pk=document.pk)
+            for title in ['second', 'third', 'fourth']:
+                document.title = title
+                document.save()
+
+        async def get_history():
+            return [entry async for entry in DocumentEditHistory.aiter_for(document, chunk_size=2)]
+
+        history = asyncio.run(get_history())
+        self.assertListEqual([(entry['old_value'], entry['new_value']) for entry in history], [
+            ('third', 'fourth'),
+            ('second', 'third'),
+            ('first', 'second'),
+        ])
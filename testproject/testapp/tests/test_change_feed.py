@@ -0,0 +1,106 @@
+import json
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import call_command
+from django.test import (
+    SimpleTestCase,
+    override_settings,
+)
+
+from wicked_historian.change_feed import (
+    ChangeFeed,
+    sequence_entries,
+)
+from wicked_historian.models import ChangeFeedEntry
+from wicked_historian.usersmuggler import usersmuggler
+from wicked_historian.utils import generate_history_class
+
+from testapp.factories import DocumentFactory
+from testapp.models import (
+    Document,
+    DocumentEditHistory,
+)
+from testapp.tests.base import FreezeTimeTestCase
+
+
+class ChangeFeedTestCase(FreezeTimeTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create(username='john.smith')
+        with usersmuggler.set_user(self.user):
+            self.document = DocumentFactory(title='King Lear')  # type: Document
+            self.document = Document.objects.get(pk=self.document.pk)
+        ChangeFeedEntry.objects.all().delete()
+
+    def edit_document(self, *titles):
+        with usersmuggler.set_user(self.user):
+            for title in titles:
+                self.document.title = title
+                self.document.save()
+
+    def test_reading_entries_after_cursor(self):
+        self.edit_document('Hamlet', 'Macbeth')
+        change_feed = ChangeFeed('search')
+
+        items = change_feed.read()
+        self.assertListEqual([(item.position, item.history_model) for item in items], [
+            (1, 'testapp.DocumentEditHistory'),
+            (2, 'testapp.DocumentEditHistory'),
+        ])
+        self.assertListEqual(
+            [item.entry for item in items],
+            list(DocumentEditHistory.objects.filter(model=self.document).order_by('id')),
+        )
+        self.assertEqual(len(change_feed.read()), 2)  # not committed
+
+        change_feed.commit(items[-1].position)
+        self.assertEqual(ChangeFeed('search').position, 2)
+        self.assertListEqual(change_feed.read(), [])
+        self.assertEqual(len(ChangeFeed('analytics').read()), 2)
+
+        self.edit_document('Othello')
+        self.assertListEqual([(item.position, item.entry.new_value) for item in change_feed.read()], [(3, 'Othello')])
+
+    def test_sequencing_entries_committed_later(self):
+        self.edit_document('Hamlet', 'Macbeth')
+        self.assertEqual(sequence_entries(), 2)
+        first_feed_entry = ChangeFeedEntry.objects.order_by('id').first()
+        ChangeFeedEntry.objects.filter(pk=first_feed_entry.pk).update(position=None)
+        ChangeFeedEntry.objects.filter(position=2).update(position=1)
+
+        # an entry with lower id committed after entries with higher ids are sequenced gets the next position
+        self.assertEqual(sequence_entries(), 1)
+        self.assertEqual(ChangeFeedEntry.objects.get(pk=first_feed_entry.pk).position, 2)
+
+    def test_reading_deleted_entries(self):
+        self.edit_document('Hamlet', 'Macbeth')
+        DocumentEditHistory.objects.filter(new_value='Hamlet').delete()
+
+        self.assertListEqual([(item.position, item.entry) for item in ChangeFeed('search').read(batch_size=1)], [(1, None)])
+
+    def test_tailing_change_feed(self):
+        self.edit_document('Hamlet', 'Macbeth', 'Othello')
+        output = StringIO()
+        call_command('tail_change_feed', 'search', batch_size=2, stdout=output)
+
+        lines = [json.loads(line) for line in output.getvalue().splitlines()]
+        self.assertListEqual([(line['position'], line['field'], line['old_value'], line['new_value']) for line in lines], [
+            (1, 'title', 'King Lear', 'Hamlet'),
+            (2, 'title', 'Hamlet', 'Macbeth'),
+            (3, 'title', 'Macbeth', 'Othello'),
+        ])
+        self.assertEqual(lines[0]['user_id'], self.user.pk)
+        self.assertEqual(lines[0]['change_date'], '2005-04-02T19:37:00+00:00')
+        self.assertEqual(ChangeFeed('search').position, 3)
+
+
+class ChangeFeedConfigurationTestCase(SimpleTestCase):
+
+    def test_history_has_to_be_stored_on_database_of_change_feed(self):
+        with self.assertRaises(ImproperlyConfigured):
+            generate_history_class(Document, __name__, abstract=True, change_feed=True, database='history')
+        with override_settings(WICKED_HISTORIAN_DATABASE='history'):
+            generate_history_class(Document, __name__, abstract=True, change_feed=True, database='history')
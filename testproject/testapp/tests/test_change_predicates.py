@@ -0,0 +1,64 @@
+from datetime import (
+    datetime,
+    timedelta,
+)
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.test import SimpleTestCase
+
+from wicked_historian.predicates import (
+    changed_by_more_than,
+    changed_ignoring_whitespace,
+)
+from wicked_historian.usersmuggler import usersmuggler
+
+from testapp.factories import DocumentFactory
+from testapp.models import (
+    Document,
+    DocumentEditHistory,
+)
+from testapp.tests.base import FreezeTimeTestCase
+
+
+class ChangePredicatesTestCase(FreezeTimeTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create(username='john.smith')
+        with usersmuggler.set_user(self.user):
+            self.document = DocumentFactory(title='Annual report')  # type: Document
+            self.document = Document.objects.get(pk=self.document.pk)
+
+    def test_skipping_insignificant_changes(self):
+        with usersmuggler.set_user(self.user):
+            self.document.title = ' Annual  report\n'
+            self.document.content = 'Revenue'
+            self.document.save()
+            self.document.title = 'Annual report 2005'
+            self.document.save()
+
+        self.assertListEqual(
+            [(entry['field_verbose_name'], entry['old_value'], entry['new_value']) for entry in DocumentEditHistory.get_for(self.document)],
+            [('title', ' Annual  report\n', 'Annual report 2005'), ('content', '', 'Revenue')],
+        )
+
+
+class PredicatesTestCase(SimpleTestCase):
+
+    def test_changed_ignoring_whitespace(self):
+        self.assertFalse(changed_ignoring_whitespace('foo bar', ' foo\tbar\n'))
+        self.assertTrue(changed_ignoring_whitespace('foo bar', 'foobar'))
+        self.assertTrue(changed_ignoring_whitespace(None, ''))
+
+    def test_changed_by_more_than(self):
+        for threshold, old_value, new_value, expected in [
+            (Decimal('0.01'), Decimal('1.00'), Decimal('1.01'), False),
+            (Decimal('0.01'), Decimal('1.00'), Decimal('0.98'), True),
+            (0.5, 1.0, 1.3, False),
+            (timedelta(seconds=1), datetime(2005, 4, 2), datetime(2005, 4, 2, 0, 0, 0, 999), False),
+            (timedelta(seconds=1), datetime(2005, 4, 2), datetime(2005, 4, 2, 0, 0, 2), True),
+            (1, None, 1, True),
+        ]:
+            with self.subTest(old_value=old_value, new_value=new_value):
+                self.assertIs(changed_by_more_than(threshold)(old_value, new_value), expected)
@@ -0,0 +1,116 @@
+import base64
+import random
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.management import (
+    CommandError,
+    call_command,
+)
+from django.test import SimpleTestCase
+
+from wicked_historian.compression import (
+    COMPRESSED_TAG,
+    compress_value,
+    decompress_value,
+)
+from wicked_historian.delta import (
+    DELTA_TAG,
+    reconstructed_values_cache,
+)
+from wicked_historian.encoder import JSON_NULL
+from wicked_historian.usersmuggler import usersmuggler
+
+from testapp.factories import DocumentFactory
+from testapp.models import (
+    Document,
+    DocumentEditHistory,
+)
+from testapp.tests.base import FreezeTimeTestCase
+
+
+class CompressingValuesTestCase(SimpleTestCase):
+
+    def test_compressing_values_longer_than_threshold(self):
+        for value in ['a' * 101, ['a' * 101], {'pk': 1, 'str': 'a' * 101}]:
+            with self.subTest(value=value):
+                compressed_value = compress_value(value, 100)
+                self.assertEqual(list(compressed_value), [COMPRESSED_TAG])
+                self.assertEqual(decompress_value(compressed_value), value)
+
+    def test_not_compressing_short_values(self):
+        for value in ['a' * 98, JSON_NULL, 1, [{'pk': 1, 'str': 'a'}]]:
+            with self.subTest(value=value):
+                self.assertIs(compress_value(value, 100), value)
+
+    def test_not_compressing_values_which_do_not_get_shorter(self):
+        generator = random.Random(0)
+        value = base64.b64encode(bytes(generator.getrandbits(8) for _ in range(300))).decode()
+        self.assertIs(compress_value(value, 100), value)
+
+    def test_decompressing_not_compressed_values(self):
+        self.assertEqual(decompress_value({'pk': 1, 'str': 'a'}), {'pk': 1, 'str': 'a'})
+
+
+class CompressingHistoryValuesTestCase(FreezeTimeTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create(username='john.smith')
+        with usersmuggler.set_user(self.user):
+            self.document = DocumentFactory(content='initial version')  # type: Document
+        self.document = Document.objects.get(pk=self.document.pk)
+
+    def test_storing_compressed_values(self):
+        with usersmuggler.set_user(self.user):
+            self.document.title = 'Short title'
+            self.document.content = 'long version ' * 100
+            self.document.save()
+
+        title_entry, content_entry = DocumentEditHistory.objects.order_by('field')
+        self.assertEqual(title_entry.new_value, 'Short title')
+        self.assertTrue(title_entry.field_name == 'title' and content_entry.field_name == 'content')
+        self.assertEqual(content_entry.old_value, 'initial version')
+        self.assertEqual(list(content_entry.new_value), [COMPRESSED_TAG])
+
+        reconstructed_values_cache.clear()
+        self.assertEqual(DocumentEditHistory.get_history_entry(content_entry)['new_value'], 'long version ' * 100)
+
+    def test_reconstructing_delta_encoded_values_from_compressed_entries(self):
+        with usersmuggler.set_user(self.user):
+            for version in range(3):
+                self.document.content = 'long version ' * 100 + str(version)
+                self.document.save()
+
+        entries = list(DocumentEditHistory.objects.order_by('id'))
+        self.assertEqual(list(entries[0].new_value), [COMPRESSED_TAG])
+        self.assertEqual(entries[1].old_value[DELTA_TAG]['previous'], entries[0].pk)
+        self.assertIn('patch', entries[1].new_value[DELTA_TAG])
+
+        reconstructed_values_cache.clear()
+        self.assertListEqual(
+            [entry['new_value'] for entry in DocumentEditHistory.get_for(self.document)],
+            ['long version ' * 100 + str(version) for version in [2, 1, 0]],
+        )
+
+    def test_compressing_existing_values(self):
+        with mock.patch.object(DocumentEditHistory, 'COMPRESSION_THRESHOLD', None), usersmuggler.set_user(self.user):
+            self.document.title = 'Short title'
+            self.document.save()
+            self.document.content = 'long version ' * 100
+            self.document.save()
+        self.assertEqual(DocumentEditHistory.objects.order_by('id').last().new_value[DELTA_TAG]['value'], 'long version ' * 100)
+
+        output = StringIO()
+        call_command('compress_history_values', batch_size=1, stdout=output)
+
+        self.assertIn('Compressed values of 1 DocumentEditHistory entries.', output.getvalue())
+        title_entry, content_entry = DocumentEditHistory.objects.order_by('id')
+        self.assertEqual(title_entry.new_value, 'Short title')
+        self.assertEqual(list(content_entry.new_value), [COMPRESSED_TAG])
+        self.assertEqual(DocumentEditHistory.get_history_entry(content_entry)['new_value'], 'long version ' * 100)
+
+    def test_compressing_existing_values_of_history_model_without_threshold(self):
+        with self.assertRaisesMessage(CommandError, 'Compression threshold of BookEditHistory is not set'):
+            call_command('compress_history_values', 'testapp.BookEditHistory')
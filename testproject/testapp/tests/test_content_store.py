@@ -0,0 +1,69 @@
+import base64
+from datetime import timedelta
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from freezegun import freeze_time
+
+from wicked_historian.content_store import (
+    STORED_TAG,
+    get_digest,
+)
+from wicked_historian.models import StoredValue
+from wicked_historian.usersmuggler import usersmuggler
+
+from testapp.factories import DocumentFactory
+from testapp.models import (
+    Document,
+    DocumentEditHistory,
+)
+from testapp.tests.base import FreezeTimeTestCase
+
+
+class ContentAddressedFieldTestCase(FreezeTimeTestCase):
+
+    databases = {'default', 'history'}
+
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create(username='john.smith')
+        self.attachment = b'\x00attachment' * 100
+        with usersmuggler.set_user(self.user):
+            self.documents = [DocumentFactory(), DocumentFactory()]
+            for document in self.documents:
+                document = Document.objects.get(pk=document.pk)
+                document.attachment = self.attachment
+                document.save()
+
+    def test_storing_values_once(self):
+        digest = get_digest(self.attachment)
+        self.assertListEqual(list(StoredValue.objects.values_list('digest', flat=True)), [digest])
+        self.assertEqual(bytes(StoredValue.objects.get().content), self.attachment)
+        for entry in DocumentEditHistory.objects.filter(field=DocumentEditHistory.get_tracked_field_choice_by_name('attachment').id):
+            self.assertIs(entry.old_value, None)
+            self.assertEqual(entry.new_value, {STORED_TAG: {'digest': digest, 'binary': True}})
+
+    def test_getting_stored_values(self):
+        with self.assertNumQueries(2):
+            history = DocumentEditHistory.get_for(self.documents[0])
+        self.assertEqual(history[0]['new_value'], base64.b64encode(self.attachment).decode())
+        self.assertEqual(DocumentEditHistory.get_for(self.documents[0], decode=True)[0]['new_value'], self.attachment)
+        entry = DocumentEditHistory.objects.filter(model=self.documents[1]).latest('id')
+        self.assertEqual(DocumentEditHistory.get_history_entry(entry, decode=True)['new_value'], self.attachment)
+
+    def test_collecting_unreferenced_values(self):
+        self.documents[0].delete()
+        output = StringIO()
+        call_command('collect_stored_values', stdout=output)
+        self.assertIn('Deleted 0 unreferenced stored values.', output.getvalue())
+
+        self.documents[1].delete()
+        call_command('collect_stored_values', stdout=output)
+        self.assertIn('Deleted 0 unreferenced stored values.', output.getvalue())
+        self.assertTrue(StoredValue.objects.exists())  # the value could be referenced by an entry being created
+
+        with freeze_time(self.frozen_time + timedelta(hours=2)):
+            call_command('collect_stored_values', stdout=output)
+        self.assertIn('Deleted 1 unreferenced stored values.', output.getvalue())
+        self.assertFalse(StoredValue.objects.exists())
@@ -38,6 +38,17 @@ class WickedHistorianViewCreationTestCase(TestCase):
             ViewRow(db_table='testapp_bookedithistory', field_id='6210813f2dd749a2de24134587b2830e8ba83833', field_name='author'),
             ViewRow(db_table='testapp_bookedithistory', field_id='6a1c79e5fa38318e6f315487c1556a6680d02f9f', field_name='languages'),
             ViewRow(db_table='testapp_bookedithistory', field_id='6dca6b75c546bff58cbd44e298a457cdcdec62ca', field_name='age'),
+            ViewRow(db_table='testapp_documentedithistory', field_id='1664f478eaaf650ea5dbeaf42b28608e47fc9b2e', field_name='id'),
+            ViewRow(db_table='testapp_documentedithistory', field_id='060fd0b449aa0197cb3ea60b3d0c168c9ba82907', field_name='title'),
+            ViewRow(db_table='testapp_documentedithistory', field_id='7b81cebd03ed4e867d2f0a4e8ecd38eda2e6f163', field_name='content'),
+            ViewRow(db_table='testapp_documentedithistory', field_id='3820f3c66d4bfd668ffbf903a168bf9977deb10e', field_name='attachment'),
+            ViewRow(db_table='testapp_noteedithistory', field_id='1664f478eaaf650ea5dbeaf42b28608e47fc9b2e', field_name='id'),
+            ViewRow(db_table='testapp_noteedithistory', field_id='de290b486133000cea72b573bc4da9cfc6923633', field_name='text'),
+            ViewRow(db_table='testapp_noteedithistory', field_id='1a19d431f34a76330afa65f1b9dc3d4385066e3b', field_name='tags'),
+            ViewRow(db_table='testapp_reviewedithistory', field_id='1664f478eaaf650ea5dbeaf42b28608e47fc9b2e', field_name='id'),
+            ViewRow(db_table='testapp_reviewedithistory', field_id='6210813f2dd749a2de24134587b2830e8ba83833', field_name='author'),
+            ViewRow(db_table='testapp_reviewedithistory', field_id='45b261757c98c6b5f306a965e4e35fec8f1a73b5', field_name='rating'),
+            ViewRow(db_table='testapp_reviewedithistory', field_id='feebaf4dadf680daadd6fd6564a45ec531ecf94c', field_name='published_at'),
         ]
 
         rows = _prepare_view_rows_from_models()
@@ -0,0 +1,89 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connection
+from django.test import SimpleTestCase
+from django.test.utils import CaptureQueriesContext
+from freezegun import freeze_time
+
+from wicked_historian.usersmuggler import usersmuggler
+from wicked_historian.utils import generate_history_class
+
+from testapp.factories import BookFactory
+from testapp.models import (
+    Book,
+    BookEditHistory,
+    Document,
+)
+from testapp.tests.base import FreezeTimeTestCase
+
+
+class DebouncedHistoryTestCase(FreezeTimeTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create(username='john.smith')
+        with usersmuggler.set_user(self.user):
+            self.book = BookFactory(number_of_downloads_on_torrents=0)  # type: Book
+            self.book = Book.objects.get(pk=self.book.pk)
+
+    def download(self, times: int = 1, user: User = None):
+        with usersmuggler.set_user(user or self.user):
+            for _ in range(times):
+                self.book.number_of_downloads_on_torrents += 1
+                self.book.save()
+
+    def get_changes(self):
+        return [(entry['change_date'], entry['old_value'], entry['new_value']) for entry in BookEditHistory.get_for(self.book)]
+
+    def test_merging_changes_within_window(self):
+        self.download()
+        with freeze_time(self.frozen_time + timedelta(seconds=50)):
+            with CaptureQueriesContext(connection) as context:
+                self.download(times=3)
+        self.assertEqual(self.get_changes(), [(self.frozen_time, 0, 4)])
+        history_queries = [query['sql'] for query in context.captured_queries if BookEditHistory._meta.db_table in query['sql']]
+        self.assertEqual(len(history_queries), 3)
+        self.assertTrue(all(sql.startswith('UPDATE') for sql in history_queries))
+
+    def test_merging_changes_on_database_which_cannot_select_from_updated_table(self):
+        self.download()
+        with mock.patch.object(connection.features, 'update_can_self_select', False):
+            self.download(times=2)
+        self.assertEqual(self.get_changes(), [(self.frozen_time, 0, 3)])
+
+    def test_window_is_counted_from_first_merged_change(self):
+        for seconds in [0, 50, 100, 130, 200]:
+            with freeze_time(self.frozen_time + timedelta(seconds=seconds)):
+                self.download()
+        self.assertEqual(self.get_changes(), [
+            (self.frozen_time + timedelta(seconds=200), 4, 5),
+            (self.frozen_time + timedelta(seconds=100), 2, 4),
+            (self.frozen_time, 0, 2),
+        ])
+
+    def test_not_merging_changes_of_other_users_and_into_older_entries(self):
+        self.download()
+        self.download(user=User.objects.create(username='jane.doe'))
+        self.download()
+        self.assertEqual([new_value for _, _, new_value in self.get_changes()], [3, 2, 1])
+
+    def test_not_merging_changes_of_other_fields(self):
+        with usersmuggler.set_user(self.user):
+            for title in ['Hamlet', 'Othello']:
+                self.book.title = title
+                self.book.save()
+        self.assertEqual(BookEditHistory.objects.count(), 2)
+
+
+class DebouncedFieldsConfigurationTestCase(SimpleTestCase):
+
+    def test_debounced_field_has_to_be_tracked_field(self):
+        with self.assertRaises(ImproperlyConfigured):
+            generate_history_class(Book, __name__, abstract=True, debounced_fields={'authors': 60})
+
+    def test_debounced_field_cannot_be_delta_encoded(self):
+        with self.assertRaises(ImproperlyConfigured):
+            generate_history_class(Document, __name__, abstract=True, delta_encoded_fields={'content': 3}, debounced_fields={'content': 60})
@@ -0,0 +1,116 @@
+from datetime import datetime
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
+
+import pytz
+from django.contrib.auth.models import User
+from django.core.management import call_command
+
+from wicked_historian.models import StagedChange
+from wicked_historian.usersmuggler import usersmuggler
+
+from testapp.factories import BookFactory
+from testapp.models import (
+    Author,
+    Book,
+    BookEditHistory,
+    Review,
+    ReviewEditHistory,
+)
+from testapp.tests.base import FreezeTimeTestCase
+
+
+class DeferredHistoryTestCase(FreezeTimeTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create(username='john.smith')
+        self.authors = [Author.objects.create(name='William Shakespeare'), Author.objects.create(name='Christopher Marlowe')]
+        with usersmuggler.set_user(self.user):
+            self.review = Review.objects.create(author=self.authors[0], rating=Decimal('4.5'))
+        self.review = Review.objects.get(pk=self.review.pk)
+
+    def edit_review(self, review: Review):
+        review.author = self.authors[1]
+        review.rating = Decimal('3.0')
+        review.published_at = datetime(2005, 4, 2, 19, 37, 1, 123456, tzinfo=pytz.UTC)
+        review.save()
+
+    def test_staging_raw_values(self):
+        with usersmuggler.set_user(self.user), self.assertNumQueries(2):  # update of the instance and a staged change
+            self.edit_review(self.review)
+
+        self.assertFalse(ReviewEditHistory.objects.exists())
+        self.assertEqual(StagedChange.objects.count(), 1)
+
+    def test_materializing_staged_changes(self):
+        with usersmuggler.set_user(self.user):
+            self.edit_review(self.review)
+            deleted_review = Review.objects.get(pk=Review.objects.create(author=self.authors[0], rating=Decimal('1.0')).pk)
+            self.edit_review(deleted_review)
+            deleted_review.delete()
+
+        output = StringIO()
+        # savepoint, staged changes, existing instances, authors, insert of history entries, deletion of staged changes, savepoint release
+        with self.assertNumQueries(7):
+            call_command('materialize_staged_history', batch_size=10, stdout=output)
+
+        self.assertIn('Materialized 2 staged changes.', output.getvalue())
+        self.assertFalse(StagedChange.objects.exists())
+        self.assertListEqual(
+            [
+                (entry.model_id, entry.field_name, entry.old_value, entry.new_value, entry.user_id, entry.change_date)
+                for entry in ReviewEditHistory.objects.order_by('id')
+            ],
+            [
+                (self.review.pk, 'author', {'pk': self.authors[0].pk, 'str': 'William Shakespeare'},
+                 {'pk': self.authors[1].pk, 'str': 'Christopher Marlowe'}, self.user.pk, self.frozen_time),
+                (self.review.pk, 'rating', '4.5', '3.0', self.user.pk, self.frozen_time),
+                (self.review.pk, 'published_at', None, '2005-04-02T19:37:01.123456+00:00', self.user.pk, self.frozen_time),
+            ],
+        )
+
+    def test_materializing_changes_of_deleted_foreign_key_targets(self):
+        with usersmuggler.set_user(self.user):
+            self.edit_review(self.review)
+        deleted_author_pk = self.authors[0].pk
+        self.authors[0].delete()
+
+        call_command('materialize_staged_history', batch_size=10, stdout=StringIO())
+
+        self.assertFalse(StagedChange.objects.exists())
+        entry = ReviewEditHistory.objects.get(field=ReviewEditHistory.get_tracked_field_choice_by_name('author').id)
+        self.assertDictEqual(entry.old_value, {'pk': deleted_author_pk, 'str': str(deleted_author_pk)})
+        self.assertDictEqual(entry.new_value, {'pk': self.authors[1].pk, 'str': 'Christopher Marlowe'})
+
+
+class DeferredRelationsHistoryTestCase(FreezeTimeTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create(username='john.smith')
+        self.author = Author.objects.create(name='William Shakespeare')
+        with usersmuggler.set_user(self.user):
+            self.book = BookFactory(title='Macbeth')  # type: Book
+        self.book = Book.objects.get(pk=self.book.pk)
+        patcher = mock.patch.object(BookEditHistory, 'DEFERRED', True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_creating_entries_in_order_of_changes(self):
+        with usersmuggler.set_user(self.user):
+            self.book.title = 'Hamlet'
+            self.book.save()
+            self.book.authors.add(self.author)
+        self.author.name = 'W. Shakespeare'  # changed before materialization
+        self.author.save()
+
+        self.assertFalse(BookEditHistory.objects.exists())
+        call_command('materialize_staged_history', stdout=StringIO())
+
+        history = BookEditHistory.get_for(self.book)
+        self.assertListEqual([(entry['field_verbose_name'], entry['old_value'], entry['new_value']) for entry in history], [
+            ('authors', [], [{'pk': self.author.pk, 'str': 'William Shakespeare'}]),
+            ('title', 'Macbeth', 'Hamlet'),
+        ])
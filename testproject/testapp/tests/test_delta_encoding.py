@@ -0,0 +1,152 @@
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.test import SimpleTestCase
+
+from wicked_historian.delta import (
+    DELTA_TAG,
+    ValuesCache,
+    apply_patch,
+    get_digest,
+    make_patch,
+    reconstructed_values_cache,
+)
+from wicked_historian.usersmuggler import usersmuggler
+
+from testapp.factories import DocumentFactory
+from testapp.models import (
+    Document,
+    DocumentEditHistory,
+)
+from testapp.tests.base import FreezeTimeTestCase
+
+
+class PatchTestCase(SimpleTestCase):
+
+    def test_applying_patch_gives_new_value(self):
+        for old_value, new_value in [
+            ('', ''),
+            ('', 'foo'),
+            ('foo', ''),
+            ('foo', 'foo'),
+            ('foo bar baz', 'foo BAR baz'),
+            ('aaaa', 'aa'),
+            ('aa', 'aaaa'),
+            ('abcabc', 'abc'),
+            ('zażółć gęślą jaźń', 'zażółć gęsią jaźń'),
+        ]:
+            with self.subTest(old_value=old_value, new_value=new_value):
+                self.assertEqual(apply_patch(old_value, make_patch(old_value, new_value)), new_value)
+
+    def test_patch_contains_only_changed_part(self):
+        old_value = 'x' * 1000 + 'typo' + 'y' * 1000
+        self.assertEqual(make_patch(old_value, old_value.replace('typo', 'type')), [1003, 1000, 'e'])
+
+
+class ValuesCacheTestCase(SimpleTestCase):
+
+    def test_limiting_total_length_of_values(self):
+        cache = ValuesCache(max_size=10, max_length=10)
+        cache.set('a', 'a' * 6)
+        cache.set('b', 'b' * 6)
+        cache.set('c', 'c' * 11)
+
+        self.assertIsNone(cache.get('a'))
+        self.assertEqual(cache.get('b'), 'b' * 6)
+        self.assertIsNone(cache.get('c'))
+
+
+class DeltaEncodingTestCase(FreezeTimeTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create(username='john.smith')
+        self.content_versions = ['first version', 'second version', 'second version!', 'third version!', 'fourth version!']
+        with usersmuggler.set_user(self.user):
+            self.document = DocumentFactory(content='initial version')  # type: Document
+            self.document = Document.objects.get(pk=self.document.pk)
+            for content in self.content_versions:
+                self.document.content = content
+                self.document.save()
+
+    def test_storing_patches_and_keyframes(self):
+        entries = list(DocumentEditHistory.objects.filter(model=self.document).order_by('id'))
+        self.assertEqual(len(entries), 5)
+
+        self.assertEqual(entries[0].old_value, 'initial version')
+        self.assertEqual(entries[0].new_value, {DELTA_TAG: {'digest': get_digest('first version'), 'depth': 0, 'value': 'first version'}})
+        self.assertEqual(entries[1].old_value, {DELTA_TAG: {'previous': entries[0].pk, 'digest': get_digest('first version')}})
+        self.assertEqual(entries[1].new_value, {DELTA_TAG: {
+            'digest': get_digest('second version'),
+            'depth': 1,
+            'patch': make_patch('first version', 'second version'),
+        }})
+        self.assertEqual(entries[2].new_value[DELTA_TAG]['depth'], 2)
+        self.assertIn('patch', entries[2].new_value[DELTA_TAG])
+        # every third version is stored in full
+        self.assertEqual(entries[3].old_value, {DELTA_TAG: {'previous': entries[2].pk, 'digest': get_digest('second version!')}})
+        self.assertEqual(entries[3].new_value, {DELTA_TAG: {'digest': get_digest('third version!'), 'depth': 0, 'value': 'third version!'}})
+        self.assertEqual(entries[4].new_value[DELTA_TAG]['depth'], 1)
+        self.assertListEqual(
+            [(entry.delta_digest, entry.delta_depth) for entry in entries],
+            [(get_digest(content), depth) for content, depth in zip(self.content_versions, [0, 1, 2, 0, 1])],
+        )
+
+    def save_content(self, content: str):
+        with usersmuggler.set_user(self.user):
+            self.document.content = content
+            self.document.save()
+
+    def test_writing_without_loading_previous_value(self):
+        with mock.patch('wicked_historian.delta.decompress_value') as decompress_value:
+            self.save_content('fifth version!')
+
+        decompress_value.assert_not_called()
+        self.assertEqual(DocumentEditHistory.objects.order_by('id').last().new_value[DELTA_TAG]['depth'], 2)
+
+    def test_writing_after_entry_without_version(self):
+        DocumentEditHistory.objects.update(delta_digest=None, delta_depth=None)
+
+        self.save_content('fifth version!')
+
+        entry = DocumentEditHistory.objects.order_by('id').last()
+        self.assertEqual(entry.new_value[DELTA_TAG]['depth'], 2)
+        self.assertEqual(DocumentEditHistory.get_history_entry(entry)['new_value'], 'fifth version!')
+
+    def test_reading_reconstructed_values(self):
+        for clear_cache in [True, False]:
+            if clear_cache:
+                reconstructed_values_cache.clear()
+            with self.subTest(clear_cache=clear_cache):
+                history = DocumentEditHistory.get_for(self.document)
+                self.assertListEqual(
+                    [(entry['old_value'], entry['new_value']) for entry in history],
+                    list(zip(['initial version'] + self.content_versions, self.content_versions))[::-1],
+                )
+
+    def test_reading_values_when_entry_in_the_middle_was_deleted(self):
+        entries = list(DocumentEditHistory.objects.filter(model=self.document).order_by('id'))
+        entries[1].delete()
+        reconstructed_values_cache.clear()
+
+        with self.assertLogs('wicked_historian.delta', 'WARNING'):
+            history = DocumentEditHistory.get_for(self.document)
+
+        self.assertListEqual([(entry['old_value'], entry['new_value']) for entry in history], [
+            ('third version!', 'fourth version!'),
+            (None, 'third version!'),  # the keyframe is read in full
+            (None, None),
+            ('initial version', 'first version'),
+        ])
+
+    def test_storing_full_values_when_previous_entry_does_not_match(self):
+        Document.objects.filter(pk=self.document.pk).update(content='changed without history')
+        self.document = Document.objects.get(pk=self.document.pk)
+        with usersmuggler.set_user(self.user):
+            self.document.content = 'last version'
+            self.document.save()
+
+        entry = DocumentEditHistory.objects.order_by('id').last()
+        self.assertEqual(entry.old_value, 'changed without history')
+        self.assertEqual(entry.new_value[DELTA_TAG]['value'], 'last version')
+        self.assertEqual(DocumentEditHistory.get_history_entry(entry)['old_value'], 'changed without history')
@@ -0,0 +1,98 @@
+from django.contrib.auth.models import User
+
+from wicked_historian.usersmuggler import usersmuggler
+from wicked_historian.utils import (
+    PREVIOUS_VALUE_REFERENCE,
+    get_previous_value_reference,
+)
+
+from testapp.factories import DocumentFactory
+from testapp.models import (
+    Document,
+    DocumentEditHistory,
+)
+from testapp.tests.base import FreezeTimeTestCase
+
+
+class DerivedOldValuesTestCase(FreezeTimeTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create(username='john.smith')
+        self.titles = ['Hamlet', 'Macbeth', 'Othello']
+        with usersmuggler.set_user(self.user):
+            self.document = DocumentFactory(title='King Lear')  # type: Document
+            self.document = Document.objects.get(pk=self.document.pk)
+            for title in self.titles:
+                self.document.title = title
+                self.document.save()
+        self.title_field_id = DocumentEditHistory.get_tracked_field_choice_by_name('title').id
+
+    def test_storing_old_values_only_when_they_are_not_derivable(self):
+        entries = list(DocumentEditHistory.objects.filter(field=self.title_field_id).order_by('id'))
+        self.assertListEqual([entry.new_value for entry in entries], self.titles)
+        self.assertListEqual(
+            [entry.old_value for entry in entries],
+            ['King Lear', get_previous_value_reference(entries[0].pk), get_previous_value_reference(entries[1].pk)],
+        )
+
+    def test_storing_old_values_changed_without_history(self):
+        Document.objects.filter(pk=self.document.pk).update(title='Changed without history')
+        self.document = Document.objects.get(pk=self.document.pk)
+        with usersmuggler.set_user(self.user):
+            self.document.title = 'Romeo and Juliet'
+            self.document.save()
+
+        entry = DocumentEditHistory.objects.filter(field=self.title_field_id).latest('id')
+        self.assertEqual(entry.old_value, 'Changed without history')
+        self.assertEqual(DocumentEditHistory.get_history_entry(entry)['old_value'], 'Changed without history')
+
+    def test_deriving_old_values(self):
+        with self.assertNumQueries(1):
+            history = DocumentEditHistory.get_for(self.document)
+        self.assertListEqual(
+            [(entry['old_value'], entry['new_value']) for entry in history if entry['field_verbose_name'] == 'title'],
+            list(zip(['King Lear'] + self.titles, self.titles))[::-1],
+        )
+
+    def test_deriving_old_value_of_single_entry(self):
+        entry = DocumentEditHistory.objects.select_related('user').filter(field=self.title_field_id).latest('id')
+        with self.assertNumQueries(1):
+            self.assertEqual(DocumentEditHistory.get_history_entry(entry)['old_value'], 'Macbeth')
+
+    def get_title_changes(self):
+        return [
+            (entry['old_value'], entry['new_value']) for entry in DocumentEditHistory.get_for(self.document)
+            if entry['field_verbose_name'] == 'title'
+        ]
+
+    def test_deriving_old_values_after_deleting_entries(self):
+        entries = list(DocumentEditHistory.objects.filter(field=self.title_field_id).order_by('id'))
+        entries[1].delete()  # Hamlet => Macbeth
+
+        # the referenced entry is gone, so the old value is unknown
+        self.assertListEqual(self.get_title_changes(), [(None, 'Othello'), ('King Lear', 'Hamlet')])
+        self.assertIsNone(DocumentEditHistory.get_history_entry(entries[2])['old_value'])
+        self.assertIsNone(next(DocumentEditHistory.get_history_entries(DocumentEditHistory.objects.filter(pk=entries[2].pk)))['old_value'])
+
+    def test_deriving_old_values_from_entries_preceding_concurrent_changes(self):
+        entries = list(DocumentEditHistory.objects.filter(field=self.title_field_id).order_by('id'))
+        # as if the entry of Hamlet => Macbeth was created by a concurrent change after the last entry read the previous one
+        DocumentEditHistory.objects.filter(pk=entries[2].pk).update(old_value=get_previous_value_reference(entries[0].pk))
+
+        self.assertListEqual(self.get_title_changes(), [('Hamlet', 'Othello'), ('Hamlet', 'Macbeth'), ('King Lear', 'Hamlet')])
+        entry = DocumentEditHistory.objects.get(pk=entries[2].pk)
+        self.assertEqual(DocumentEditHistory.get_history_entry(entry)['old_value'], 'Hamlet')
+
+    def test_deriving_old_values_of_references_without_entry_ids(self):
+        entries = list(DocumentEditHistory.objects.filter(field=self.title_field_id).order_by('id'))
+        DocumentEditHistory.objects.filter(pk__in=[entries[1].pk, entries[2].pk]).update(old_value=PREVIOUS_VALUE_REFERENCE)
+
+        self.assertListEqual(self.get_title_changes(), list(zip(['King Lear'] + self.titles, self.titles))[::-1])
+        entries[1].delete()
+        # resolved to the entry which precedes the given one at the time of reading
+        self.assertListEqual(self.get_title_changes(), [('Hamlet', 'Othello'), ('King Lear', 'Hamlet')])
+
+    def test_deriving_old_values_of_filtered_entries(self):
+        entries = DocumentEditHistory.objects.filter(field=self.title_field_id, new_value='Othello')
+        self.assertListEqual([entry['old_value'] for entry in DocumentEditHistory.get_history_entries(entries)], ['Macbeth'])
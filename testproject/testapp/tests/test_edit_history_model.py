@@ -5,6 +5,7 @@ from datetime import (
     timedelta,
 )
 from decimal import Decimal
+from unittest import mock
 from typing import (
     Any,
     Dict,
@@ -535,6 +536,24 @@ class EditHistoryModelTestCase(FreezeTimeTestCase):
                 },
             ])
 
+    def test_custom_through_signal_handlers_use_mappings_computed_at_registration(self):
+        with mock.patch.object(BookEditHistory, 'get_foreign_key_field_name', side_effect=AssertionError), \
+                usersmuggler.set_user(self.user):
+            pirate = PirateFactory(name='pirate')
+            BookIllegalDownloadFactory(book=self.book, pirate=pirate)
+            self.book.authors.add(self.john_paul_ii)
+
+        self.assertEqual(BookEditHistory.objects.filter(model=self.book).count(), 2)
+
+    def test_custom_through_signal_handlers_load_relation_once_before_and_once_after(self):
+        with usersmuggler.set_user(self.user):
+            illegal_download = BookIllegalDownloadFactory(book=self.book, pirate=PirateFactory())
+            illegal_download = BookIllegalDownload.objects.select_related('book').get(pk=illegal_download.pk)
+            illegal_download.number_of_downloads = 2
+            # fk value from db, relation before, update, relation after
+            with self.assertNumQueries(4):
+                illegal_download.save()
+
     def test_reset_custom_m2m(self):
         with usersmuggler.set_user(self.user):
             first_printer = PrinterFactory(name='first_printer')
@@ -0,0 +1,58 @@
+import json
+
+from django.test import (
+    SimpleTestCase,
+    override_settings,
+)
+
+from wicked_historian.encoder import (
+    JSON_NULL,
+    JSONEncoder,
+    dumps,
+    get_serializer,
+)
+
+
+def upper_case_dumps(value):
+    return json.dumps(value).upper()
+
+
+class DumpingHistoryValuesTestCase(SimpleTestCase):
+
+    def test_dumps_gives_the_same_json_as_encoder(self):
+        values = [
+            'foo',
+            'zażółć "gęślą" jaźń\n',
+            0,
+            -1223372036854775808,
+            True,
+            False,
+            None,
+            JSON_NULL,
+            1.5,
+            [],
+            [{'pk': 1, 'str': 'William Shakespeare'}, {'pk': 2, 'str': 'John Paul II'}],
+            {'pk': JSON_NULL, 'str': ''},
+        ]
+        for value in values:
+            with self.subTest(value=value):
+                self.assertEqual(dumps(value), json.dumps(value, cls=JSONEncoder, allow_nan=False))
+
+    def test_dumps_does_not_allow_nan(self):
+        with self.assertRaises(ValueError):
+            dumps(float('nan'))
+
+    def test_getting_default_serializer(self):
+        self.assertIs(get_serializer(), dumps)
+
+    @override_settings(WICKED_HISTORIAN_JSON_SERIALIZER='testapp.tests.test_encoder.upper_case_dumps')
+    def test_getting_configured_serializer(self):
+        self.assertEqual(get_serializer()(['foo']), '["FOO"]')
+
+    def test_getting_serializer_for_custom_encoder(self):
+        class CustomEncoder(json.JSONEncoder):
+
+            def default(self, obj):
+                return 'custom'
+
+        self.assertEqual(get_serializer(CustomEncoder)([object()]), '["custom"]')
@@ -0,0 +1,63 @@
+from datetime import (
+    date,
+    datetime,
+    time,
+    timedelta,
+)
+from decimal import Decimal
+
+import pytz
+from django.db import models
+from django.test import TestCase
+
+from wicked_historian.encoder import JSON_NULL
+from wicked_historian.utils import (
+    DefaultFieldValueMapper,
+    generate_history_class,
+)
+
+from testapp.models import (
+    Author,
+    Book,
+)
+
+
+class CompilingFieldValueMapperTestCase(TestCase):
+
+    def test_compiled_mapper_gives_the_same_representation_as_calling_the_mapper(self):
+        mapper = DefaultFieldValueMapper()
+        author = Author.objects.create(name='William Shakespeare')
+        values = [
+            (models.CharField(), 'foo'),
+            (models.IntegerField(), 7),
+            (models.DateField(), date(2005, 4, 2)),
+            (models.DateTimeField(), datetime(2005, 4, 2, 19, 37, tzinfo=pytz.UTC)),
+            (models.DurationField(), timedelta(hours=1, milliseconds=5)),
+            (models.BinaryField(), b'some_data'),
+            (models.DecimalField(), Decimal('6.66')),
+            (models.TimeField(), time(hour=1)),
+            (models.ForeignKey(Author, on_delete=models.PROTECT), author.pk),
+            (models.ManyToManyField(Author), [author]),
+        ]
+        for field, value in values:
+            with self.subTest(field=field.__class__.__name__):
+                self.assertEqual(mapper.compile(field)(value), mapper(field, value))
+
+    def test_compiled_mapper_maps_none_to_json_null(self):
+        self.assertIs(DefaultFieldValueMapper().compile(models.DateField())(None), JSON_NULL)
+
+    def test_history_class_uses_mapper_without_compile(self):
+        class UpperCaseValueMapper:
+
+            def __call__(self, field: models.Field, value):
+                return str(value).upper()
+
+        class BookEditHistory(generate_history_class(Book, __name__, abstract=True)):
+
+            FIELD_VALUE_MAPPER = UpperCaseValueMapper()
+
+            class Meta:
+                abstract = True
+
+        self.assertEqual(BookEditHistory.get_value_representation('title', 'macbeth'), 'MACBETH')
+        self.assertIs(BookEditHistory.get_value_mapper('title'), BookEditHistory.get_value_mapper('title'))
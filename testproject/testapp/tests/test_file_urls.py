@@ -0,0 +1,90 @@
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+
+from wicked_historian.usersmuggler import usersmuggler
+
+from testapp.factories import BookFactory
+from testapp.models import (
+    Book,
+    BookEditHistory,
+)
+
+
+class FileUrlsTestCase(TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create(username='john.smith')
+        with usersmuggler.set_user(self.user):
+            self.book = BookFactory()  # type: Book
+        self.storage = Book._meta.get_field('text_as_pdf').storage
+
+    def set_files(self, *names: str):
+        with usersmuggler.set_user(self.user):
+            for name in names:
+                self.book.text_as_pdf = name  # already stored file
+                self.book.save()
+
+    def get_file_history(self, **kwargs):
+        return [
+            (entry['old_value'], entry['new_value']) for entry in BookEditHistory.get_for(self.book, **kwargs)
+            if entry['field_verbose_name'] == 'text as pdf'
+        ]
+
+    def test_saving_file_does_not_ask_storage_for_url(self):
+        with mock.patch.object(self.storage, 'url') as url:
+            self.set_files('hamlet')
+
+        url.assert_not_called()
+        self.assertListEqual(self.get_file_history(file_urls=False), [('', 'hamlet')])
+
+    def test_resolving_urls_once_for_every_name(self):
+        self.set_files('hamlet', 'othello', 'hamlet')
+
+        with mock.patch.object(self.storage, 'url', side_effect=lambda name: 'https://example.com/' + name) as url:
+            history = self.get_file_history()
+
+        self.assertListEqual(history, [
+            ('https://example.com/othello', 'https://example.com/hamlet'),
+            ('https://example.com/hamlet', 'https://example.com/othello'),
+            ('', 'https://example.com/hamlet'),
+        ])
+        self.assertCountEqual([call[0][0] for call in url.call_args_list], ['hamlet', 'othello'])
+
+    def test_returning_stored_urls_as_they_are(self):
+        self.set_files('hamlet')
+        BookEditHistory.objects.update(new_value='/media/hamlet')
+        self.set_files('https://cdn.example.com/othello')
+
+        with mock.patch.object(self.storage, 'url', side_effect=lambda name: 'https://example.com/' + name) as url:
+            history = self.get_file_history()
+
+        self.assertListEqual(history, [
+            ('https://example.com/hamlet', 'https://cdn.example.com/othello'),
+            ('', '/media/hamlet'),
+        ])
+        url.assert_called_once_with('hamlet')
+
+    def test_resolving_urls_with_overridden_get_file_urls(self):
+        self.set_files('hamlet')
+
+        def get_file_urls(field, names):
+            return {name: 'signed:' + name for name in names}
+
+        with mock.patch.object(BookEditHistory, 'get_file_urls', side_effect=get_file_urls) as get_file_urls_mock:
+            history = self.get_file_history()
+
+        self.assertListEqual(history, [('', 'signed:hamlet')])
+        get_file_urls_mock.assert_called_once_with(Book._meta.get_field('text_as_pdf'), {'hamlet'})
+
+    def test_resolving_urls_in_pages_and_prefetched_history(self):
+        self.set_files('hamlet')
+
+        with mock.patch.object(self.storage, 'url', side_effect=lambda name: 'https://example.com/' + name):
+            page = BookEditHistory.get_page_for(self.book, limit=1)
+            book = Book.objects.prefetch_history(limit=1).get(pk=self.book.pk)
+
+        self.assertEqual(page[0]['new_value'], 'https://example.com/hamlet')
+        self.assertEqual(book.history[0]['new_value'], 'https://example.com/hamlet')
@@ -0,0 +1,123 @@
+from django.contrib.auth.models import User
+from django.db import (
+    connections,
+    transaction,
+)
+from django.test import TransactionTestCase
+
+from wicked_historian.usersmuggler import usersmuggler
+
+from testapp.factories import NoteFactory
+from testapp.models import (
+    Language,
+    Note,
+    NoteEditHistory,
+)
+
+
+class HistoryDatabaseTestCase(TransactionTestCase):
+
+    databases = {'default', 'history'}
+
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create(username='john.smith')
+        with usersmuggler.set_user(self.user):
+            self.note = NoteFactory(text='first version')  # type: Note
+        self.note = Note.objects.get(pk=self.note.pk)
+        NoteEditHistory.objects.all().delete()
+
+    def test_storing_history_in_separate_database(self):
+        with usersmuggler.set_user(self.user):
+            self.note.text = 'second version'
+            self.note.save()
+
+        self.assertEqual(NoteEditHistory.objects.using('history').count(), 1)
+        self.assertNotIn(NoteEditHistory._meta.db_table, connections['default'].introspection.table_names())
+
+    def test_writing_history_on_commit(self):
+        with usersmuggler.set_user(self.user):
+            with transaction.atomic():
+                self.note.text = 'second version'
+                self.note.save()
+                self.assertFalse(NoteEditHistory.objects.exists())
+            self.assertEqual(NoteEditHistory.objects.get().new_value, 'second version')
+
+            with self.assertRaises(ValueError), transaction.atomic():
+                self.note.text = 'rolled back version'
+                self.note.save()
+                raise ValueError()
+            self.assertEqual(NoteEditHistory.objects.count(), 1)
+
+    def test_writing_squashed_m2m_changes_on_commit(self):
+        english, polish = Language.objects.create(name='English'), Language.objects.create(name='Polish')
+        with usersmuggler.set_user(self.user), transaction.atomic():
+            self.note.tags.add(english)
+            self.note.tags.add(polish)
+
+        entry = NoteEditHistory.objects.get()
+        self.assertEqual(entry.old_value, [])
+        self.assertEqual(entry.new_value, [{'pk': english.pk, 'str': 'English'}, {'pk': polish.pk, 'str': 'Polish'}])
+
+    def test_not_squashing_m2m_changes_into_rolled_back_entry(self):
+        english, polish = Language.objects.create(name='English'), Language.objects.create(name='Polish')
+        with usersmuggler.set_user(self.user):
+            with self.assertRaises(ValueError), transaction.atomic():
+                self.note.tags.add(english)
+                raise ValueError()
+            self.note.tags.add(polish)
+
+        entry = NoteEditHistory.objects.get()
+        self.assertEqual(entry.old_value, [])
+        self.assertEqual(entry.new_value, [{'pk': polish.pk, 'str': 'Polish'}])
+
+    def test_writing_squashed_m2m_changes_of_saved_entry_on_commit(self):
+        english, polish = Language.objects.create(name='English'), Language.objects.create(name='Polish')
+        with usersmuggler.set_user(self.user):
+            self.note.tags.add(english)
+            with self.assertRaises(ValueError), transaction.atomic():
+                self.note.tags.add(polish)
+                self.assertEqual(NoteEditHistory.objects.get().new_value, [{'pk': english.pk, 'str': 'English'}])
+                raise ValueError()
+
+        self.assertEqual(NoteEditHistory.objects.get().new_value, [{'pk': english.pk, 'str': 'English'}])
+
+    def test_reading_history_with_users_from_default_database(self):
+        with usersmuggler.set_user(self.user):
+            self.note.text = 'second version'
+            self.note.save()
+            self.note.text = 'third version'
+            self.note.save()
+
+        with self.assertNumQueries(1, using='history'), self.assertNumQueries(1, using='default'):
+            history = NoteEditHistory.get_for(self.note)
+        self.assertListEqual([(entry['user'], entry['new_value']) for entry in history], [
+            (self.user, 'third version'),
+            (self.user, 'second version'),
+        ])
+
+    def test_creating_deletion_entry(self):
+        note_pk = self.note.pk
+        with usersmuggler.set_user(self.user):
+            self.note.delete()
+
+        entry = NoteEditHistory.objects.get()
+        self.assertEqual((entry.model_id, entry.field_name, entry.old_value, entry.new_value), (note_pk, 'id', note_pk, None))
+
+    def test_creating_deletion_entry_without_user(self):
+        self.note.delete()  # e.g. by a management command
+
+        entry = NoteEditHistory.objects.get()
+        self.assertEqual((entry.field_name, entry.new_value, entry.user_id), ('id', None, None))
+
+    def test_keeping_history_of_deleted_instances_and_users(self):
+        with usersmuggler.set_user(self.user):
+            self.note.text = 'second version'
+            self.note.save()
+            note_pk = self.note.pk
+            self.note.delete()
+        self.user.delete()
+
+        entry = NoteEditHistory.objects.order_by('id').first()
+        self.assertEqual(entry.model_id, note_pk)
+        self.assertIsNone(NoteEditHistory.get_history_entry(entry)['user'])
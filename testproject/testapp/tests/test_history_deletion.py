@@ -0,0 +1,83 @@
+from django.contrib.auth.models import User
+from django.db import connection
+from django.db.models.signals import (
+    class_prepared,
+    pre_delete,
+)
+from django.test import SimpleTestCase
+from django.test.utils import (
+    CaptureQueriesContext,
+    isolate_apps,
+)
+
+from wicked_historian.usersmuggler import usersmuggler
+from wicked_historian.utils import generate_history_class
+
+from testapp.factories import DocumentFactory
+from testapp.models import (
+    Document,
+    DocumentEditHistory,
+    Review,
+)
+from testapp.tests.base import FreezeTimeTestCase
+
+
+class DeletingHistoryTestCase(FreezeTimeTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create(username='john.smith')
+        with usersmuggler.set_user(self.user):
+            self.documents = [DocumentFactory(), DocumentFactory()]
+            for document in self.documents:
+                for version in range(5):
+                    document.title = 'Version #%d' % version
+                    document.save()
+
+    def test_deleting_history_without_loading_it(self):
+        # a receiver of all models prevents Django from deleting history without loading it
+        pre_delete.connect(self.receiver)
+        self.addCleanup(pre_delete.disconnect, self.receiver)
+
+        document_pk = self.documents[0].pk
+        with CaptureQueriesContext(connection) as context:
+            self.documents[0].delete()
+
+        history_table = DocumentEditHistory._meta.db_table
+        self.assertEqual([query['sql'] for query in context.captured_queries if history_table in query['sql']], [
+            'DELETE FROM "{0}" WHERE "{0}"."model_id" = {1}'.format(history_table, document_pk),
+        ])
+        self.assertFalse(DocumentEditHistory.objects.filter(model_id=document_pk).exists())
+        self.assertEqual(DocumentEditHistory.objects.filter(model=self.documents[1]).count(), 5)
+
+    def test_deleting_history_of_deleted_querysets(self):
+        Document.objects.all().delete()
+        self.assertFalse(DocumentEditHistory.objects.exists())
+
+    def receiver(self, **kwargs):
+        pass
+
+
+class ConnectingDeletionReceiversTestCase(SimpleTestCase):
+
+    @isolate_apps('testapp')
+    def test_connecting_receivers_when_history_model_is_created(self):
+        class DeletedDocumentEditHistory(generate_history_class(Document, __name__, abstract=True, history_on_delete='delete')):
+
+            class Meta:
+                app_label = 'testapp'
+
+        # connected without calling register_m2m_signals
+        self.assertTrue(pre_delete.disconnect(sender=Document, dispatch_uid='DeletedDocumentEditHistory__delete_history'))
+
+    @isolate_apps('testapp')
+    def test_connecting_receivers_of_concrete_history_model(self):
+        generate_history_class(Review, 'testapp.models', history_on_delete='delete')
+
+        self.assertTrue(pre_delete.disconnect(sender=Review, dispatch_uid='ReviewEditHistory__delete_history'))
+
+    def test_not_waiting_for_history_models_when_history_is_deleted_by_cascade(self):
+        receivers = list(class_prepared.receivers)
+        generate_history_class(Document, __name__, abstract=True, history_on_delete='cascade')
+
+        self.assertListEqual(class_prepared.receivers, receivers)
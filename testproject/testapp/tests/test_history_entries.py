@@ -1,5 +1,6 @@
 "Test history entries for migrated, obsolete fields"
 from datetime import (
+    date,
     time,
     timedelta,
 )
@@ -8,10 +9,13 @@ from typing import (
     Any,
     Dict,
 )
+from unittest import mock
 
 from django.contrib.auth.models import User
 from django.db import models
+from django.utils.dateparse import parse_date
 
+from wicked_historian.encoder import JSON_NULL
 from wicked_historian.usersmuggler import usersmuggler
 from wicked_historian.utils import FieldDescription
 
@@ -195,6 +199,66 @@ class GettingHistoryEntriesForChangedFieldsTestCase(FreezeTimeTestCase):
             'chapter_set',
         })
 
+    def test_decoding_values(self):
+        with usersmuggler.set_user(self.user):
+            self.book.date_of_publication = self.frozen_time.date()
+            self.book.moment_of_appearance_on_torrents = self.frozen_time
+            self.book.ebook_length = timedelta(hours=3, milliseconds=5)
+            self.book.encrypted_book = b'other_data'
+            self.book.cash_lost_because_of_piracy = Decimal('766666666.66')
+            self.book.first_download_hour = time(hour=2)
+            self.book.issue_number = 7
+            self.book.literary_period = 3
+            self.book.save()
+
+        history = sorted(BookEditHistory.get_for(self.book, decode=True), key=lambda entry: entry['field_verbose_name'])
+        self.assertListEqual(
+            [(entry['field_verbose_name'], entry['old_value'], entry['new_value']) for entry in history],
+            [
+                ('cash lost because of piracy', Decimal('666666666.66'), Decimal('766666666.66')),
+                ('date of publication', (self.frozen_time + timedelta(days=1)).date(), self.frozen_time.date()),
+                ('ebook length', timedelta(days=1, hours=3, minutes=12, seconds=7), timedelta(hours=3, milliseconds=5)),
+                ('encrypted book', b'some_data', b'other_data'),
+                ('first download hour', time(hour=1), time(hour=2)),
+                ('issue number', None, 7),
+                ('literary period', 'renaissance', 'enlightenment'),
+                ('moment of appearance on torrents', self.frozen_time + timedelta(hours=1), self.frozen_time),
+            ],
+        )
+
+    def test_decoding_values_of_related_objects(self):
+        english = self.languages['english']
+        self.create_fake_history_entry(
+            self.field_choices_by_name['language'].id,
+            old_value=JSON_NULL,
+            new_value={'pk': english.pk, 'str': str(english)},
+        )
+        history_entry = BookEditHistory.get_for(self.book, decode=True)[0]
+        self.assertIsNone(history_entry['old_value'])
+        self.assertEqual(history_entry['new_value'], {'pk': english.pk, 'str': str(english)})
+
+    def test_decoding_every_distinct_value_of_field_once_in_chunk(self):
+        dates = ['2005-04-01', '2005-04-02', '2005-04-01', '2005-04-02']
+        for old_value, new_value in zip(dates, dates[1:]):
+            self.create_fake_history_entry(self.field_choices_by_name['date_of_publication'].id, old_value=old_value, new_value=new_value)
+        value_decoder = mock.Mock(side_effect=parse_date)
+
+        with mock.patch.object(BookEditHistory, 'get_value_decoder', return_value=value_decoder):
+            entries = list(BookEditHistory.get_history_entries(BookEditHistory.objects.order_by('id'), decode=True))
+
+        self.assertListEqual([(entry['old_value'], entry['new_value']) for entry in entries], [
+            (date(2005, 4, 1), date(2005, 4, 2)),
+            (date(2005, 4, 2), date(2005, 4, 1)),
+            (date(2005, 4, 1), date(2005, 4, 2)),
+        ])
+        self.assertCountEqual([call[0][0] for call in value_decoder.call_args_list], ['2005-04-01', '2005-04-02'])
+
+    def test_getting_history_entries_in_chunks(self):
+        for year in range(5):
+            self.create_fake_history_entry(self.field_choices_by_name['issue_year'].id, old_value=year, new_value=year + 1)
+        entries = BookEditHistory.get_history_entries(BookEditHistory.objects.order_by('id'), chunk_size=2)
+        self.assertListEqual([entry['new_value'] for entry in entries], [1, 2, 3, 4, 5])
+
     @staticmethod
     def get_last_history_entry(book: Book) -> Dict[str, Any]:
         return BookEditHistory.get_for(book)[0]
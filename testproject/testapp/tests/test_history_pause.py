@@ -0,0 +1,120 @@
+from django.contrib.auth.models import User
+
+from wicked_historian.pause import pause_history
+from wicked_historian.usersmuggler import usersmuggler
+
+from testapp.factories import (
+    BookFactory,
+    DocumentFactory,
+)
+from testapp.models import (
+    Author,
+    Book,
+    BookEditHistory,
+    Document,
+    DocumentEditHistory,
+)
+from testapp.tests.base import FreezeTimeTestCase
+
+
+class HistoryPauseTestCase(FreezeTimeTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create(username='john.smith')
+        with usersmuggler.set_user(self.user):
+            self.book = BookFactory(title='Macbeth')  # type: Book
+            self.book = Book.objects.get(pk=self.book.pk)
+            self.document = DocumentFactory(title='first')  # type: Document
+            self.document = Document.objects.get(pk=self.document.pk)
+
+    def change_titles(self, *titles: str):
+        for title in titles:
+            self.book.title = title
+            self.book.save()
+            self.document.title = title
+            self.document.save()
+
+    def test_pausing_history_of_all_models(self):
+        with usersmuggler.set_user(self.user):
+            with pause_history():
+                with self.assertNumQueries(1):
+                    self.book.title = 'Hamlet'
+                    self.book.save()
+                self.document.title = 'second'
+                self.document.save()
+            self.assertFalse(BookEditHistory.objects.exists())
+            self.assertFalse(DocumentEditHistory.objects.exists())
+
+            # changes made after the pause are compared with the paused ones
+            self.book.title = 'Othello'
+            self.book.save()
+        self.assertEqual(BookEditHistory.get_for(self.book)[0]['old_value'], 'Hamlet')
+
+    def test_pausing_history_of_models_and_history_classes(self):
+        for target in [Book, BookEditHistory]:
+            with self.subTest(target=target), usersmuggler.set_user(self.user):
+                with pause_history(target):
+                    self.change_titles('Hamlet %s' % target.__name__)
+                self.assertFalse(BookEditHistory.objects.exists())
+                self.assertTrue(DocumentEditHistory.objects.exists())
+                DocumentEditHistory.objects.all().delete()
+
+    def test_pausing_history_with_decorator(self):
+        @pause_history(Book)
+        def change_titles(*titles):
+            self.change_titles(*titles)
+
+        with usersmuggler.set_user(self.user):
+            change_titles('Hamlet')
+            change_titles('Othello')
+        self.assertFalse(BookEditHistory.objects.exists())
+        self.assertEqual(DocumentEditHistory.objects.count(), 2)
+
+    def test_pausing_history_of_relations(self):
+        with usersmuggler.set_user(self.user), pause_history(Book):
+            self.book.authors.add(Author.objects.create(name='William Shakespeare'))
+        self.assertFalse(BookEditHistory.objects.exists())
+
+    def test_creating_summary_of_paused_changes(self):
+        with usersmuggler.set_user(self.user):
+            with pause_history(Book, summary=True):
+                self.change_titles('Hamlet', 'Othello', 'King Lear')
+                self.book.issue_year = 1600
+                self.book.save()
+                self.book.issue_year = 2018
+                self.book.save()
+                self.assertFalse(BookEditHistory.objects.exists())
+
+        history = BookEditHistory.get_for(self.book)
+        self.assertEqual([(entry['field_verbose_name'], entry['old_value'], entry['new_value']) for entry in history], [
+            ('title', 'Macbeth', 'King Lear'),
+        ])
+        self.assertEqual(DocumentEditHistory.objects.count(), 3)
+
+    def test_squashing_changes_of_row_saved_by_different_objects(self):
+        with usersmuggler.set_user(self.user), pause_history(Book, summary=True):
+            self.change_titles('Hamlet')
+            other_book = Book.objects.get(pk=self.book.pk)
+            other_book.title = 'Othello'
+            other_book.save()
+
+        history = BookEditHistory.get_for(self.book)
+        self.assertEqual([(entry['old_value'], entry['new_value']) for entry in history], [('Macbeth', 'Othello')])
+
+    def test_tracking_relations_in_summary_pause(self):
+        author = Author.objects.create(name='William Shakespeare')
+        with usersmuggler.set_user(self.user), pause_history(Book, summary=True):
+            self.book.authors.add(author)
+
+        history = BookEditHistory.get_for(self.book)
+        self.assertEqual([(entry['field_verbose_name'], entry['new_value']) for entry in history], [
+            ('authors', [{'pk': author.pk, 'str': str(author)}]),
+        ])
+
+    def test_summary_is_not_created_after_exception(self):
+        with self.assertRaises(ValueError), usersmuggler.set_user(self.user), pause_history(summary=True):
+            self.change_titles('Hamlet')
+            raise ValueError()
+        self.assertFalse(BookEditHistory.objects.exists())
+        self.assertFalse(DocumentEditHistory.objects.exists())
@@ -0,0 +1,69 @@
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.db import NotSupportedError
+from freezegun import freeze_time
+
+from wicked_historian.usersmuggler import usersmuggler
+
+from testapp.factories import BookFactory
+from testapp.models import (
+    Book,
+    BookEditHistory,
+    Note,
+)
+from testapp.tests.base import FreezeTimeTestCase
+
+
+class HistoryQuerySetsTestCase(FreezeTimeTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create(username='john.smith')
+        self.other_user = User.objects.create(username='jane.smith')
+        with usersmuggler.set_user(self.user):
+            self.books = [BookFactory(title='Macbeth'), BookFactory(title='Hamlet'), BookFactory(title='Othello')]
+
+    def set_titles(self, book: Book, *titles: str, user: User):
+        with freeze_time(self.frozen_time + timedelta(days=1)), usersmuggler.set_user(user):
+            for title in titles:
+                book.title = title
+                book.save()
+
+    def test_annotating_last_change(self):
+        self.set_titles(self.books[0], 'Macbeth II', user=self.other_user)
+        with usersmuggler.set_user(self.user):
+            self.books[1].title = 'Hamlet II'
+            self.books[1].save()
+
+        with self.assertNumQueries(1):
+            books = list(Book.objects.with_last_change().order_by('pk'))
+
+        self.assertListEqual([(book.last_change_date, book.last_change_user_id) for book in books], [
+            (self.frozen_time + timedelta(days=1), self.other_user.pk),
+            (self.frozen_time, self.user.pk),
+            (None, None),  # not changed since creation
+        ])
+
+    def test_prefetching_latest_history_entries(self):
+        self.set_titles(self.books[0], 'Macbeth II', 'Macbeth III', user=self.other_user)
+        self.set_titles(self.books[1], 'Hamlet II', user=self.other_user)
+
+        with self.assertNumQueries(3):
+            books = list(Book.objects.prefetch_history(limit=2).order_by('pk'))
+
+        for book in books:
+            self.assertListEqual(book.history, BookEditHistory.get_for(book)[:2])
+        self.assertListEqual([entry['new_value'] for entry in books[0].history], ['Macbeth III', 'Macbeth II'])
+        self.assertEqual(books[1].history[0]['new_value'], 'Hamlet II')
+
+    def test_prefetching_history_to_given_attribute(self):
+        books = Book.objects.filter(pk=self.books[2].pk).prefetch_history(limit=1, to_attr='last_changes')
+
+        self.assertListEqual(books[0].last_changes, BookEditHistory.get_for(self.books[2])[:1])
+
+    def test_history_in_separate_database_is_not_supported(self):
+        with self.assertRaises(NotSupportedError):
+            Note.objects.with_last_change()
+        with self.assertRaises(NotSupportedError):
+            list(Note.objects.prefetch_history())
@@ -0,0 +1,48 @@
+from django.contrib.auth.models import User
+
+from wicked_historian.usersmuggler import usersmuggler
+
+from testapp.factories import BookFactory
+from testapp.models import (
+    Book,
+    BookEditHistory,
+)
+from testapp.tests.base import FreezeTimeTestCase
+
+
+class LoadingWithoutHistoryTrackingTestCase(FreezeTimeTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create(username='john.smith')
+        with usersmuggler.set_user(self.user):
+            self.book = BookFactory(title='Macbeth', issue_year=1606)  # type: Book
+
+    def test_loading_instances_without_initial_values(self):
+        book = Book.objects.without_history_tracking().get(pk=self.book.pk)
+
+        self.assertEqual(book.title, 'Macbeth')
+        self.assertTrue(book._wicked_historian_untracked)
+        self.assertNotIn('_DiffableModel__initial', book.__dict__)
+        self.assertNotIn(id(book), Book._diff_locks)
+        self.assertFalse(Book.objects.get(pk=self.book.pk)._wicked_historian_untracked)
+
+    def test_saving_instance_loaded_without_tracking(self):
+        book = Book.objects.without_history_tracking().get(pk=self.book.pk)
+        Book.objects.filter(pk=self.book.pk).update(issue_year=1623)
+        with usersmuggler.set_user(self.user):
+            book.title = 'Hamlet'
+            book.save()
+
+        history = BookEditHistory.get_for(book)
+        self.assertEqual([(entry['field_verbose_name'], entry['old_value'], entry['new_value']) for entry in history], [
+            ('issue year', 1623, 1606),
+            ('title', 'Macbeth', 'Hamlet'),
+        ])
+        self.assertFalse(book._wicked_historian_untracked)
+        self.assertEqual(book.diff, {})
+
+    def test_loading_deferred_fields_of_instance_loaded_without_tracking(self):
+        book = Book.objects.without_history_tracking().only('id').get(pk=self.book.pk)
+
+        self.assertEqual(book.title, 'Macbeth')
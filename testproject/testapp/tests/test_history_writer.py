@@ -0,0 +1,100 @@
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.exceptions import ImproperlyConfigured
+from django.db import transaction
+from django.test import (
+    SimpleTestCase,
+    TransactionTestCase,
+)
+
+from wicked_historian.usersmuggler import usersmuggler
+from wicked_historian.utils import generate_history_class
+from wicked_historian.writer import HistoryWriter
+
+from testapp.factories import BookFactory
+from testapp.models import (
+    Book,
+    BookEditHistory,
+    Document,
+)
+
+
+class HistoryWriterTestCase(TransactionTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create(username='john.smith')
+        with usersmuggler.set_user(self.user):
+            self.book = BookFactory(title='Macbeth')  # type: Book
+        self.book = Book.objects.get(pk=self.book.pk)
+        self.writer = HistoryWriter(workers=2, max_queue_size=10, batch_size=3)
+        self.addCleanup(self.writer.shutdown)
+
+    def save_titles(self, *titles: str):
+        with mock.patch.object(BookEditHistory, 'HISTORY_WRITER', self.writer), usersmuggler.set_user(self.user):
+            for title in titles:
+                self.book.title = title
+                self.book.save()
+
+    def test_writing_entries_after_commit(self):
+        with transaction.atomic():
+            self.save_titles('Hamlet', 'Othello')
+            self.assertEqual(self.writer.get_metrics().queue_depth, 0)
+        self.writer.flush()
+
+        history = BookEditHistory.get_for(self.book)
+        self.assertListEqual([(entry['old_value'], entry['new_value']) for entry in history], [('Hamlet', 'Othello'), ('Macbeth', 'Hamlet')])
+        self.assertTrue(all(entry['user'] == self.user for entry in history))
+
+    def test_collecting_metrics(self):
+        self.save_titles('Hamlet', 'Othello', 'King Lear', 'Romeo and Juliet')
+        self.writer.flush()
+
+        metrics = self.writer.get_metrics()
+        self.assertEqual(metrics.queue_depth, 0)
+        self.assertEqual(metrics.written_entries, 4)
+        self.assertEqual(metrics.dropped_entries, 0)
+        self.assertEqual(metrics.failed_batches, 0)
+        self.assertGreaterEqual(metrics.max_latency, metrics.average_latency)
+
+    def test_dropping_entries_when_queue_is_full(self):
+        writer = HistoryWriter(workers=1, max_queue_size=1, block_timeout=0)
+        with mock.patch.object(writer, 'start'), self.assertLogs('wicked_historian.writer', 'WARNING'):  # no workers draining the queue
+            self.assertTrue(writer.submit(BookEditHistory, BookEditHistory(model=self.book, field='title:CharField')))
+            self.assertFalse(writer.submit(BookEditHistory, BookEditHistory(model=self.book, field='title:CharField')))
+
+        metrics = writer.get_metrics()
+        self.assertEqual(metrics.queue_depth, 1)
+        self.assertEqual(metrics.dropped_entries, 1)
+
+    def test_counting_failed_batches(self):
+        with self.assertLogs('wicked_historian.writer', 'ERROR'):
+            self.writer.submit(BookEditHistory, BookEditHistory(model_id=self.book.pk, field='title:CharField', user_id=-1))
+            self.writer.flush()
+
+        metrics = self.writer.get_metrics()
+        self.assertEqual(metrics.failed_batches, 1)
+        self.assertEqual(metrics.failed_entries, 1)
+        self.assertFalse(BookEditHistory.objects.exists())
+
+    def test_writing_submitted_entries_on_shutdown(self):
+        self.save_titles('Hamlet', 'Othello')
+        self.writer.shutdown()
+
+        self.assertEqual(BookEditHistory.objects.filter(model=self.book).count(), 2)
+        self.assertEqual(self.writer.get_metrics().written_entries, 2)
+
+
+class HistoryWriterConfigurationTestCase(SimpleTestCase):
+
+    def test_history_writer_cannot_be_used_with_features_reading_previous_entries(self):
+        with self.assertRaises(ImproperlyConfigured):
+            generate_history_class(Document, __name__, abstract=True, derive_old_values=True, history_writer=HistoryWriter())
+
+    def test_history_writer_cannot_be_used_with_tracked_relations(self):
+        with self.assertRaises(ImproperlyConfigured):
+            generate_history_class(Book, __name__, abstract=True, history_writer=HistoryWriter())
+        generate_history_class(
+            Book, __name__, abstract=True, excluded_fields=['authors', 'pirates', 'printers', 'chapter_set'], history_writer=HistoryWriter(),
+        )
@@ -7,6 +7,9 @@ import wicked_historian.checks as checks
 from testapp.models import (
     Book,
     BookEditHistory,
+    DocumentEditHistory,
+    NoteEditHistory,
+    ReviewEditHistory,
 )
 from testapp.tests.base import FreezeTimeTestCase
 
@@ -67,8 +70,13 @@ class IncrementalChangesCheckTestCase(FreezeTimeTestCase):
 
     def test_check_incremental_changes_in_choices_of_fields__is_any_migration_missing(self):
         with mock.patch('wicked_historian.checks.is_any_migration_missing', return_value=True):
-            messages = [m.id for m in checks.check_incremental_changes_in_choices_of_fields()]
-            self.assertListEqual(messages, ['wicked_historian.W002'])
+            messages = [(m.id, m.obj) for m in checks.check_incremental_changes_in_choices_of_fields()]
+            self.assertListEqual(messages, [
+                ('wicked_historian.W002', BookEditHistory),
+                ('wicked_historian.W002', DocumentEditHistory),
+                ('wicked_historian.W002', NoteEditHistory),
+                ('wicked_historian.W002', ReviewEditHistory),
+            ])
 
     def test_check_incremental_changes_in_choices_of_fields__detect_removed_choices_moved_to_obsolete(self):  # pylint: disable=invalid-name
         with mock.patch('wicked_historian.checks.is_any_migration_missing', return_value=False), \
@@ -170,8 +178,13 @@ class IncrementalChangesCheckTestCase(FreezeTimeTestCase):
 
     def test_check_incremental_changes_in_field_choices__is_any_migration_missing(self):
         with mock.patch('wicked_historian.checks.is_any_migration_missing', return_value=True):
-            messages = [m.id for m in checks.check_incremental_changes_in_field_choices()]
-            self.assertListEqual(messages, ['wicked_historian.W001'])
+            messages = [(m.id, m.obj) for m in checks.check_incremental_changes_in_field_choices()]
+            self.assertListEqual(messages, [
+                ('wicked_historian.W001', BookEditHistory),
+                ('wicked_historian.W001', DocumentEditHistory),
+                ('wicked_historian.W001', NoteEditHistory),
+                ('wicked_historian.W001', ReviewEditHistory),
+            ])
 
     def test_check_incremental_changes_in_field_choices__no_missing_field(self):
         with mock.patch('wicked_historian.checks.is_any_migration_missing', return_value=False), \
@@ -182,5 +195,10 @@ class IncrementalChangesCheckTestCase(FreezeTimeTestCase):
     def test_check_incremental_changes_in_field_choices__missing_field(self):
         with mock.patch('wicked_historian.checks.is_any_migration_missing', return_value=False), \
                 mock.patch('wicked_historian.checks.get_removed_choices', return_value=['field_one']):
-            messages = [m.id for m in checks.check_incremental_changes_in_field_choices()]
-            self.assertListEqual(messages, ['wicked_historian.E002'])
+            messages = [(m.id, m.obj) for m in checks.check_incremental_changes_in_field_choices()]
+            self.assertListEqual(messages, [
+                ('wicked_historian.E002', BookEditHistory),
+                ('wicked_historian.E002', DocumentEditHistory),
+                ('wicked_historian.E002', NoteEditHistory),
+                ('wicked_historian.E002', ReviewEditHistory),
+            ])
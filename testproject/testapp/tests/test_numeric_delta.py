@@ -0,0 +1,86 @@
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import call_command
+from django.db import models
+from django.test import SimpleTestCase
+from freezegun import freeze_time
+
+from wicked_historian.usersmuggler import usersmuggler
+from wicked_historian.utils import generate_history_class
+
+from testapp.models import (
+    Author,
+    Book,
+    Review,
+    ReviewEditHistory,
+)
+from testapp.tests.base import FreezeTimeTestCase
+
+
+class NumericDeltaTestCase(FreezeTimeTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create(username='john.smith')
+        self.author = Author.objects.create(name='William Shakespeare')
+        with usersmuggler.set_user(self.user):
+            self.review = Review.objects.create(author=self.author, rating=Decimal('4.5'))
+        self.review = Review.objects.get(pk=self.review.pk)
+
+    def rate(self, *ratings: str, days: int = 0):
+        with freeze_time(self.frozen_time + timedelta(days=days)), usersmuggler.set_user(self.user):
+            for rating in ratings:
+                self.review.rating = Decimal(rating)
+                self.review.save()
+        call_command('materialize_staged_history', stdout=StringIO())
+
+    def test_storing_deltas_of_numeric_fields(self):
+        self.rate('3.0', '3.5')
+        with usersmuggler.set_user(self.user):
+            self.review.published_at = self.frozen_time
+            self.review.save()
+        call_command('materialize_staged_history', stdout=StringIO())
+
+        self.assertListEqual(
+            [(entry.field_name, entry.delta) for entry in ReviewEditHistory.objects.order_by('id')],
+            [('rating', Decimal('-1.5')), ('rating', Decimal('0.5')), ('published_at', None)],
+        )
+
+    def test_aggregating_deltas_per_period(self):
+        self.rate('3.0', '3.5')
+        self.rate('5.0', days=1)
+        self.rate('1.0', days=40)
+
+        self.assertListEqual(ReviewEditHistory.get_delta_aggregates('rating'), [
+            (self.frozen_time.replace(hour=0, minute=0), Decimal('-1.0')),
+            (self.frozen_time.replace(hour=0, minute=0) + timedelta(days=1), Decimal('1.5')),
+            (self.frozen_time.replace(hour=0, minute=0) + timedelta(days=40), Decimal('-4.0')),
+        ])
+        self.assertListEqual(
+            [total for _, total in ReviewEditHistory.get_delta_aggregates('rating', 'month', ReviewEditHistory.objects.filter(user=self.user))],
+            [Decimal('0.5'), Decimal('-4.0')],
+        )
+
+    def test_aggregating_deltas_of_other_fields(self):
+        with self.assertRaises(ImproperlyConfigured):
+            ReviewEditHistory.get_delta_aggregates('published_at')
+
+
+class NumericDeltaFieldTestCase(SimpleTestCase):
+
+    def get_delta_field(self, *names: str) -> models.Field:
+        return generate_history_class(Book, __name__, abstract=True, numeric_delta_fields=names)._meta.get_field('delta')
+
+    def test_delta_field_fits_differences_of_values(self):
+        self.assertIsInstance(self.get_delta_field('issue_year', 'number_of_downloads_on_torrents'), models.BigIntegerField)
+        delta_field = self.get_delta_field('issue_year', 'cash_lost_because_of_piracy')
+        self.assertIsInstance(delta_field, models.DecimalField)
+        self.assertEqual((delta_field.max_digits, delta_field.decimal_places), (16, 2))
+
+    def test_numeric_delta_fields_have_to_be_numeric(self):
+        with self.assertRaises(ImproperlyConfigured):
+            self.get_delta_field('title')
@@ -0,0 +1,95 @@
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+
+from wicked_historian.representation import (
+    RelatedObjectRepresentation,
+    select_representations,
+)
+from wicked_historian.usersmuggler import usersmuggler
+from wicked_historian.utils import DefaultFieldValueMapper
+
+from testapp.factories import (
+    BookFactory,
+    BookShelfSlotFactory,
+)
+from testapp.models import (
+    Author,
+    Book,
+    BookEditHistory,
+    BookShelfSlot,
+)
+
+
+class RelatedObjectRepresentationTestCase(TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create(username='john.smith')
+        self.slot = BookShelfSlotFactory(shelf_number=1, slot_number=2)
+        self.authors = [Author.objects.create(name='William Shakespeare'), Author.objects.create(name='Christopher Marlowe')]
+        self.mapper = DefaultFieldValueMapper()
+
+    def test_foreign_key_representation_is_loaded_with_single_query(self):
+        with self.assertNumQueries(1):
+            representation = self.mapper(Book._meta.get_field('book_shelf_slot'), self.slot.pk)
+
+        self.assertDictEqual(representation, {'pk': self.slot.pk, 'str': str(self.slot)})
+
+    def test_representing_deleted_object(self):
+        with self.assertRaises(BookShelfSlot.DoesNotExist):
+            self.mapper(Book._meta.get_field('book_shelf_slot'), -1)
+
+    def test_representing_objects_by_primary_keys_only(self):
+        with mock.patch.object(Author._meta, 'history_representation', RelatedObjectRepresentation(), create=True):
+            with self.assertNumQueries(0):
+                representation = self.mapper(Book._meta.get_field('authors'), self.authors)
+            with usersmuggler.set_user(self.user):
+                book = BookFactory()
+                book.authors.set(self.authors)
+
+        expected_representation = [{'pk': author.pk, 'str': str(author.pk)} for author in sorted(self.authors, key=lambda author: author.pk)]
+        self.assertListEqual(representation, expected_representation)
+        self.assertListEqual(BookEditHistory.get_for(book)[0]['new_value'], expected_representation)
+
+    def test_many_to_many_representations_are_loaded_with_single_query(self):
+        with mock.patch.object(Author._meta, 'history_representation', RelatedObjectRepresentation('name'), create=True):
+            with self.assertNumQueries(1):
+                representation = self.mapper(Book._meta.get_field('authors'), self.authors)
+
+        self.assertListEqual(representation, [
+            {'pk': author.pk, 'str': author.name} for author in sorted(self.authors, key=lambda author: author.pk)
+        ])
+
+    def test_many_to_many_representations_selected_with_instances(self):
+        with mock.patch.object(Author._meta, 'history_representation', RelatedObjectRepresentation('name'), create=True):
+            authors = list(select_representations(Author.objects.all()))
+            with self.assertNumQueries(0):
+                representation = self.mapper(Book._meta.get_field('authors'), authors)
+            with usersmuggler.set_user(self.user):
+                book = BookFactory()
+                book.authors.set(self.authors)
+
+        expected_representation = [{'pk': author.pk, 'str': author.name} for author in sorted(self.authors, key=lambda author: author.pk)]
+        self.assertListEqual(representation, expected_representation)
+        self.assertListEqual(BookEditHistory.get_for(book)[0]['new_value'], expected_representation)
+
+    def test_representing_deleted_many_to_many_objects(self):
+        deleted_author = Author.objects.create(name='Thomas Kyd')
+        deleted_author_pk = deleted_author.pk
+        deleted_author.delete()
+        deleted_author.pk = deleted_author_pk
+
+        with mock.patch.object(Author._meta, 'history_representation', RelatedObjectRepresentation('name'), create=True):
+            representation = self.mapper(Book._meta.get_field('authors'), [self.authors[0], deleted_author])
+
+        self.assertListEqual(representation, [
+            {'pk': self.authors[0].pk, 'str': 'William Shakespeare'},
+            {'pk': deleted_author_pk, 'str': str(deleted_author_pk)},
+        ])
+
+    def test_default_template_joins_values(self):
+        representation = RelatedObjectRepresentation('shelf_number', 'slot_number')
+
+        self.assertDictEqual(representation.get_representations(BookShelfSlot, [self.slot.pk]), {self.slot.pk: '1 2'})
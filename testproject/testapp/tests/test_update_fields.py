@@ -0,0 +1,51 @@
+from django.contrib.auth.models import User
+
+from wicked_historian.usersmuggler import usersmuggler
+
+from testapp.factories import (
+    BookFactory,
+    LanguageFactory,
+)
+from testapp.models import (
+    Book,
+    BookEditHistory,
+)
+from testapp.tests.base import FreezeTimeTestCase
+
+
+class UpdateFieldsTestCase(FreezeTimeTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create(username='john.smith')
+        with usersmuggler.set_user(self.user):
+            self.book = BookFactory(title='Macbeth', issue_year=1606)  # type: Book
+            self.book = Book.objects.get(pk=self.book.pk)
+
+    def get_changes(self):
+        return [(entry['field_verbose_name'], entry['old_value'], entry['new_value']) for entry in BookEditHistory.get_for(self.book)]
+
+    def test_creating_history_of_updated_fields_only(self):
+        with usersmuggler.set_user(self.user):
+            self.book.title = 'Hamlet'
+            self.book.issue_year = 1603
+            self.book.language = LanguageFactory(name='English')
+            with self.assertNumQueries(2):  # update of the book and insert of the entry
+                self.book.save(update_fields=['title'])
+            self.assertEqual(self.get_changes(), [('title', 'Macbeth', 'Hamlet')])
+            self.assertEqual(set(self.book.changed_fields), {'issue_year', 'language'})
+
+            # changes of fields which were not saved are pending for the next save
+            self.book.save(update_fields=['language_id'])
+            self.assertEqual(self.get_changes()[0][0], 'language')
+            self.book.save()
+        self.assertEqual(self.get_changes()[0], ('issue year', 1606, 1603))
+        self.assertEqual(len(self.get_changes()), 3)
+
+    def test_saving_with_empty_update_fields(self):
+        with usersmuggler.set_user(self.user):
+            self.book.title = 'Hamlet'
+            self.book.save()
+            self.book.issue_year = 1603
+            self.book.save(update_fields=[])
+        self.assertEqual(self.get_changes(), [('title', 'Macbeth', 'Hamlet')])
@@ -0,0 +1,117 @@
+from collections import namedtuple
+from typing import (
+    Any,
+    Dict,
+    List,
+)
+
+from django.apps import apps
+from django.db import (
+    router,
+    transaction,
+)
+from django.db.models import Max
+from django.utils import timezone
+
+from .models import (
+    ChangeFeedCursor,
+    ChangeFeedEntry,
+)
+
+
+SEQUENCER_LOCK_NAME = '__sequencer__'
+
+ChangeFeedItem = namedtuple('ChangeFeedItem', 'position history_model entry')
+
+
+def sequence_entries(batch_size: int = 1000) -> int:
+    """Assign consecutive positions to committed change feed entries which do not have them yet.
+
+    Entries are sequenced by a single sequencer at a time (serialized by a lock row), so positions are assigned in order
+    of visibility of entries and there are no gaps which could be filled by transactions committed later.
+    """
+    database = router.db_for_write(ChangeFeedEntry)
+    with transaction.atomic(using=database):
+        ChangeFeedCursor.objects.using(database).select_for_update().get_or_create(name=SEQUENCER_LOCK_NAME)
+        last_position = ChangeFeedEntry.objects.using(database).aggregate(last_position=Max('position'))['last_position'] or 0
+        entry_ids = ChangeFeedEntry.objects.using(database).filter(position__isnull=True).order_by('id').values_list('id', flat=True)
+        entries = [
+            ChangeFeedEntry(id=entry_id, position=position)
+            for position, entry_id in enumerate(entry_ids[:batch_size], start=last_position + 1)
+        ]
+        ChangeFeedEntry.objects.using(database).bulk_update(entries, ['position'])
+    return len(entries)
+
+
+class ChangeFeed:
+
+    """Consumer of history entries of all history models with change feed, read in batches after a durable cursor.
+
+    Entries are delivered at least once - the cursor is moved by `commit` after the batch is processed. Entries updated after
+    their creation (squashed m2m changes) are delivered again.
+    """
+
+    def __init__(self, name: str):
+        if name == SEQUENCER_LOCK_NAME:
+            raise ValueError('{} is a reserved name'.format(name))
+        self.name = name
+        self.database = router.db_for_write(ChangeFeedEntry)
+
+    @property
+    def position(self) -> int:
+        cursor = ChangeFeedCursor.objects.using(self.database).filter(name=self.name).values_list('position', flat=True).first()
+        return cursor or 0
+
+    def read(self, batch_size: int = 1000) -> List[ChangeFeedItem]:
+        """Get a batch of items after the cursor position. Items of deleted history entries have no entry."""
+        sequence_entries(batch_size)
+        feed_entries = list(
+            ChangeFeedEntry.objects.using(self.database)
+            .filter(position__gt=self.position)
+            .order_by('position')
+            .values_list('position', 'history_model', 'entry_id')[:batch_size]
+        )
+
+        entry_ids_by_history_model = {}  # type: Dict[str, List[int]]
+        for _, history_model, entry_id in feed_entries:
+            entry_ids_by_history_model.setdefault(history_model, []).append(entry_id)
+        entries_by_history_model = {}  # type: Dict[str, Dict[int, Any]]
+        for label, entry_ids in entry_ids_by_history_model.items():
+            history_model = apps.get_model(label)
+            # entries are read from the database they are written to, as a replica may not have them yet
+            queryset = history_model.objects.using(router.db_for_write(history_model))
+            if history_model.DERIVE_OLD_VALUES:
+                queryset = history_model.annotate_previous_new_values(queryset)
+            entries = queryset.in_bulk(entry_ids)
+            if history_model.DATABASE is not None:
+                history_model.load_users(list(entries.values()))
+            entries_by_history_model[label] = entries
+
+        return [
+            ChangeFeedItem(position, history_model, entries_by_history_model[history_model].get(entry_id))
+            for position, history_model, entry_id in feed_entries
+        ]
+
+    def commit(self, position: int):
+        """Move the cursor to the position of the last processed item."""
+        ChangeFeedCursor.objects.using(self.database).update_or_create(
+            name=self.name,
+            defaults={'position': position, 'updated_at': timezone.now()},
+        )
+
+
+def get_item_data(item: ChangeFeedItem, file_urls: bool = True) -> Dict[str, Any]:
+    """Get a JSON serializable form of the change feed item."""
+    entry = item.entry
+    history_entry = next(entry.get_history_entries([entry], file_urls=file_urls))
+    return {
+        'position': item.position,
+        'history_model': item.history_model,
+        'id': entry.pk,
+        'model_id': entry.model_id,
+        'user_id': entry.user_id,
+        'change_date': entry.change_date.isoformat(),
+        'field': entry.field_name,
+        'old_value': history_entry['old_value'],
+        'new_value': history_entry['new_value'],
+    }
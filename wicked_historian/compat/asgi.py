@@ -0,0 +1,45 @@
+import asyncio
+import contextvars
+import inspect
+from functools import (
+    partial,
+    wraps,
+)
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+)
+
+__all__ = (
+    'markcoroutinefunction',
+    'sync_to_async',
+)
+
+
+try:
+    from asgiref.sync import sync_to_async
+except ImportError:  # asgiref is required by Django since 3.0 only
+
+    def sync_to_async(func: Callable) -> Callable[..., Awaitable[Any]]:
+        """Run the function in a thread of the default executor, in a copy of the current context."""
+
+        @wraps(func)
+        async def wrapper(*args, **kwargs):
+            context = contextvars.copy_context()
+            return await asyncio.get_running_loop().run_in_executor(None, partial(context.run, func, *args, **kwargs))
+
+        return wrapper
+
+
+try:
+    from asgiref.sync import markcoroutinefunction
+except ImportError:  # added in asgiref 3.6
+    if hasattr(inspect, 'markcoroutinefunction'):  # Python 3.12+
+        markcoroutinefunction = inspect.markcoroutinefunction
+    else:
+
+        def markcoroutinefunction(func: Callable) -> Callable:
+            """Mark the callable as a coroutine function for `asyncio.iscoroutinefunction`."""
+            func._is_coroutine = asyncio.coroutines._is_coroutine  # pylint: disable=protected-access
+            return func
@@ -1,7 +1,8 @@
-import json
-
 from django_mysql.models.fields import JSONField as MySQLJSONField
-from wicked_historian.encoder import JSONEncoder
+from wicked_historian.encoder import (
+    JSONEncoder,
+    get_serializer,
+)
 
 
 __all__ = (
@@ -13,15 +14,16 @@ class JSONField(MySQLJSONField):
 
     def __init__(self, *args, **kwargs):
         self.encoder = kwargs.pop('encoder', JSONEncoder)
+        self.serializer = get_serializer(self.encoder)
         super().__init__(*args, **kwargs)
 
     def get_prep_value(self, value):
         if value is not None and not isinstance(value, str):
-            return json.dumps(value, cls=self.encoder, allow_nan=False)
+            return self.serializer(value)
 
         return value
 
     def get_db_prep_value(self, value, connection, prepared=False):
         if not prepared and value is not None:
-            return json.dumps(value, cls=self.encoder, allow_nan=False)
+            return self.serializer(value)
         return value
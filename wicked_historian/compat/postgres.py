@@ -1,8 +1,10 @@
-import json
-
 from django.contrib.postgres.fields import JSONField as PostgresJSONField
+from psycopg2.extras import Json
 
-from wicked_historian.encoder import JSONEncoder
+from wicked_historian.encoder import (
+    JSONEncoder,
+    get_serializer,
+)
 
 
 __all__ = (
@@ -15,4 +17,9 @@ class JSONField(PostgresJSONField):
     def __init__(self, *args, **kwargs):
         kwargs['encoder'] = kwargs.get('encoder', JSONEncoder)
         super().__init__(*args, **kwargs)
+        self.serializer = get_serializer(self.encoder)
 
+    def get_prep_value(self, value):
+        if value is not None:
+            return Json(value, dumps=self.serializer)
+        return value
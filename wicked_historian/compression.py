@@ -0,0 +1,34 @@
+import base64
+import json
+import zlib
+from typing import Any
+
+from .encoder import get_serializer
+
+
+COMPRESSED_TAG = '__wicked_historian_compressed__'
+
+serialize = get_serializer()
+
+
+def is_compressed(value: Any) -> bool:
+    return type(value) is dict and COMPRESSED_TAG in value
+
+
+def compress_value(value: Any, threshold: int) -> Any:
+    """Get a compressed envelope of the value if its JSON is longer than the threshold and compression makes it shorter."""
+    if is_compressed(value):
+        return value
+    serialized_value = serialize(value)
+    if len(serialized_value) <= threshold:
+        return value
+    compressed_value = base64.b64encode(zlib.compress(serialized_value.encode())).decode('ascii')
+    if len(compressed_value) >= len(serialized_value):
+        return value
+    return {COMPRESSED_TAG: compressed_value}
+
+
+def decompress_value(value: Any) -> Any:
+    if is_compressed(value):
+        return json.loads(zlib.decompress(base64.b64decode(value[COMPRESSED_TAG])).decode())
+    return value
@@ -0,0 +1,76 @@
+import base64
+import hashlib
+import json
+from typing import (
+    Any,
+    Dict,
+    Iterable,
+    Optional,
+)
+
+from django.db import (
+    IntegrityError,
+    router,
+    transaction,
+)
+from django.utils import timezone
+
+from .encoder import get_serializer
+from .models import StoredValue
+
+
+STORED_TAG = '__wicked_historian_stored__'
+
+serialize = get_serializer()
+
+
+def is_stored_reference(value: Any) -> bool:
+    return type(value) is dict and STORED_TAG in value
+
+
+def get_digest(content: bytes) -> str:
+    return hashlib.sha256(content).hexdigest()
+
+
+def store_content(content: bytes, binary: bool) -> Dict[str, Any]:
+    """Store the content unless it is already stored and get a reference to it."""
+    digest = get_digest(content)
+    if not StoredValue.objects.filter(digest=digest).update(referenced_at=timezone.now()):
+        try:
+            with transaction.atomic(using=router.db_for_write(StoredValue)):
+                StoredValue.objects.create(digest=digest, content=content)
+        except IntegrityError:
+            pass  # the same content has been stored concurrently
+    return {STORED_TAG: {'digest': digest, 'binary': binary}}
+
+
+def store_bytes(value: bytes) -> Dict[str, Any]:
+    return store_content(bytes(value), binary=True)
+
+
+def store_representation(value: Any) -> Dict[str, Any]:
+    return store_content(serialize(value).encode(), binary=False)
+
+
+def get_referenced_digests(values: Iterable[Any]) -> Iterable[str]:
+    return {value[STORED_TAG]['digest'] for value in values if is_stored_reference(value)}
+
+
+def load_contents(digests: Iterable[str]) -> Dict[str, bytes]:
+    """Load stored contents in a single query."""
+    return {digest: bytes(content) for digest, content in StoredValue.objects.filter(digest__in=digests).values_list('digest', 'content')}
+
+
+def get_stored_representation(value: Any, contents: Optional[Dict[str, bytes]] = None) -> Any:
+    """Get the representation of the value from its reference. Contents missing in `contents` are loaded on demand."""
+    if not is_stored_reference(value):
+        return value
+
+    reference = value[STORED_TAG]
+    if contents is not None and reference['digest'] in contents:
+        content = contents[reference['digest']]
+    else:
+        content = bytes(StoredValue.objects.values_list('content', flat=True).get(digest=reference['digest']))
+    if reference['binary']:
+        return base64.b64encode(content).decode('utf-8')
+    return json.loads(content.decode())
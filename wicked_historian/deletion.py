@@ -1,7 +1,8 @@
-import threading
+from contextvars import ContextVar
 from typing import (
     TYPE_CHECKING,
     Any,
+    FrozenSet,
     Tuple,
     Type,
 )
@@ -11,17 +12,25 @@ if TYPE_CHECKING:
     from django.db.models import Model
 
 
-class DeletionGuard(threading.local):
+class DeletionGuard:
+
+    """Registry of instances being deleted - separate for every thread and asyncio task."""
 
     def __init__(self):
-        super().__init__()
-        self.models_during_deletion = set()
+        # sets are immutable, so that contexts copied for new asyncio tasks do not share them
+        self._storage = ContextVar('wicked_historian_models_during_deletion_%d' % id(self), default=frozenset())  # type: ContextVar
+
+    @property
+    def models_during_deletion(self) -> FrozenSet[Tuple[Type['Model'], Any]]:
+        return self._storage.get()
 
     def start_deletion(self, identifier: Tuple[Type['Model'], Any]):
-        self.models_during_deletion.add(identifier)
+        self._storage.set(self.models_during_deletion | {identifier})
 
     def end_deletion(self, identifier: Tuple[Type['Model'], Any]):
-        self.models_during_deletion.remove(identifier)
+        if identifier not in self.models_during_deletion:
+            raise KeyError(identifier)
+        self._storage.set(self.models_during_deletion - {identifier})
 
     def create_identifier(self, instance: 'Model') -> Tuple[Type['Model'], Any]:
         return instance.__class__, instance.pk
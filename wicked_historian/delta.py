@@ -0,0 +1,193 @@
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Dict,
+    List,
+    Optional,
+    Tuple,
+    Type,
+)
+
+from django.conf import settings
+from django.db import router
+
+from .compression import decompress_value
+
+if TYPE_CHECKING:
+    from django.db.models import Model
+    from .models import BaseEditHistory
+
+
+logger = logging.getLogger(__name__)
+
+DELTA_TAG = '__wicked_historian_delta__'
+
+Patch = List[Any]
+
+
+def is_delta_envelope(value: Any) -> bool:
+    return type(value) is dict and DELTA_TAG in value
+
+
+def get_digest(value: str) -> str:
+    return hashlib.sha1(value.encode()).hexdigest()
+
+
+def get_version(stored_new_value: Any) -> Tuple[Optional[str], Optional[int]]:
+    """Get the digest and the depth of a stored new value, kept in their own columns so that writes do not load the value."""
+    if not is_delta_envelope(stored_new_value):
+        return None, None
+    return stored_new_value[DELTA_TAG]['digest'], stored_new_value[DELTA_TAG]['depth']
+
+
+def get_common_prefix_length(first: str, second: str) -> int:
+    low, high = 0, min(len(first), len(second))
+    while low < high:
+        middle = (low + high + 1) // 2
+        if first[:middle] == second[:middle]:
+            low = middle
+        else:
+            high = middle - 1
+    return low
+
+
+def make_patch(old_value: str, new_value: str) -> Patch:
+    """Make a patch replacing the part of the old value between common prefix and common suffix."""
+    prefix_length = get_common_prefix_length(old_value, new_value)
+    suffix_length = get_common_prefix_length(old_value[prefix_length:][::-1], new_value[prefix_length:][::-1])
+    return [prefix_length, suffix_length, new_value[prefix_length:len(new_value) - suffix_length]]
+
+
+def apply_patch(old_value: str, patch: Patch) -> str:
+    prefix_length, suffix_length, replacement = patch
+    return old_value[:prefix_length] + replacement + old_value[len(old_value) - suffix_length:]
+
+
+class ValuesCache:
+
+    """Thread safe LRU cache of reconstructed values keyed by their digests, limited by the number and the total length of values."""
+
+    def __init__(self, max_size: int, max_length: int):
+        self.max_size = max_size
+        self.max_length = max_length
+        self._values = OrderedDict()  # type: OrderedDict
+        self._length = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            try:
+                self._values.move_to_end(key)
+            except KeyError:
+                return None
+            return self._values[key]
+
+    def set(self, key: str, value: str):
+        if len(value) > self.max_length:
+            return
+        with self._lock:
+            previous_value = self._values.pop(key, None)
+            if previous_value is not None:
+                self._length -= len(previous_value)
+            self._values[key] = value
+            self._length += len(value)
+            while len(self._values) > self.max_size or self._length > self.max_length:
+                self._length -= len(self._values.popitem(last=False)[1])
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+            self._length = 0
+
+
+reconstructed_values_cache = ValuesCache(
+    getattr(settings, 'WICKED_HISTORIAN_DELTA_CACHE_SIZE', 128),
+    getattr(settings, 'WICKED_HISTORIAN_DELTA_CACHE_MAX_LENGTH', 16 * 1024 * 1024),
+)
+
+
+class DeltaStorage:
+
+    """Storage of field values as patches against previous versions.
+
+    The old value of an entry is stored as a reference to the previous entry of the same instance and field, the new value as a patch
+    against the old one. Every `keyframe_interval` versions the new value is stored in full, so that reconstructing a value takes at most
+    `keyframe_interval` patches. If the old value doesn't match the previous entry, both values are stored in full.
+    """
+
+    def __init__(self, keyframe_interval: int):
+        self.keyframe_interval = keyframe_interval
+
+    def prepare_values(
+            self,
+            history_class: Type['BaseEditHistory'],
+            instance: 'Model',
+            field_id: str,
+            old_value: Any,
+            new_value: Any,
+    ) -> Tuple[Any, Any]:
+        """Get values to be stored in a new history entry."""
+        if type(new_value) is not str:
+            return old_value, new_value
+
+        new_envelope = {'digest': get_digest(new_value), 'depth': 0}  # type: Dict[str, Any]
+        database = router.db_for_write(history_class)
+        previous_entries = history_class.objects.using(database).filter(model=instance, field=field_id)
+        previous_id, previous_digest, previous_depth = previous_entries.order_by('-id').values_list(
+            'id', 'delta_digest', 'delta_depth',
+        ).first() or (None, None, None)
+        if previous_id is not None and previous_digest is None:
+            # entries stored before their versions were kept in columns (or with values other than texts)
+            stored_new_value = history_class.objects.using(database).values_list('new_value', flat=True).get(pk=previous_id)
+            previous_digest, previous_depth = get_version(decompress_value(stored_new_value))
+        if previous_digest is not None and type(old_value) is str and previous_digest == get_digest(old_value):
+            depth = previous_depth + 1
+            if depth < self.keyframe_interval:
+                new_envelope['depth'] = depth
+                new_envelope['patch'] = make_patch(old_value, new_value)
+            else:
+                new_envelope['value'] = new_value
+            return {DELTA_TAG: {'previous': previous_id, 'digest': previous_digest}}, {DELTA_TAG: new_envelope}
+
+        new_envelope['value'] = new_value
+        return old_value, {DELTA_TAG: new_envelope}
+
+
+def get_old_value(history_class: Type['BaseEditHistory'], stored_old_value: Any) -> Any:
+    """Reconstruct the old value of an entry from its stored form - None if an entry it is reconstructed from was deleted."""
+    if not is_delta_envelope(stored_old_value):
+        return stored_old_value
+
+    reference = stored_old_value[DELTA_TAG]
+    value = reconstructed_values_cache.get(reference['digest'])
+    if value is None:
+        try:
+            stored_values = history_class.objects.values_list('old_value', 'new_value').get(pk=reference['previous'])
+        except history_class.DoesNotExist:
+            logger.warning('Cannot reconstruct a value of %s - entry %s was deleted', history_class.__name__, reference['previous'])
+            return None
+        value = get_new_value(history_class, *map(decompress_value, stored_values))
+    return value
+
+
+def get_new_value(history_class: Type['BaseEditHistory'], stored_old_value: Any, stored_new_value: Any) -> Any:
+    """Reconstruct the new value of an entry from its stored form."""
+    if not is_delta_envelope(stored_new_value):
+        return stored_new_value
+
+    envelope = stored_new_value[DELTA_TAG]
+    value = reconstructed_values_cache.get(envelope['digest'])
+    if value is None:
+        if 'value' in envelope:
+            value = envelope['value']
+        else:
+            old_value = get_old_value(history_class, stored_old_value)
+            if old_value is None:
+                return None  # the patch cannot be applied
+            value = apply_patch(old_value, envelope['patch'])
+        reconstructed_values_cache.set(envelope['digest'], value)
+    return value
@@ -1,4 +1,14 @@
 import json
+from functools import partial
+from json.encoder import encode_basestring_ascii
+from typing import (
+    Any,
+    Callable,
+    Type,
+)
+
+from django.conf import settings
+from django.utils.module_loading import import_string
 
 
 JSON_NULL = object()
@@ -10,3 +20,35 @@ class JSONEncoder(json.JSONEncoder):
         if obj is JSON_NULL:
             return None
         return super(JSONEncoder, self).default(obj)
+
+
+_encoder = JSONEncoder(allow_nan=False)
+
+
+def dumps(value: Any) -> str:
+    """Serialize a history value to the same JSON as `json.dumps(value, cls=JSONEncoder, allow_nan=False)`.
+
+    Values produced by field value mappers are mostly strings, integers and nulls - those are serialized directly,
+    other values are serialized by a single, reused encoder instance.
+    """
+    value_type = type(value)
+    if value_type is str:
+        return encode_basestring_ascii(value)
+    if value_type is int:
+        return int.__repr__(value)
+    if value is JSON_NULL or value is None:
+        return 'null'
+    if value_type is bool:
+        return 'true' if value else 'false'
+    return _encoder.encode(value)
+
+
+def get_serializer(encoder: Type[json.JSONEncoder] = JSONEncoder) -> Callable[[Any], str]:
+    """Get a function serializing history values.
+
+    The serializer configured with `WICKED_HISTORIAN_JSON_SERIALIZER` setting is used with the default encoder,
+    any other encoder is used by `json.dumps`.
+    """
+    if encoder is JSONEncoder:
+        return import_string(getattr(settings, 'WICKED_HISTORIAN_JSON_SERIALIZER', 'wicked_historian.encoder.dumps'))
+    return partial(json.dumps, cls=encoder, allow_nan=False)
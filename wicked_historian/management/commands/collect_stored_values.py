@@ -0,0 +1,49 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import router
+from django.utils import timezone
+
+from wicked_historian.compression import decompress_value
+from wicked_historian.content_store import get_referenced_digests
+from wicked_historian.models import (
+    BaseEditHistory,
+    StoredValue,
+)
+from wicked_historian.utils import get_concrete_model_subclasses
+
+
+class Command(BaseCommand):
+
+    help = 'Delete stored values of content addressed fields which are not referenced by any history entry.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--min-age', type=int, default=60,
+            help='Minimal number of minutes since the last reference of a value to delete it. '
+                 'Protects values referenced by entries being created during the collection.',
+        )
+        parser.add_argument('--batch-size', type=int, default=1000, help='Number of values deleted in a single query.')
+
+    def handle(self, *args, **options):
+        threshold = timezone.now() - timedelta(minutes=options['min_age'])
+        database = router.db_for_write(StoredValue)
+        referenced_digests = set()
+        for history_model in get_concrete_model_subclasses(BaseEditHistory):
+            values = history_model.objects.using(router.db_for_write(history_model)).values_list('old_value', 'new_value')
+            values = values.iterator(chunk_size=options['batch_size'])
+            referenced_digests.update(get_referenced_digests(
+                decompress_value(value) for values_pair in values for value in values_pair
+            ))
+
+        unreferenced_digests = [
+            digest
+            for digest in StoredValue.objects.using(database).filter(referenced_at__lt=threshold).values_list('digest', flat=True).iterator()
+            if digest not in referenced_digests
+        ]
+        deleted_count = 0
+        for start in range(0, len(unreferenced_digests), options['batch_size']):
+            batch = unreferenced_digests[start:start + options['batch_size']]
+            # values referenced again in the meantime have their reference date refreshed
+            deleted_count += StoredValue.objects.using(database).filter(digest__in=batch, referenced_at__lt=threshold).delete()[0]
+        self.stdout.write('Deleted {} unreferenced stored values.'.format(deleted_count))
@@ -0,0 +1,70 @@
+from django.apps import apps
+from django.core.management.base import (
+    BaseCommand,
+    CommandError,
+)
+from django.db import (
+    router,
+    transaction,
+)
+
+from wicked_historian.compression import compress_value
+from wicked_historian.encoder import JSON_NULL
+from wicked_historian.models import BaseEditHistory
+from wicked_historian.utils import get_concrete_model_subclasses
+
+
+class Command(BaseCommand):
+
+    help = 'Compress already stored values of history entries which are longer than compression threshold of their history class.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'history_models', nargs='*', metavar='app_label.ModelName',
+            help='History models to compress values of. All history models with compression threshold are used by default.',
+        )
+        parser.add_argument('--batch-size', type=int, default=1000, help='Number of entries processed in a single transaction.')
+
+    def handle(self, *args, **options):
+        if options['history_models']:
+            history_models = []
+            for label in options['history_models']:
+                try:
+                    history_model = apps.get_model(label)
+                except (LookupError, ValueError) as error:
+                    raise CommandError(error)
+                if not issubclass(history_model, BaseEditHistory):
+                    raise CommandError('{} is not a history model'.format(label))
+                history_models.append(history_model)
+        else:
+            history_models = [model for model in get_concrete_model_subclasses(BaseEditHistory) if model.COMPRESSION_THRESHOLD is not None]
+
+        for history_model in history_models:
+            if history_model.COMPRESSION_THRESHOLD is None:
+                raise CommandError('Compression threshold of {} is not set'.format(history_model.__name__))
+            compressed_count = self.compress_history_model(history_model, options['batch_size'])
+            self.stdout.write('Compressed values of {} {} entries.'.format(compressed_count, history_model.__name__))
+
+    def compress_history_model(self, history_model, batch_size: int) -> int:
+        threshold = history_model.COMPRESSION_THRESHOLD
+        database = router.db_for_write(history_model)
+        compressed_count = 0
+        last_pk = None
+        while True:
+            queryset = history_model.objects.using(database).order_by('pk').values_list('pk', 'old_value', 'new_value')
+            if last_pk is not None:
+                queryset = queryset.filter(pk__gt=last_pk)
+            batch = list(queryset[:batch_size])
+            if not batch:
+                return compressed_count
+            with transaction.atomic(using=database):
+                for pk, old_value, new_value in batch:
+                    compressed_old_value = compress_value(old_value, threshold)
+                    compressed_new_value = compress_value(new_value, threshold)
+                    if compressed_old_value is not old_value or compressed_new_value is not new_value:
+                        history_model.objects.using(database).filter(pk=pk).update(
+                            old_value=JSON_NULL if compressed_old_value is None else compressed_old_value,
+                            new_value=JSON_NULL if compressed_new_value is None else compressed_new_value,
+                        )
+                        compressed_count += 1
+            last_pk = batch[-1][0]
@@ -0,0 +1,48 @@
+import time
+
+from django.apps import apps
+from django.core.management.base import BaseCommand
+from django.db import (
+    connections,
+    router,
+    transaction,
+)
+
+from wicked_historian.models import StagedChange
+
+
+class Command(BaseCommand):
+
+    help = 'Create history entries from staged changes of history classes with deferred history.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Number of staged changes processed in a single transaction.')
+        parser.add_argument('--follow', action='store_true', help='Wait for new staged changes instead of exiting when there are none.')
+        parser.add_argument('--interval', type=float, default=1.0, help='Number of seconds between checks for new staged changes.')
+
+    def handle(self, *args, **options):
+        materialized_count = 0
+        while True:
+            count = self.materialize_batch(options['batch_size'])
+            materialized_count += count
+            if count < options['batch_size']:
+                if not options['follow']:
+                    break
+                time.sleep(options['interval'])
+        self.stdout.write('Materialized {} staged changes.'.format(materialized_count))
+
+    def materialize_batch(self, batch_size: int) -> int:
+        database = router.db_for_write(StagedChange)
+        with transaction.atomic(using=database):
+            # concurrent workers process different batches if the database allows skipping locked rows
+            skip_locked = connections[database].features.has_select_for_update_skip_locked
+            staged_changes = list(
+                StagedChange.objects.using(database).select_for_update(skip_locked=skip_locked).order_by('id')[:batch_size]
+            )
+            staged_changes_by_history_model = {}
+            for staged_change in staged_changes:
+                staged_changes_by_history_model.setdefault(staged_change.history_model, []).append(staged_change)
+            for label, history_model_staged_changes in staged_changes_by_history_model.items():
+                apps.get_model(label).create_history_from_staged_changes(history_model_staged_changes)
+            StagedChange.objects.using(database).filter(pk__in=[staged_change.pk for staged_change in staged_changes]).delete()
+        return len(staged_changes)
@@ -0,0 +1,36 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from wicked_historian.change_feed import (
+    ChangeFeed,
+    get_item_data,
+)
+from wicked_historian.encoder import get_serializer
+
+
+class Command(BaseCommand):
+
+    help = 'Write history entries from the change feed after the cursor as JSON lines and move the cursor.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('cursor', help='Name of the durable cursor of the consumer.')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Number of entries read and committed at once.')
+        parser.add_argument('--follow', action='store_true', help='Wait for new entries instead of exiting at the end of the feed.')
+        parser.add_argument('--interval', type=float, default=1.0, help='Number of seconds between checks for new entries.')
+
+    def handle(self, *args, **options):
+        serialize = get_serializer()
+        change_feed = ChangeFeed(options['cursor'])
+        while True:
+            items = change_feed.read(options['batch_size'])
+            for item in items:
+                if item.entry is not None:
+                    self.stdout.write(serialize(get_item_data(item)))
+            self.stdout.flush()
+            if items:
+                change_feed.commit(items[-1].position)
+            if len(items) < options['batch_size']:
+                if not options['follow']:
+                    return
+                time.sleep(options['interval'])
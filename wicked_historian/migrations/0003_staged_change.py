@@ -0,0 +1,23 @@
+# Generated by Django 2.2.28 on 2026-10-19 05:17
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wicked_historian', '0002_change_feed'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StagedChange',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('history_model', models.CharField(max_length=255)),
+                ('change_date', models.DateTimeField(default=django.utils.timezone.now)),
+                ('payload', models.TextField()),
+            ],
+        ),
+    ]
@@ -1,21 +1,40 @@
 import typing
+from contextvars import ContextVar
+from datetime import datetime
 from typing import (
     Any,
+    AsyncIterator,
+    Callable,
     Dict,
     Iterable,
+    Iterator,
     List,
+    Optional,
+    Tuple,
 )
 
 from diffable.models import DiffableModel
 from django.db.models import (
+    BigIntegerField,
+    BinaryField,
+    CharField,
+    DateTimeField,
+    FileField,
+    Manager,
+    TextField,
     Model,
+    QuerySet,
     fields,
     options,
 )
+from django.db.models.base import DEFERRED
+from django.db.models.query import ModelIterable
 from django.db.models.signals import pre_save
+from django.utils import timezone
 from django.utils.module_loading import import_string
 
 from .deletion import DeletionGuard
+from .pause import get_history_pause
 
 if typing.TYPE_CHECKING:
     from .utils import (
@@ -24,34 +43,163 @@ if typing.TYPE_CHECKING:
     )
 
 
-options.DEFAULT_NAMES = options.DEFAULT_NAMES + ('history_class', 'reverse_foreign_key_relations',)
+options.DEFAULT_NAMES = options.DEFAULT_NAMES + ('history_class', 'reverse_foreign_key_relations', 'history_representation',)
+
+# set only while an instance without history tracking is being created
+_loading_without_tracking = ContextVar('wicked_historian_loading_without_tracking', default=False)
+
+
+class ModelIterableWithoutTracking(ModelIterable):
+
+    """Iterable yielding instances without tracking changes of their fields."""
+
+    def __iter__(self):
+        iterator = super().__iter__()
+        while True:
+            token = _loading_without_tracking.set(True)
+            try:
+                instance = next(iterator)
+            except StopIteration:
+                return
+            finally:
+                _loading_without_tracking.reset(token)
+            yield instance
+
+
+class DiffableHistoryQuerySet(QuerySet):
+
+    _history_prefetch = None  # type: Optional[Dict[str, Any]]
+
+    def _clone(self):
+        clone = super()._clone()
+        clone._history_prefetch = self._history_prefetch
+        return clone
+
+    def _fetch_all(self):
+        prefetch_history = self._result_cache is None and self._history_prefetch is not None
+        super()._fetch_all()
+        if prefetch_history:
+            history_class = import_string(self.model._meta.history_class)
+            instances = [instance for instance in self._result_cache if isinstance(instance, Model)]
+            history_class.prefetch_history_for(instances, **self._history_prefetch)
+
+    def with_last_change(self) -> 'DiffableHistoryQuerySet':
+        """Annotate instances with `last_change_date` and `last_change_user_id` of their latest history entries, using subqueries."""
+        history_class = import_string(self.model._meta.history_class)
+        return self.annotate(**history_class.get_last_change_annotations())
+
+    def prefetch_history(
+            self,
+            limit: int = 10,
+            decode: bool = False,
+            to_attr: str = 'history',
+            file_urls: bool = True,
+    ) -> 'DiffableHistoryQuerySet':
+        """Set the latest `limit` history entries (in dict form) of every loaded instance as its `to_attr` attribute.
+
+        Like `prefetch_related`, entries of all instances are loaded at once, when the queryset is evaluated (but not by `iterator()`).
+        """
+        clone = self._chain()
+        clone._history_prefetch = {'limit': limit, 'decode': decode, 'to_attr': to_attr, 'file_urls': file_urls}
+        return clone
+
+    def without_history_tracking(self) -> 'DiffableHistoryQuerySet':
+        """Load instances without initial values of their fields, e.g. for read only lists and exports.
+
+        Saving such an instance loads the initial values from the database first, so that its history is correct.
+        """
+        clone = self._chain()
+        clone._iterable_class = ModelIterableWithoutTracking
+        return clone
 
 
 class DiffableHistoryModel(DiffableModel):
 
     _wicked_historian_diff_items = None
+    _wicked_historian_untracked = False
     deletion_guard = DeletionGuard()
 
+    objects = Manager.from_queryset(DiffableHistoryQuerySet)()
+
     class Meta:
         abstract = True
         history_class = None
 
+    def _initialize(self):
+        if _loading_without_tracking.get():
+            self._wicked_historian_untracked = True
+            self._in_save_only_changes_context = False
+            return
+        super()._initialize()
+
+    def _initialize_from_db(self):
+        """Start tracking changes of an instance loaded without tracking, taking its initial values from the database."""
+        attnames = [field.attname for field in self._meta.concrete_fields if field.attname in self.__dict__]
+        current_values = {attname: self.__dict__[attname] for attname in attnames}
+        self.__dict__.update(self.__class__._base_manager.db_manager(self._state.db).filter(pk=self.pk).values(*attnames).get())
+        del self._wicked_historian_untracked
+        super()._initialize()
+        self.__dict__.update(current_values)
+
+    def refresh_from_db(self, using=None, fields=None, **kwargs):
+        if self._wicked_historian_untracked:
+            # there are no initial values to be updated
+            return super(DiffableModel, self).refresh_from_db(using=using, fields=fields, **kwargs)
+        return super().refresh_from_db(using=using, fields=fields, **kwargs)
+
     def save(self, *args, **kwargs):
         if not self._meta.history_class:
             raise NotImplementedError('Specify `history_class` meta property')
+        if self._wicked_historian_untracked:
+            self._initialize_from_db()
         history_class = import_string(self._meta.history_class)
+        history_pause = get_history_pause(self.__class__, history_class)
+        if history_pause is not None and not history_pause.summary:
+            self._save(*args, **kwargs)
+            return
+        self._wicked_historian_diff_items = []  # the instance is not saved (nor pre_save sent) with empty update_fields
         pre_save_dispatch_uid = 'store_diff_items_{}'.format(id(self))
         pre_save.connect(self.store_diff_items, sender=self.__class__, dispatch_uid=pre_save_dispatch_uid)
         try:
-            super(DiffableHistoryModel, self).save(*args, **kwargs)
+            self._save(*args, **kwargs)
         finally:
             pre_save.disconnect(dispatch_uid=pre_save_dispatch_uid)
-        history_class.create_history(self, diff_items=self._wicked_historian_diff_items)
+        if history_pause is None:
+            history_class.create_history(self, diff_items=self._wicked_historian_diff_items)
+        else:
+            history_pause.collect(history_class, self, self._wicked_historian_diff_items)
+
+    def _save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None:
+            super(DiffableHistoryModel, self).save(*args, **kwargs)
+        else:
+            # only saved fields get new initial values, changes of other fields are still pending
+            super(DiffableModel, self).save(*args, **kwargs)  # pylint: disable=bad-super-call
+            self.store_initial(fields=list(update_fields))
+
+    def get_fields_diff(self, field_names: Iterable[str]) -> Dict[str, Tuple[Any, Any]]:
+        """Get the diff of given fields (names or attnames) only - without comparing values of all fields."""
+        field_names = {self.field_attname_to_name.get(name, name) for name in field_names}
+        deferred_fields = self.get_deferred_fields()
+        diff = {}
+        with self._diff_lock:
+            initial = self._DiffableModel__initial  # pylint: disable=no-member
+            for field in self._meta.fields:
+                if field.name not in field_names or field.name not in initial:
+                    continue
+                value = DEFERRED if field.attname in deferred_fields else field.value_from_object(self)
+                if initial[field.name] != value:
+                    diff[field.name] = (initial[field.name], value)
+        return diff
 
-    def store_diff_items(self, sender, instance, **kwargs):
+    def store_diff_items(self, sender, instance, update_fields=None, **kwargs):
         """A pre_save signal handler that is going to be attached as the last pre_save handler - stores the diff in the instance."""
         if instance is not self:
             return
+        if update_fields is not None:
+            self._wicked_historian_diff_items = list(self.get_fields_diff(update_fields).items())
+            return
         diff_items = list(self.diff.items())
         if not self.pk:
             for field in self._meta.fields:
@@ -74,6 +222,12 @@ class BaseEditHistory(Model):
         abstract = True
 
     m2m_signals_registered = False
+    DATABASE = None  # type: Optional[str]
+    READ_DATABASE = None  # type: Optional[str]
+    DERIVE_OLD_VALUES = False
+    CHANGE_FEED = False
+    DEFERRED = False
+    HISTORY_WRITER = None
 
     class UnknownFieldException(Exception):
         pass
@@ -82,11 +236,138 @@ class BaseEditHistory(Model):
         pass
 
     @classmethod
-    def get_for(cls, instance: Model) -> Iterable[Dict[str, Any]]:
+    def get_for(cls, instance: Model, decode: bool = False, file_urls: bool = True) -> Iterable[Dict[str, Any]]:
+        raise NotImplementedError()
+
+    @classmethod
+    def get_history_queryset(cls, instance: Model) -> QuerySet:
+        raise NotImplementedError()
+
+    @classmethod
+    def get_last_change_annotations(cls) -> Dict[str, Any]:
+        raise NotImplementedError()
+
+    @classmethod
+    def prefetch_history_for(
+            cls,
+            instances: List[Model],
+            limit: int,
+            decode: bool = False,
+            to_attr: str = 'history',
+            file_urls: bool = True,
+    ):
+        raise NotImplementedError()
+
+    @classmethod
+    def get_page_for(
+            cls,
+            instance: Model,
+            decode: bool = False,
+            offset: int = 0,
+            limit: Optional[int] = None,
+            file_urls: bool = True,
+    ) -> List[Dict[str, Any]]:
         raise NotImplementedError()
 
     @classmethod
-    def get_history_entry(cls, entry: 'BaseEditHistory') -> Dict[str, Any]:
+    def get_chunk_for(
+            cls,
+            instance: Model,
+            decode: bool = False,
+            before_id: Optional[int] = None,
+            chunk_size: int = 2000,
+            file_urls: bool = True,
+    ) -> Tuple[List[Dict[str, Any]], Optional[int]]:
+        raise NotImplementedError()
+
+    @classmethod
+    def get_delta_aggregates(cls, field_name: str, period: str = 'day', entries: Optional[QuerySet] = None) -> List[Tuple[datetime, Any]]:
+        raise NotImplementedError()
+
+    @classmethod
+    async def aget_for(
+            cls,
+            instance: Model,
+            decode: bool = False,
+            offset: int = 0,
+            limit: Optional[int] = None,
+            file_urls: bool = True,
+    ) -> List[Dict[str, Any]]:
+        raise NotImplementedError()
+
+    @classmethod
+    def aiter_for(
+            cls,
+            instance: Model,
+            decode: bool = False,
+            chunk_size: int = 2000,
+            file_urls: bool = True,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        raise NotImplementedError()
+
+    @classmethod
+    def get_history_entries(
+            cls,
+            entries: Iterable['BaseEditHistory'],
+            decode: bool = False,
+            chunk_size: int = 2000,
+            file_urls: bool = True,
+    ) -> Iterator[Dict[str, Any]]:
+        raise NotImplementedError()
+
+    @classmethod
+    def resolve_file_urls(
+            cls,
+            entries: List['BaseEditHistory'],
+            history_entries: List[Dict[str, Any]],
+            urls_by_field_id_and_name: Dict[Tuple[str, str], str],
+    ):
+        raise NotImplementedError()
+
+    @classmethod
+    def get_file_urls(cls, field: FileField, names: Iterable[str]) -> Dict[str, str]:
+        raise NotImplementedError()
+
+    @classmethod
+    def get_history_entry(
+            cls,
+            entry: 'BaseEditHistory',
+            decode: bool = False,
+            stored_contents: Optional[Dict[str, bytes]] = None,
+    ) -> Dict[str, Any]:
+        raise NotImplementedError()
+
+    @classmethod
+    def transform_entries(
+            cls,
+            entries: List['BaseEditHistory'],
+            decode: bool = False,
+            stored_contents: Optional[Dict[str, bytes]] = None,
+    ) -> List[Dict[str, Any]]:
+        raise NotImplementedError()
+
+    @classmethod
+    def decode_column(cls, field_id: str, values: List[Any]) -> List[Any]:
+        raise NotImplementedError()
+
+    @classmethod
+    def get_entry_values(cls, entry: 'BaseEditHistory', stored_contents: Optional[Dict[str, bytes]] = None) -> Tuple[Any, Any]:
+        raise NotImplementedError()
+
+    @classmethod
+    def get_entry_dict(cls, entry: 'BaseEditHistory', old_value: Any, new_value: Any) -> Dict[str, Any]:
+        raise NotImplementedError()
+
+    @classmethod
+    def annotate_previous_new_values(cls, queryset: QuerySet) -> QuerySet:
+        raise NotImplementedError()
+
+    @classmethod
+    def get_previous_new_value(cls, entry: 'BaseEditHistory') -> Any:
+        raise NotImplementedError()
+
+    @classmethod
+    def get_value_decoder(cls, field_id: str) -> Callable[[Any], Any]:
         raise NotImplementedError()
 
     @classmethod
@@ -97,10 +378,86 @@ class BaseEditHistory(Model):
     def get_value_representation(cls, name: str, value: Any) -> Any:
         raise NotImplementedError()
 
+    @classmethod
+    def get_value_mapper(cls, name: str) -> Callable[[Any], Any]:
+        raise NotImplementedError()
+
+    @classmethod
+    def get_stored_value(cls, value: Any) -> Any:
+        raise NotImplementedError()
+
+    @classmethod
+    def get_stored_old_value(cls, instance: Model, field_id: str, old_value: Any) -> Any:
+        raise NotImplementedError()
+
+    @classmethod
+    def get_value_reference(cls, name: str, value: Any) -> Any:
+        raise NotImplementedError()
+
+    @classmethod
+    def load_users(cls, entries: List['BaseEditHistory']):
+        raise NotImplementedError()
+
+    @classmethod
+    def save_entry(cls, instance: Model, entry: 'BaseEditHistory', update_fields: Optional[List[str]] = None) -> Optional[Callable]:
+        raise NotImplementedError()
+
+    @classmethod
+    def write_debounced_entry(cls, entry: 'BaseEditHistory', update_fields: Optional[List[str]] = None):
+        raise NotImplementedError()
+
+    @classmethod
+    def merge_entry(cls, entry: 'BaseEditHistory') -> bool:
+        raise NotImplementedError()
+
+    @classmethod
+    def write_entry(cls, entry: 'BaseEditHistory', update_fields: Optional[List[str]] = None):
+        raise NotImplementedError()
+
+    @classmethod
+    def is_history_paused(cls) -> bool:
+        raise NotImplementedError()
+
     @classmethod
     def create_history(cls, instance: Model, diff_items: List['ModelDiffItem']):
         raise NotImplementedError()
 
+    @classmethod
+    def delete_history(cls, sender, instance: Model, **kwargs):
+        raise NotImplementedError()
+
+    @classmethod
+    def create_deletion_history(cls, sender, instance: Model, **kwargs):
+        raise NotImplementedError()
+
+    @classmethod
+    def create_entries(cls, instance: Model, diff_items: List['ModelDiffItem'], user_id: Any, change_date: Optional[datetime] = None):
+        raise NotImplementedError()
+
+    @classmethod
+    def build_entries(
+            cls,
+            instance: Model,
+            diff_items: List['ModelDiffItem'],
+            user_id: Any,
+            change_date: Optional[datetime] = None,
+    ) -> Iterator['BaseEditHistory']:
+        raise NotImplementedError()
+
+    @classmethod
+    def stage_changes(
+            cls,
+            instance: Model,
+            diff_items: List['ModelDiffItem'],
+            user_id: Any,
+            represented_items: Optional[List[Tuple[str, Tuple[Any, Any]]]] = None,
+    ):
+        raise NotImplementedError()
+
+    @classmethod
+    def create_history_from_staged_changes(cls, staged_changes: List['StagedChange']):
+        raise NotImplementedError()
+
     @classmethod
     def create_m2m_history(cls, instance: Model):
         raise NotImplementedError()
@@ -113,6 +470,10 @@ class BaseEditHistory(Model):
     def register_m2m_signals(cls):
         raise NotImplementedError()
 
+    @classmethod
+    def register_deletion_signals(cls):
+        raise NotImplementedError()
+
     def __str__(self) -> str:
         raise NotImplementedError()
 
@@ -123,3 +484,53 @@ class BaseEditHistory(Model):
     @property
     def field_name(self) -> str:
         raise NotImplementedError()
+
+
+class StoredValue(Model):
+    """Value of a content addressed field stored once and referenced by its digest from history entries."""
+
+    digest = CharField(max_length=64, primary_key=True)
+    content = BinaryField()
+    # updated on every new reference, so that collecting unreferenced values does not remove values which are being referenced
+    referenced_at = DateTimeField(default=timezone.now, db_index=True)
+
+    def __str__(self) -> str:
+        return self.digest
+
+
+class ChangeFeedEntry(Model):
+    """Outbox entry of a created or updated history entry.
+
+    Positions are assigned to committed outbox entries by a single sequencer, so that reading entries after a position never
+    misses entries of transactions committed later.
+    """
+
+    history_model = CharField(max_length=255)
+    entry_id = BigIntegerField()
+    created_at = DateTimeField(default=timezone.now)
+    position = BigIntegerField(null=True, unique=True)
+
+    def __str__(self) -> str:
+        return '{} #{}'.format(self.history_model, self.entry_id)
+
+
+class ChangeFeedCursor(Model):
+    """Position of the last change feed entry processed by a consumer."""
+
+    name = CharField(max_length=100, primary_key=True)
+    position = BigIntegerField(default=0)
+    updated_at = DateTimeField(default=timezone.now)
+
+    def __str__(self) -> str:
+        return self.name
+
+
+class StagedChange(Model):
+    """Raw values of changes of an instance of a history class with deferred history, waiting for creation of history entries."""
+
+    history_model = CharField(max_length=255)
+    change_date = DateTimeField(default=timezone.now)
+    payload = TextField()
+
+    def __str__(self) -> str:
+        return '{} #{}'.format(self.history_model, self.pk)
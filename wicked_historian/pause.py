@@ -0,0 +1,89 @@
+from collections import OrderedDict
+from contextlib import ContextDecorator
+from contextvars import (
+    ContextVar,
+    Token,
+)
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Dict,
+    List,
+    Optional,
+    Tuple,
+    Type,
+)
+
+if TYPE_CHECKING:
+    from django.db.models import Model
+    from .models import BaseEditHistory
+
+
+__all__ = (
+    'pause_history',
+    'get_history_pause',
+)
+
+
+ALL_MODELS = object()
+
+# pauses keyed by paused models and history classes (or ALL_MODELS), immutable, so that contexts copied for new asyncio tasks
+# do not share them
+_pauses = ContextVar('wicked_historian_pauses', default={})  # type: ContextVar
+
+
+class HistoryPause(ContextDecorator):
+
+    """Context (and decorator) in which history of given models or history classes (all by default) is not created.
+
+    Saves of paused instances skip computing their diffs. With `summary` the diffs are computed and squashed instead, and history
+    of every changed instance is created when the context ends - a single entry per changed field. Changes of relations and
+    deletions are not part of the summary and are tracked as usual.
+    """
+
+    def __init__(self, *targets: Any, summary: bool = False):
+        self.targets = targets or (ALL_MODELS,)
+        self.summary = summary
+        self._tokens = []  # type: List[Token]
+        self._changes = OrderedDict()  # type: OrderedDict
+
+    def _recreate_cm(self) -> 'HistoryPause':
+        # every call of a decorated function collects its own changes
+        return self.__class__(*self.targets, summary=self.summary)
+
+    def __enter__(self) -> 'HistoryPause':
+        pauses = dict(_pauses.get())  # type: Dict[Any, HistoryPause]
+        for target in self.targets:
+            pauses[target] = self
+        self._tokens.append(_pauses.set(pauses))
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        _pauses.reset(self._tokens.pop())
+        changes, self._changes = self._changes, OrderedDict()
+        if exc_type is not None:
+            return
+        for (history_class, _), (instance, values_by_field_name) in changes.items():
+            diff_items = [(name, tuple(values)) for name, values in values_by_field_name.items() if values[0] != values[1]]
+            if diff_items:
+                history_class.create_history(instance, diff_items)
+
+    def collect(self, history_class: Type['BaseEditHistory'], instance: 'Model', diff_items: List[Tuple[str, Tuple[Any, Any]]]):
+        """Squash changes of the instance with changes of the same row (saved by any object) collected so far."""
+        key = (history_class, instance.pk)
+        _, values_by_field_name = self._changes.get(key, (None, OrderedDict()))
+        self._changes[key] = (instance, values_by_field_name)
+        for name, (old_value, new_value) in diff_items:
+            values_by_field_name.setdefault(name, [old_value, new_value])[1] = new_value
+
+
+def pause_history(*targets: Any, summary: bool = False) -> HistoryPause:
+    return HistoryPause(*targets, summary=summary)
+
+
+def get_history_pause(model_class: Type['Model'], history_class: Type['BaseEditHistory']) -> Optional[HistoryPause]:
+    """Get the pause of history of the model, if it is paused."""
+    pauses = _pauses.get()
+    if not pauses:
+        return None
+    return pauses.get(history_class) or pauses.get(model_class) or pauses.get(ALL_MODELS)
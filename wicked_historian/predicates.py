@@ -0,0 +1,31 @@
+"""Predicates of significant changes for `change_predicates` of `generate_history_class`.
+
+A predicate takes the raw old and new value of a field and tells if the change should be recorded.
+"""
+from typing import (
+    Any,
+    Callable,
+)
+
+__all__ = (
+    'changed_ignoring_whitespace',
+    'changed_by_more_than',
+)
+
+
+def changed_ignoring_whitespace(old_value: Any, new_value: Any) -> bool:
+    """Tell if texts differ in other characters than whitespace."""
+    if old_value is None or new_value is None:
+        return old_value is not new_value
+    return old_value.split() != new_value.split()
+
+
+def changed_by_more_than(threshold: Any) -> Callable[[Any, Any], bool]:
+    """Make a predicate telling if numbers (or dates and times with a timedelta threshold) differ by more than the threshold."""
+
+    def predicate(old_value: Any, new_value: Any) -> bool:
+        if old_value is None or new_value is None:
+            return old_value is not new_value
+        return abs(new_value - old_value) > threshold
+
+    return predicate
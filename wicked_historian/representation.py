@@ -0,0 +1,82 @@
+"""Cheap representations of related objects, declared by `history_representation` Meta option of their models.
+
+By default related objects are represented by `str()` of their instances, which for some models traverses relations and
+makes a query for every represented object.
+"""
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Dict,
+    Iterable,
+    Optional,
+    Type,
+)
+
+from django.db.models import F
+from django.utils.encoding import force_text
+
+if TYPE_CHECKING:
+    from django.db.models import (
+        Model,
+        QuerySet,
+    )
+
+__all__ = (
+    'RelatedObjectRepresentation',
+    'get_related_object_representation',
+    'select_representations',
+)
+
+
+class RelatedObjectRepresentation:
+
+    """Representation of related objects built from values of given fields (lookups may span relations) or their primary keys only.
+
+    Values of all represented objects are loaded with a single `values()` query (or selected together with the objects, see
+    `select_representations`) and formatted with the template, which by default joins them with spaces. Without fields no query
+    is made and objects are represented by their primary keys.
+    """
+
+    def __init__(self, *fields: str, template: Optional[str] = None):
+        self.fields = fields
+        self.template = template if template is not None else ' '.join('{%s}' % field for field in fields)
+
+    def get_representations(self, model: Type['Model'], pks: Iterable[Any]) -> Dict[Any, str]:
+        """Get text representations of objects of the model keyed by their primary keys."""
+        pks = set(pks)
+        if not self.fields or not pks:
+            return {pk: force_text(pk) for pk in pks}
+        # noinspection PyProtectedMember
+        rows = model._base_manager.filter(pk__in=pks).values('pk', *self.fields)  # pylint: disable=protected-access
+        return {row['pk']: self.template.format(**row) for row in rows}
+
+    def annotate(self, queryset: 'QuerySet') -> 'QuerySet':
+        """Select values of the representation together with objects of the queryset."""
+        return queryset.annotate(**{self._get_alias(index): F(field) for index, field in enumerate(self.fields)})
+
+    def get_representation(self, instance: 'Model') -> Optional[str]:
+        """Get the text representation of the instance from values selected with it, if they were."""
+        if not self.fields:
+            return force_text(instance.pk)
+        try:
+            values = {field: getattr(instance, self._get_alias(index)) for index, field in enumerate(self.fields)}
+        except AttributeError:
+            return None
+        return self.template.format(**values)
+
+    @staticmethod
+    def _get_alias(index: int) -> str:
+        return '_history_representation_%d' % index
+
+
+def get_related_object_representation(model: Type['Model']) -> Optional[RelatedObjectRepresentation]:
+    # noinspection PyProtectedMember
+    return getattr(model._meta, 'history_representation', None)  # pylint: disable=protected-access
+
+
+def select_representations(queryset: 'QuerySet') -> 'QuerySet':
+    """Select declared representations of related objects together with them, so that representing them makes no query."""
+    representation = get_related_object_representation(queryset.model)
+    if representation is None or not representation.fields:
+        return queryset
+    return representation.annotate(queryset)
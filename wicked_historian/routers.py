@@ -0,0 +1,56 @@
+from typing import (
+    Optional,
+    Type,
+)
+
+from django.apps import apps
+from django.conf import settings
+from django.db.models import Model
+
+from .models import (
+    BaseEditHistory,
+    ChangeFeedCursor,
+    ChangeFeedEntry,
+    StagedChange,
+    StoredValue,
+)
+
+
+class HistoryRouter:
+
+    """Database router putting history models on databases given to `generate_history_class`.
+
+    Values of content addressed fields, the change feed and staged changes are stored on `WICKED_HISTORIAN_DATABASE` if it is set.
+    """
+
+    def get_database(self, model: Type[Model], read: bool) -> Optional[str]:
+        if issubclass(model, BaseEditHistory):
+            return model.READ_DATABASE if read else model.DATABASE
+        if issubclass(model, (StoredValue, ChangeFeedEntry, ChangeFeedCursor, StagedChange)):
+            return getattr(settings, 'WICKED_HISTORIAN_DATABASE', None)
+        return None
+
+    def db_for_read(self, model: Type[Model], **hints) -> Optional[str]:
+        return self.get_database(model, read=True)
+
+    def db_for_write(self, model: Type[Model], **hints) -> Optional[str]:
+        return self.get_database(model, read=False)
+
+    def allow_relation(self, obj1: Model, obj2: Model, **hints) -> Optional[bool]:
+        # references of history entries to tracked instances and users are not constrained by the database
+        if any(isinstance(obj, BaseEditHistory) and obj.DATABASE is not None for obj in (obj1, obj2)):
+            return True
+        return None
+
+    def allow_migrate(self, db: str, app_label: str, model_name: Optional[str] = None, **hints) -> Optional[bool]:
+        if model_name is None:
+            return None
+        # models given in hints by migrations are historical models, so the current ones are looked up
+        try:
+            model = apps.get_model(app_label, model_name)
+        except LookupError:
+            return None
+        database = self.get_database(model, read=False)
+        if database is not None:
+            return db == database
+        return None
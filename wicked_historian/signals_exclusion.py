@@ -1,9 +1,10 @@
-import threading
 from collections import namedtuple
 from contextlib import contextmanager
+from contextvars import ContextVar
 from typing import (
     Any,
-    List,
+    Dict,
+    Tuple,
 )
 
 
@@ -12,9 +13,10 @@ SignalExclusionKey = namedtuple('SignalExclusionKey', ['model_class', 'model_id'
 
 class SignalExclusion:
 
-    """Object used for signals exclusion."""
+    """Object used for signals exclusion - separate for every thread and asyncio task."""
 
-    _storage = threading.local()
+    # stores are immutable, so that contexts copied for new asyncio tasks do not share them
+    _storage = ContextVar('wicked_historian_signal_exclusion', default={})  # type: ContextVar
 
     @contextmanager
     def model_signals_exclusion_context(self, model_class: Any, model_id: Any, field_name: str):
@@ -37,26 +39,25 @@ class SignalExclusion:
     def store_exclusion_key(self, model_class: Any, model_id: Any, field_name: str, signal_type: str):
         """Store key formed from supplied args in store for appropriate signal type."""
         store = self._get_store(signal_type)
-        store.insert(0, SignalExclusionKey(model_class, model_id, field_name))
+        self._set_store(signal_type, (SignalExclusionKey(model_class, model_id, field_name),) + store)
 
     def remove_exclusion_key(self, model_class: Any, model_id: Any, field_name: str, signal_type: str):
         """Remove key formed from supplied args from store for appropriate signal type."""
+        store = list(self._get_store(signal_type))
         try:
-            store = getattr(self._storage, signal_type)
-        except AttributeError:
-            return
-        else:
             store.remove(SignalExclusionKey(model_class, model_id, field_name))
+        except ValueError:
+            return
+        self._set_store(signal_type, tuple(store))
 
-    def _get_store(self, signal_type: str) -> List[SignalExclusionKey]:
-        """Get or create store for appropriate signal type."""
-        try:
-            store = getattr(self._storage, signal_type)
-        except AttributeError:
-            store = []
-            setattr(self._storage, signal_type, store)
+    def _get_store(self, signal_type: str) -> Tuple[SignalExclusionKey, ...]:
+        """Get store for appropriate signal type."""
+        return self._storage.get().get(signal_type, ())
 
-        return store
+    def _set_store(self, signal_type: str, store: Tuple[SignalExclusionKey, ...]):
+        stores = dict(self._storage.get())  # type: Dict[str, Tuple[SignalExclusionKey, ...]]
+        stores[signal_type] = store
+        self._storage.set(stores)
 
 
 signal_exclusion = SignalExclusion()
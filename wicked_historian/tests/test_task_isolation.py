@@ -0,0 +1,39 @@
+import asyncio
+
+from django.contrib.auth.models import User
+from django.test import SimpleTestCase
+
+from wicked_historian.deletion import DeletionGuard
+from wicked_historian.signals_exclusion import SignalExclusion
+
+
+class TaskIsolationTestCase(SimpleTestCase):
+
+    def test_instances_during_deletion_are_separate_for_concurrent_tasks(self):
+        guard = DeletionGuard()
+        instances = [User(pk=1), User(pk=2)]
+
+        async def delete(instance):
+            with guard.deletion_context(instance):
+                await asyncio.sleep(0)
+                return [guard.is_instance_during_deletion(other) for other in instances]
+
+        async def delete_all():
+            return await asyncio.gather(*[delete(instance) for instance in instances])
+
+        self.assertEqual(asyncio.run(delete_all()), [[True, False], [False, True]])
+        self.assertFalse(guard.models_during_deletion)
+
+    def test_excluded_signals_are_separate_for_concurrent_tasks(self):
+        exclusion = SignalExclusion()
+
+        async def exclude(model_id):
+            with exclusion.model_signals_exclusion_context(User, model_id, 'groups'):
+                await asyncio.sleep(0)
+                return [exclusion.are_model_signals_excluded(User, pk, 'groups') for pk in (1, 2)]
+
+        async def exclude_all():
+            return await asyncio.gather(exclude(1), exclude(2))
+
+        self.assertEqual(asyncio.run(exclude_all()), [[True, False], [False, True]])
+        self.assertFalse(exclusion.are_model_signals_excluded(User, 1, 'groups'))
@@ -1,10 +1,21 @@
 # -*- coding: utf-8 -*-
+import asyncio
+import threading
 
-from django.contrib.auth.models import User
+from django.contrib.auth.models import (
+    AnonymousUser,
+    User,
+)
+from django.http import (
+    HttpRequest,
+    HttpResponse,
+)
 from django.test.testcases import TestCase
+from django.utils.functional import SimpleLazyObject
 
 from wicked_historian.usersmuggler import (
     NoUserSetException,
+    UserSmugglerMiddleware,
     usersmuggler,
 )
 
@@ -35,3 +46,116 @@ class UserSmugglerTestCase(TestCase):
                     self.assertEqual(usersmuggler.get_user(), test_user2)
                 self.assertIsNone(usersmuggler.get_user())
             self.assertEqual(usersmuggler.get_user(), test_user1)
+
+    def test_user_is_set_by_decorator(self):
+        test_user = User()
+
+        @usersmuggler.set_user(user=test_user)
+        def get_user():
+            return usersmuggler.get_user()
+
+        self.assertEqual(get_user(), test_user)
+        with self.assertRaises(NoUserSetException):
+            usersmuggler.get_user()
+
+    def test_decorated_function_is_called_in_concurrent_threads(self):
+        test_user = User()
+        first_entered, second_entered, first_exited = threading.Event(), threading.Event(), threading.Event()
+        results = []
+
+        @usersmuggler.set_user(user=test_user)
+        def get_user(entered: threading.Event, exit_after: threading.Event):
+            entered.set()
+            exit_after.wait(timeout=5)
+            return usersmuggler.get_user()
+
+        def call(*events):
+            try:
+                results.append(get_user(*events))
+            except Exception as exc:  # pylint: disable=broad-except
+                results.append(exc)
+
+        def call_first():
+            call(first_entered, second_entered)  # exits while the second call is still in the context
+            first_exited.set()
+
+        def call_second():
+            first_entered.wait(timeout=5)
+            call(second_entered, first_exited)
+
+        threads = [threading.Thread(target=call_first), threading.Thread(target=call_second)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertListEqual(results, [test_user, test_user])
+
+    def test_user_is_set_in_async_context(self):
+        test_user = User()
+
+        async def get_user():
+            async with usersmuggler.set_user(user=test_user):
+                await asyncio.sleep(0)
+                return usersmuggler.get_user()
+
+        self.assertEqual(asyncio.run(get_user()), test_user)
+
+    def test_users_of_concurrent_tasks_are_separated(self):
+        test_users = [User(username='john.smith'), User(username='jane.doe')]
+
+        async def get_user(user):
+            with usersmuggler.set_user(user=user):
+                await asyncio.sleep(0)
+                return usersmuggler.get_user()
+
+        async def get_users():
+            return await asyncio.gather(*[get_user(user) for user in test_users])
+
+        self.assertEqual(asyncio.run(get_users()), test_users)
+
+
+class UserSmugglerMiddlewareTestCase(TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.request = HttpRequest()
+        self.request.user = User(username='john.smith')
+
+    def test_user_is_set_for_sync_response(self):
+        middleware = UserSmugglerMiddleware(lambda request: HttpResponse(usersmuggler.get_user().username))
+
+        self.assertFalse(asyncio.iscoroutinefunction(middleware))
+        self.assertEqual(middleware(self.request).content, b'john.smith')
+
+    def test_user_is_set_for_async_response(self):
+        async def get_response(request):
+            await asyncio.sleep(0)
+            return HttpResponse(usersmuggler.get_user().username)
+
+        middleware = UserSmugglerMiddleware(get_response)
+
+        self.assertTrue(asyncio.iscoroutinefunction(middleware))
+        self.assertEqual(asyncio.run(middleware(self.request)).content, b'john.smith')
+
+    def test_lazy_user_is_not_loaded_in_event_loop(self):
+        def get_user():
+            try:
+                asyncio.get_running_loop()
+            except RuntimeError:
+                return User(username='john.smith')
+            raise AssertionError('The user is loaded in the event loop')
+
+        async def get_response(request):
+            return HttpResponse(usersmuggler.get_user().username)
+
+        self.request.user = SimpleLazyObject(get_user)
+        middleware = UserSmugglerMiddleware(get_response)
+
+        self.assertEqual(asyncio.run(middleware(self.request)).content, b'john.smith')
+
+    def test_user_is_not_set_for_anonymous_user(self):
+        self.request.user = AnonymousUser()
+        middleware = UserSmugglerMiddleware(lambda request: HttpResponse(usersmuggler._get_stored_user() is usersmuggler.NOT_SET))
+
+        self.assertEqual(middleware(self.request).content, b'True')
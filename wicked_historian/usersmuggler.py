@@ -1,7 +1,13 @@
-import threading
-from contextlib import contextmanager
+import asyncio
+from contextlib import ContextDecorator
+from contextvars import (
+    ContextVar,
+    Token,
+)
 from typing import (
+    Awaitable,
     Callable,
+    List,
     Optional,
     Union,
 )
@@ -12,6 +18,11 @@ from django.http import (
     HttpResponse,
 )
 
+from .compat.asgi import (
+    markcoroutinefunction,
+    sync_to_async,
+)
+
 __all__ = (
     'usersmuggler',
     'NoUserSetException',
@@ -23,23 +34,45 @@ class NoUserSetException(Exception):
     pass
 
 
+class UserContext(ContextDecorator):
+
+    """Context (sync or async) and decorator in which the user is set."""
+
+    def __init__(self, storage: ContextVar, user: Optional[AbstractBaseUser]):
+        self.storage = storage
+        self.user = user
+        self._tokens = []  # type: List[Token]
+
+    def _recreate_cm(self) -> 'UserContext':
+        # every call of a decorated function (possibly in another thread) resets its own token
+        return self.__class__(self.storage, self.user)
+
+    def __enter__(self):
+        self._tokens.append(self.storage.set(self.user))
+
+    def __exit__(self, *exc_info):
+        self.storage.reset(self._tokens.pop())
+
+    async def __aenter__(self):
+        self.__enter__()
+
+    async def __aexit__(self, *exc_info):
+        self.__exit__(*exc_info)
+
+
 class UserSmuggler(object):
 
+    """Store of the user making changes - separate for every thread and asyncio task."""
+
     class NotSetType(object):
 
         """A type for the NOT_SET object."""
 
     NOT_SET = NotSetType()
-    _storage = threading.local()
+    _storage = ContextVar('wicked_historian_user', default=NOT_SET)  # type: ContextVar
 
-    @contextmanager
-    def set_user(self, user: Optional[AbstractBaseUser]):
-        previous_user = self._get_stored_user()
-        self._set_stored_user(user)
-        try:
-            yield
-        finally:
-            self._set_stored_user(previous_user)
+    def set_user(self, user: Optional[AbstractBaseUser]) -> UserContext:
+        return UserContext(self._storage, user)
 
     def get_user(self) -> Optional[AbstractBaseUser]:
         stored_user = self._get_stored_user()
@@ -51,13 +84,7 @@ class UserSmuggler(object):
         return stored_user
 
     def _get_stored_user(self) -> Union[AbstractBaseUser, None, NotSetType]:
-        try:
-            return self._storage.user
-        except AttributeError:
-            return self.NOT_SET
-
-    def _set_stored_user(self, user: Union[AbstractBaseUser, None, NotSetType]):
-        self._storage.user = user
+        return self._storage.get()
 
 
 usersmuggler = UserSmuggler()
@@ -65,15 +92,35 @@ usersmuggler = UserSmuggler()
 
 class UserSmugglerMiddleware:
 
-    """A middleware setting usersmuggler user."""
+    """A middleware setting usersmuggler user, both in sync and async (ASGI) request handling."""
+
+    sync_capable = True
+    async_capable = True
 
     def __init__(self, get_response: Callable):
         """Store the get_response callback in the middleware instance."""
         self.get_response = get_response
+        if asyncio.iscoroutinefunction(get_response):
+            # mark the middleware as a coroutine function, so that Django calls it in async mode
+            markcoroutinefunction(self)
 
-    def __call__(self, request: HttpRequest) -> HttpResponse:
+    def __call__(self, request: HttpRequest) -> Union[HttpResponse, Awaitable[HttpResponse]]:
         """Set current user in usersmuggler."""
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
         if request.user.is_authenticated:
             with usersmuggler.set_user(request.user):
                 return self.get_response(request)
         return self.get_response(request)
+
+    async def __acall__(self, request: HttpRequest) -> HttpResponse:
+        """Set current user in usersmuggler for the task handling the request."""
+        if hasattr(request, 'auser'):
+            user = await request.auser()
+        else:
+            # the lazy user loads the session and the user from the database, which cannot be done in the event loop
+            user = await sync_to_async(lambda: request.user if request.user.is_authenticated else None)()
+        if user is not None and user.is_authenticated:
+            async with usersmuggler.set_user(user):
+                return await self.get_response(request)
+        return await self.get_response(request)
@@ -1,21 +1,29 @@
 import base64
 import hashlib
+import json
+import threading
+from contextlib import contextmanager
+from itertools import islice
 from datetime import (
     date,
+    datetime,
     time,
     timedelta,
 )
 from decimal import Decimal
 from functools import (
+    partial,
     singledispatch,
     update_wrapper,
     wraps,
 )
 from typing import (
     Any,
+    AsyncIterator,
     Callable,
     Dict,
     Iterable,
+    Iterator,
     List,
     Optional,
     Tuple,
@@ -23,17 +31,28 @@ from typing import (
     TypeVar,
     Union,
 )
+from urllib.parse import urlsplit
 
 from django.conf import settings
 from django.core.exceptions import ImproperlyConfigured
-from django.db import models
+from django.contrib.auth import get_user_model
+from django.db import (
+    DEFAULT_DB_ALIAS,
+    NotSupportedError,
+    connections,
+    models,
+    router,
+    transaction,
+)
 from django.db.models import (  # pylint: disable=unused-import
     Field,
     ManyToOneRel,
     Model,
 )
 from django.db.models.fields.files import FieldFile
+from django.db.models.functions import Trunc
 from django.db.models.signals import (
+    class_prepared,
     m2m_changed,
     pre_delete,
     pre_save,
@@ -41,23 +60,75 @@ from django.db.models.signals import (
     post_save,
 )
 from django.utils import timezone
+from django.utils.dateparse import (
+    parse_date,
+    parse_datetime,
+    parse_time,
+)
+from django.utils.duration import duration_string
 from django.utils.encoding import force_text
 from django.utils.module_loading import import_string
 
+from .compat.asgi import sync_to_async
+from .compression import (
+    compress_value,
+    decompress_value,
+)
+from .content_store import (
+    get_referenced_digests,
+    get_stored_representation,
+    is_stored_reference,
+    load_contents,
+    store_bytes,
+    store_representation,
+)
+from .delta import (
+    DeltaStorage,
+    get_new_value,
+    get_old_value,
+    get_version,
+    is_delta_envelope,
+)
 from .encoder import JSON_NULL
 from .models import (
     BaseEditHistory,
+    ChangeFeedEntry,
     DiffableHistoryModel,
+    StagedChange,
+)
+from .pause import get_history_pause
+from .representation import (
+    get_related_object_representation,
+    select_representations,
 )
 from .signals_exclusion import signal_exclusion
 from .usersmuggler import usersmuggler
+from .writer import HistoryWriter
 
 
 JSON_FIELD_KWARGS = getattr(settings, 'WICKED_HISTORIAN_JSON_FIELD_KWARGS', {})
 json_field_class = import_string(settings.WICKED_HISTORIAN_JSON_FIELD_CLASS)  # type: Type[Field]
+DECODING_CHUNK_SIZE = getattr(settings, 'WICKED_HISTORIAN_DECODING_CHUNK_SIZE', 2000)
+HISTORY_ON_DELETE_CASCADE = 'cascade'
+HISTORY_ON_DELETE_DELETE = 'delete'
+HISTORY_ON_DELETE_KEEP = 'keep'
+INTEGER_DIGITS_BY_INTERNAL_TYPE = {
+    'SmallIntegerField': 5,
+    'PositiveSmallIntegerField': 5,
+    'IntegerField': 10,
+    'PositiveIntegerField': 10,
+    'BigIntegerField': 19,
+}
+PREVIOUS_VALUE_TAG = '__wicked_historian_previous__'
+PREVIOUS_VALUE_REFERENCE = {PREVIOUS_VALUE_TAG: 1}  # stored by older versions, without the id of the referenced entry
+PREVIOUS_ENTRY_KEY = 'entry'
+PREVIOUS_NEW_VALUE_ATTNAME = '_wicked_historian_previous_new_value'
+PREVIOUS_ENTRY_ID_ATTNAME = '_wicked_historian_previous_entry_id'
 FieldValue = TypeVar('FieldValue')
 ModelInstanceRepresentation = Dict[str, Any]
 ValueRepresentation = Union[FieldValue, ModelInstanceRepresentation, Iterable[ModelInstanceRepresentation]]
+ValueMapper = Callable[[FieldValue], ValueRepresentation]
+ValueDecoder = Callable[[ValueRepresentation], Any]
 ModelDiffItem = Tuple[str, Tuple[Any, Any]]
 BaseModel = TypeVar('BaseModel')
 
@@ -100,13 +171,66 @@ class ObsoleteFieldDescription(FieldDescription):
         self.field_instance.set_attributes_from_name(self.name)
 
 
+def is_previous_value_reference(value: Any) -> bool:
+    return type(value) is dict and PREVIOUS_VALUE_TAG in value
+
+
+def get_previous_value_reference(entry_id: int) -> Dict[str, int]:
+    return {PREVIOUS_VALUE_TAG: 1, PREVIOUS_ENTRY_KEY: entry_id}
+
+
+def is_file_url(value: str) -> bool:
+    """Tell if the stored file value is a URL (stored by older versions) - names of files in storages are relative paths."""
+    return value.startswith('/') or bool(urlsplit(value).netloc)
+
+
 def generate_history_class(
         model_class: Type[DiffableHistoryModel],
         module: str,
         excluded_fields: Optional[Iterable[str]] = None,
         obsolete_field_choices: Optional[List[ObsoleteFieldDescription]] = None,
         abstract: bool = False,
+        delta_encoded_fields: Optional[Dict[str, int]] = None,
+        compression_threshold: Optional[int] = None,
+        content_addressed_fields: Optional[Iterable[str]] = None,
+        derive_old_values: bool = False,
+        database: Optional[str] = None,
+        read_database: Optional[str] = None,
+        write_on_commit: bool = False,
+        history_on_delete: Optional[str] = None,
+        change_feed: bool = False,
+        deferred: bool = False,
+        history_writer: Optional[HistoryWriter] = None,
+        debounced_fields: Optional[Dict[str, Union[int, timedelta]]] = None,
+        numeric_delta_fields: Optional[Iterable[str]] = None,
+        change_predicates: Optional[Dict[str, Callable[[Any, Any], bool]]] = None,
 ) -> Type[BaseEditHistory]:
+    """Generate history class for the model.
+
+    `delta_encoded_fields` maps names of text fields to intervals of full versions (keyframes) - values of these fields are stored
+    as patches against previous versions.
+    Values which JSON is longer than `compression_threshold` are stored compressed.
+    Values of `content_addressed_fields` (meant for binary and file fields) are stored once in `StoredValue` table and history entries
+    keep only references to them.
+    With `derive_old_values` old values equal to new values of previous entries are not stored, but derived from them on read.
+    History of a model can be stored on a separate `database` (and read from `read_database`) with `HistoryRouter`. References to
+    tracked instances and users are then not constrained by the database. With `write_on_commit` entries are written when
+    the transaction of the tracked instance is committed.
+    `history_on_delete` decides what happens to history of deleted instances - it is either deleted by Django (`'cascade'`, default
+    for history on the same database), deleted without loading it (`'delete'`) or kept with a final entry of the deletion (`'keep'`,
+    default for history on a separate database).
+    Created and updated entries of history classes with `change_feed` are available in the change feed.
+    With `deferred` raw values of changes are staged and history entries are created from them by `materialize_staged_history`
+    management command.
+    Entries of history classes with `history_writer` are written by its background threads after commit of the transaction
+    of the tracked instance (many-to-many and reverse foreign key relations have to be excluded).
+    `debounced_fields` maps names of fields to debounce windows (in seconds or timedeltas) - a change made within the window
+    after the first change of the latest entry of the same instance, field and user is merged into this entry.
+    Entries of `numeric_delta_fields` (integer and decimal fields) keep the difference between the new and the old value
+    in the `delta` column, to be aggregated with `get_delta_aggregates`.
+    `change_predicates` map names of fields to callables taking raw old and new values and telling if the change is significant -
+    insignificant changes are not recorded.
+    """
 
     def get_reverse_fk_relations_for_choices():
         return [i for i in getattr(model_class._meta, 'reverse_foreign_key_relations', set())]
@@ -128,6 +252,69 @@ def generate_history_class(
         for description in fields_from_model + reverse_m2m_field_choices
         if description.name not in excluded_fields
     }
+    for name in delta_encoded_fields or {}:
+        if name not in tracked_fields_choices_by_name:
+            raise ImproperlyConfigured('Delta encoded field %s is not tracked by %s history' % (name, model_class.__name__))
+    storages_by_name = {name: DeltaStorage(keyframe_interval) for name, keyframe_interval in (delta_encoded_fields or {}).items()}
+    if history_on_delete is None:
+        history_on_delete = HISTORY_ON_DELETE_CASCADE if database is None else HISTORY_ON_DELETE_KEEP
+    if history_on_delete not in (HISTORY_ON_DELETE_CASCADE, HISTORY_ON_DELETE_DELETE, HISTORY_ON_DELETE_KEEP):
+        raise ImproperlyConfigured('Unknown history_on_delete option %s' % history_on_delete)
+    if history_on_delete == HISTORY_ON_DELETE_CASCADE and database is not None:
+        raise ImproperlyConfigured('History of %s on a separate database cannot be deleted by cascade' % model_class.__name__)
+    content_addressed_fields = set(content_addressed_fields or [])
+    for name in content_addressed_fields:
+        if name not in tracked_fields_choices_by_name:
+            raise ImproperlyConfigured('Content addressed field %s is not tracked by %s history' % (name, model_class.__name__))
+        if name in storages_by_name:
+            raise ImproperlyConfigured('Field %s cannot be both delta encoded and content addressed' % name)
+    debounce_windows_by_field_id = {}  # type: Dict[str, timedelta]
+    for name, window in (debounced_fields or {}).items():
+        description = tracked_fields_choices_by_name.get(name)
+        # changes of many-to-many and reverse foreign key relations are squashed in their own way
+        if description is None or description.field_instance.many_to_many or description.field_instance.one_to_many:
+            raise ImproperlyConfigured('Debounced field %s is not a tracked field of %s' % (name, model_class.__name__))
+        if name in storages_by_name:
+            raise ImproperlyConfigured('Field %s cannot be both delta encoded and debounced' % name)
+        debounce_windows_by_field_id[description.id] = window if isinstance(window, timedelta) else timedelta(seconds=window)
+    numeric_delta_fields = set(numeric_delta_fields or [])
+    for name in numeric_delta_fields:
+        if name not in tracked_fields_choices_by_name or not isinstance(
+                tracked_fields_choices_by_name[name].field_instance, (models.IntegerField, models.DecimalField),
+        ):
+            raise ImproperlyConfigured('Numeric delta field %s is not a tracked numeric field of %s' % (name, model_class.__name__))
+    change_predicates = change_predicates or {}
+    for name in change_predicates:
+        if name not in tracked_fields_choices_by_name:
+            raise ImproperlyConfigured('Field %s with change predicate is not tracked by %s history' % (name, model_class.__name__))
+    if change_feed and (database or DEFAULT_DB_ALIAS) != (getattr(settings, 'WICKED_HISTORIAN_DATABASE', None) or DEFAULT_DB_ALIAS):
+        # entries are written to the outbox table in the transaction in which they are saved
+        raise ImproperlyConfigured(
+            'History of %s with change feed has to be stored on the database of the change feed (WICKED_HISTORIAN_DATABASE setting)'
+            % model_class.__name__
+        )
+    if history_writer is not None and (storages_by_name or derive_old_values or change_feed or debounce_windows_by_field_id):
+        # these features read previous entries or need ids of entries when they are saved
+        raise ImproperlyConfigured(
+            'History of %s with delta encoded fields, derived old values, change feed or debounced fields cannot be written by a '
+            'history writer'
+            % model_class.__name__
+        )
+    if history_writer is not None and any(
+            description.field_instance.many_to_many or isinstance(description.field_instance, ReverseForeignKeyRelation)
+            for description in tracked_fields_choices_by_name.values()
+    ):
+        # changes of relations are squashed into the last entry, which has to be saved before it is updated
+        raise ImproperlyConfigured(
+            'History of %s with tracked many-to-many or reverse foreign key relations cannot be written by a history writer'
+            % model_class.__name__
+        )
+
+    # filled once in register_m2m_signals, so that the signal handler does not have to inspect models' meta
+    m2m_field_names_by_through_and_related_model = {}  # type: Dict[Tuple[Type[Model], Type[Model]], str]
+    # value mappers are compiled on first use, so that mappers registered after the class generation are honoured too
+    value_mappers_by_class_and_name = {}  # type: Dict[Tuple[Type[BaseEditHistory], str], ValueMapper]
+    value_decoders_by_class_and_field_id = {}  # type: Dict[Tuple[Type[BaseEditHistory], str], ValueDecoder]
 
     class EditHistory(BaseEditHistory):
         """History of (diffable) model edits"""
@@ -135,12 +322,17 @@ def generate_history_class(
         class Meta:
             abstract = True
 
-        model = models.ForeignKey(model_class, on_delete=models.CASCADE)
+        model = models.ForeignKey(
+            model_class,
+            on_delete=models.CASCADE if history_on_delete == HISTORY_ON_DELETE_CASCADE else models.DO_NOTHING,
+            db_constraint=database is None and history_on_delete != HISTORY_ON_DELETE_KEEP,
+        )
         user = models.ForeignKey(
             settings.AUTH_USER_MODEL,
             blank=True,
             null=True,
-            on_delete=models.PROTECT,
+            on_delete=models.PROTECT if database is None else models.DO_NOTHING,
+            db_constraint=database is None,
         )
         change_date = models.DateTimeField(default=timezone.now)
         field = models.CharField(
@@ -149,8 +341,23 @@ def generate_history_class(
         )
         old_value = json_field_class(**JSON_FIELD_KWARGS)
         new_value = json_field_class(**JSON_FIELD_KWARGS)
+        if numeric_delta_fields:
+            delta = get_numeric_delta_field([tracked_fields_choices_by_name[name].field_instance for name in numeric_delta_fields])
+        if storages_by_name:
+            delta_digest = models.CharField(max_length=40, null=True)
+            delta_depth = models.PositiveSmallIntegerField(null=True)
 
         FIELD_VALUE_MAPPER = DefaultFieldValueMapper()
+        FIELD_VALUE_DECODER = DefaultFieldValueDecoder()
+        COMPRESSION_THRESHOLD = compression_threshold
+        DATABASE = database
+        READ_DATABASE = read_database or database
+        WRITE_ON_COMMIT = write_on_commit
+        HISTORY_ON_DELETE = history_on_delete
+        DERIVE_OLD_VALUES = derive_old_values
+        CHANGE_FEED = change_feed
+        DEFERRED = deferred
+        HISTORY_WRITER = history_writer
 
         FIELDS_DESCRIPTIONS = field_choices  # Here we want all fields from model (even those excluded) and obsolete
         # Because history may contain entries from field, which become exclueded.
@@ -161,24 +368,274 @@ def generate_history_class(
             cls._meta.get_field('field').choices = [(description.id, description.verbose_name) for description in field_choices]
 
         @classmethod
-        def get_for(cls, instance: model_class) -> Iterable[Dict[str, Any]]:
-            history_qs = cls.objects.select_related('user').filter(model=instance).order_by('-id')
-            history = []
-            for entry in history_qs:
-                history.append(cls.get_history_entry(entry))
-            return history
+        def get_for(cls, instance: model_class, decode: bool = False, file_urls: bool = True) -> Iterable[Dict[str, Any]]:
+            return list(cls.get_history_entries(cls.get_history_queryset(instance), decode=decode, file_urls=file_urls))
 
         @classmethod
-        def get_history_entry(cls, entry: 'EditHistory') -> Dict[str, Any]:
-            # noinspection PyProtectedMember
-            try:
-                field = field_choices_by_id[entry.field].field_instance
-            except KeyError:
+        def get_history_queryset(cls, instance: model_class) -> models.QuerySet:
+            history_qs = cls.objects.filter(model=instance).order_by('-id')
+            if cls.DATABASE is None:
+                history_qs = history_qs.select_related('user')
+            return history_qs
+
+        @classmethod
+        def get_last_change_annotations(cls) -> Dict[str, models.Subquery]:
+            """Get annotations of tracked model querysets with the date and the user of the latest change of every instance."""
+            if cls.DATABASE is not None:
+                raise NotSupportedError('History stored in a separate database cannot be annotated onto querysets of tracked models')
+            last_entries = cls.objects.filter(model=models.OuterRef('pk')).order_by('-id')
+            return {
+                'last_change_date': models.Subquery(last_entries.values('change_date')[:1]),
+                'last_change_user_id': models.Subquery(last_entries.values('user_id')[:1]),
+            }
+
+        @classmethod
+        def prefetch_history_for(
+                cls,
+                instances: List[model_class],
+                limit: int,
+                decode: bool = False,
+                to_attr: str = 'history',
+                file_urls: bool = True,
+        ):
+            """Set the latest `limit` history entries (in dict form, the newest first) of every instance as its `to_attr` attribute.
+
+            Entries of all instances are loaded with two queries - the first one finds the oldest entry to be loaded for every instance.
+            """
+            if cls.DATABASE is not None:
+                raise NotSupportedError('History stored in a separate database cannot be prefetched for tracked models')
+            if limit < 1:
+                raise ValueError('Limit of prefetched history entries has to be positive')
+            pks = {instance.pk for instance in instances}
+            if not pks:
+                return
+            oldest_entries = cls.objects.filter(model=models.OuterRef('pk')).order_by('-id').values('id')[limit - 1:limit]
+            oldest_ids = model_class._base_manager.filter(pk__in=pks).annotate(oldest_id=models.Subquery(oldest_entries))
+            condition = models.Q(model__in=[])
+            for pk, oldest_id in oldest_ids.values_list('pk', 'oldest_id'):
+                condition |= models.Q(model=pk) if oldest_id is None else models.Q(model=pk, id__gte=oldest_id)
+            entries = cls.objects.filter(condition).select_related('user').order_by('-id')
+            if cls.DERIVE_OLD_VALUES:
+                entries = cls.annotate_previous_new_values(entries)
+            entries = list(entries)
+            history_by_pk = {pk: [] for pk in pks}  # type: Dict[Any, List[Dict[str, Any]]]
+            for entry, history_entry in zip(entries, cls.get_history_entries(entries, decode=decode, file_urls=file_urls)):
+                history_by_pk[entry.model_id].append(history_entry)
+            for instance in instances:
+                setattr(instance, to_attr, history_by_pk[instance.pk])
+
+        @classmethod
+        def get_page_for(
+                cls,
+                instance: model_class,
+                decode: bool = False,
+                offset: int = 0,
+                limit: Optional[int] = None,
+                file_urls: bool = True,
+        ) -> List[Dict[str, Any]]:
+            history_qs = cls.get_history_queryset(instance)[offset:None if limit is None else offset + limit]
+            return list(cls.get_history_entries(history_qs, decode=decode, file_urls=file_urls))
+
+        @classmethod
+        def get_chunk_for(
+                cls,
+                instance: model_class,
+                decode: bool = False,
+                before_id: Optional[int] = None,
+                chunk_size: int = DECODING_CHUNK_SIZE,
+                file_urls: bool = True,
+        ) -> Tuple[List[Dict[str, Any]], Optional[int]]:
+            """Get entries older than the `before_id` entry in dict form and id of the last of them."""
+            history_qs = cls.get_history_queryset(instance)
+            if before_id is not None:
+                history_qs = history_qs.filter(id__lt=before_id)
+            if cls.DERIVE_OLD_VALUES:
+                history_qs = cls.annotate_previous_new_values(history_qs)
+            entries = list(history_qs[:chunk_size])
+            return list(cls.get_history_entries(entries, decode=decode, file_urls=file_urls)), entries[-1].pk if entries else None
+
+        @classmethod
+        def get_delta_aggregates(
+                cls,
+                field_name: str,
+                period: str = 'day',
+                entries: Optional[models.QuerySet] = None,
+        ) -> List[Tuple[datetime, Any]]:
+            """Get sums of deltas of the numeric delta field per period (a kind of `Trunc` - `'hour'`, `'day'`, `'month'` etc.)."""
+            if field_name not in numeric_delta_fields:
+                raise ImproperlyConfigured('Field %s of %s is not a numeric delta field' % (field_name, model_class.__name__))
+            entries = cls.objects.all() if entries is None else entries
+            return list(
+                entries
+                .filter(field=cls.get_tracked_field_choice_by_name(field_name).id, delta__isnull=False)
+                .annotate(period=Trunc('change_date', period))
+                .order_by('period')
+                .values('period')
+                .annotate(total=models.Sum('delta'))
+                .values_list('period', 'total')
+            )
+
+        @classmethod
+        async def aget_for(
+                cls,
+                instance: model_class,
+                decode: bool = False,
+                offset: int = 0,
+                limit: Optional[int] = None,
+                file_urls: bool = True,
+        ) -> List[Dict[str, Any]]:
+            """Get a page of history of the instance, reading it in a thread."""
+            return await sync_to_async(cls.get_page_for)(instance, decode, offset, limit, file_urls)
+
+        @classmethod
+        async def aiter_for(
+                cls,
+                instance: model_class,
+                decode: bool = False,
+                chunk_size: int = DECODING_CHUNK_SIZE,
+                file_urls: bool = True,
+        ) -> AsyncIterator[Dict[str, Any]]:
+            """Iterate over history of the instance, reading it chunk by chunk in a thread."""
+            before_id = None
+            while True:
+                entries, before_id = await sync_to_async(cls.get_chunk_for)(instance, decode, before_id, chunk_size, file_urls)
+                for entry in entries:
+                    yield entry
+                if len(entries) < chunk_size:
+                    return
+
+        @classmethod
+        def get_history_entries(
+                cls,
+                entries: Iterable['EditHistory'],
+                decode: bool = False,
+                chunk_size: int = DECODING_CHUNK_SIZE,
+                file_urls: bool = True,
+        ) -> Iterator[Dict[str, Any]]:
+            """Transform history entries to dict form chunk by chunk.
+
+            Querysets are iterated without caching their results, so that exporting a big history does not keep all entries in memory.
+            Stored names of files are replaced by their URLs, resolved once for every name (unless `file_urls` is false).
+            """
+            urls_by_field_id_and_name = {}  # type: Dict[Tuple[str, str], str]
+            if isinstance(entries, models.QuerySet) and entries._result_cache is None:  # pylint: disable=protected-access
+                if cls.DERIVE_OLD_VALUES:
+                    entries = cls.annotate_previous_new_values(entries)
+                entries = entries.iterator(chunk_size=chunk_size)
+            entries = iter(entries)
+            while True:
+                chunk = list(islice(entries, chunk_size))
+                if not chunk:
+                    return
+                stored_contents = None
+                if content_addressed_fields:
+                    # stored values referenced by the chunk are loaded at once instead of one by one
+                    stored_contents = load_contents(get_referenced_digests(
+                        decompress_value(value) for entry in chunk for value in (entry.old_value, entry.new_value)
+                    ))
+                history_entries = cls.transform_entries(chunk, decode=decode, stored_contents=stored_contents)
+                if file_urls:
+                    cls.resolve_file_urls(chunk, history_entries, urls_by_field_id_and_name)
+                for history_entry in history_entries:
+                    yield history_entry
+
+        @classmethod
+        def resolve_file_urls(
+                cls,
+                entries: List['EditHistory'],
+                history_entries: List[Dict[str, Any]],
+                urls_by_field_id_and_name: Dict[Tuple[str, str], str],
+        ):
+            """Replace stored names of files in history entries with their URLs, asking storages only for names not resolved yet."""
+            names_by_field_id = {}  # type: Dict[str, set]
+            for entry, history_entry in zip(entries, history_entries):
+                if not isinstance(field_choices_by_id[entry.field].field_instance, models.FileField):
+                    continue
+                for name in (history_entry['old_value'], history_entry['new_value']):
+                    if name and not is_file_url(name) and (entry.field, name) not in urls_by_field_id_and_name:
+                        names_by_field_id.setdefault(entry.field, set()).add(name)
+            for field_id, names in names_by_field_id.items():
+                urls_by_name = cls.get_file_urls(field_choices_by_id[field_id].field_instance, names)
+                urls_by_field_id_and_name.update(((field_id, name), url) for name, url in urls_by_name.items())
+            for entry, history_entry in zip(entries, history_entries):
+                if isinstance(field_choices_by_id[entry.field].field_instance, models.FileField):
+                    for key in ('old_value', 'new_value'):
+                        history_entry[key] = urls_by_field_id_and_name.get((entry.field, history_entry[key]), history_entry[key])
+
+        @classmethod
+        def get_file_urls(cls, field: models.FileField, names: Iterable[str]) -> Dict[str, str]:
+            """Get URLs of files stored under given names - a single call for all names, which storages can override to batch."""
+            return {name: field.storage.url(name) for name in names}
+
+        @classmethod
+        def get_history_entry(
+                cls,
+                entry: 'EditHistory',
+                decode: bool = False,
+                stored_contents: Optional[Dict[str, bytes]] = None,
+        ) -> Dict[str, Any]:
+            return cls.transform_entries([entry], decode=decode, stored_contents=stored_contents)[0]
+
+        @classmethod
+        def transform_entries(
+                cls,
+                entries: List['EditHistory'],
+                decode: bool = False,
+                stored_contents: Optional[Dict[str, bytes]] = None,
+        ) -> List[Dict[str, Any]]:
+            """Transform history entries to dict form, decoding values of every field in a single pass over the entries."""
+            values = [cls.get_entry_values(entry, stored_contents) for entry in entries]
+            if decode:
+                values_by_field_id = {}  # type: Dict[str, List[ValueRepresentation]]
+                for entry, entry_values in zip(entries, values):
+                    values_by_field_id.setdefault(entry.field, []).extend(entry_values)
+                # decoded values of every field are taken in the order in which they were collected
+                decoded_values_by_field_id = {
+                    field_id: iter(cls.decode_column(field_id, field_values)) for field_id, field_values in values_by_field_id.items()
+                }
+                values = [(next(decoded_values_by_field_id[entry.field]), next(decoded_values_by_field_id[entry.field])) for entry in entries]
+            if cls.DATABASE is not None:
+                cls.load_users(entries)
+            return [cls.get_entry_dict(entry, old_value, new_value) for entry, (old_value, new_value) in zip(entries, values)]
+
+        @classmethod
+        def decode_column(cls, field_id: str, values: List[ValueRepresentation]) -> List[Any]:
+            """Decode values of the field, every distinct value once."""
+            value_decoder = cls.get_value_decoder(field_id)
+            decoded_values_by_value = {}  # type: Dict[ValueRepresentation, Any]
+            decoded_values = []
+            for value in values:
+                try:
+                    decoded_value = decoded_values_by_value[value]
+                except KeyError:
+                    decoded_value = decoded_values_by_value[value] = value_decoder(value)
+                except TypeError:  # representations of related objects are not hashable
+                    decoded_value = value_decoder(value)
+                decoded_values.append(decoded_value)
+            return decoded_values
+
+        @classmethod
+        def get_entry_values(cls, entry: 'EditHistory', stored_contents: Optional[Dict[str, bytes]] = None) -> Tuple[Any, Any]:
+            """Get stored representations of the old and the new value of the entry, resolving references, deltas and compression."""
+            if entry.field not in field_choices_by_id:
                 raise cls.UnknownFieldException('Field \'{}\' is neither in model nor in obsolete fields'.format(entry.field))
 
             old_value = entry.old_value
-            new_value = entry.new_value
+            if is_previous_value_reference(old_value):
+                old_value = cls.get_previous_new_value(entry)
+            old_value = decompress_value(old_value)
+            new_value = decompress_value(entry.new_value)
+
+            if is_delta_envelope(old_value) or is_delta_envelope(new_value):
+                old_value, new_value = get_old_value(cls, old_value), get_new_value(cls, old_value, new_value)
+            if is_stored_reference(old_value) or is_stored_reference(new_value):
+                old_value = get_stored_representation(old_value, stored_contents)
+                new_value = get_stored_representation(new_value, stored_contents)
+            return old_value, new_value
 
+        @classmethod
+        def get_entry_dict(cls, entry: 'EditHistory', old_value: Any, new_value: Any) -> Dict[str, Any]:
+            field = field_choices_by_id[entry.field].field_instance
             if field.flatchoices:
                 old_value = force_text(dict(field.flatchoices).get(old_value, old_value), strings_only=True)
                 new_value = force_text(dict(field.flatchoices).get(new_value, new_value), strings_only=True)
@@ -192,6 +649,73 @@ def generate_history_class(
                 'new_value': new_value,
             }
 
+        @classmethod
+        def load_users(cls, entries: List['EditHistory']):
+            """Load users of entries from their own database in a single query."""
+            user_field = cls._meta.get_field('user')
+            entries = [entry for entry in entries if not user_field.is_cached(entry)]
+            users_by_pk = get_user_model()._default_manager.in_bulk({entry.user_id for entry in entries if entry.user_id is not None})
+            for entry in entries:
+                user_field.set_cached_value(entry, users_by_pk.get(entry.user_id))
+
+        @classmethod
+        def annotate_previous_new_values(cls, queryset: models.QuerySet) -> models.QuerySet:
+            """Fetch new values of entries preceding the entries of the queryset (and their ids) in the same query."""
+            previous_entries = cls.objects.filter(
+                model=models.OuterRef('model'), field=models.OuterRef('field'), id__lt=models.OuterRef('id'),
+            ).order_by('-id')
+            return queryset.annotate(**{
+                PREVIOUS_NEW_VALUE_ATTNAME: models.Subquery(previous_entries.values('new_value')[:1], output_field=cls._meta.get_field('new_value')),
+                PREVIOUS_ENTRY_ID_ATTNAME: models.Subquery(previous_entries.values('id')[:1]),
+            })
+
+        @classmethod
+        def get_previous_new_value(cls, entry: 'EditHistory') -> Any:
+            """Get the stored new value of the entry referenced by the old value of the given one - None if it was deleted.
+
+            References stored by older versions do not contain the id of the entry and are resolved to the preceding entry.
+            """
+            referenced_id = entry.old_value.get(PREVIOUS_ENTRY_KEY)
+            try:
+                previous_entry_id, previous_new_value = getattr(entry, PREVIOUS_ENTRY_ID_ATTNAME), getattr(entry, PREVIOUS_NEW_VALUE_ATTNAME)
+            except AttributeError:
+                pass
+            else:
+                if referenced_id is None or referenced_id == previous_entry_id:
+                    return previous_new_value
+            if referenced_id is not None:
+                # an entry of a concurrent change may have been created between the referenced entry and the given one
+                return cls.objects.filter(id=referenced_id).values_list('new_value', flat=True).first()
+            previous_entries = cls.objects.filter(model_id=entry.model_id, field=entry.field, id__lt=entry.id)
+            return previous_entries.order_by('-id').values_list('new_value', flat=True).first()
+
+        @classmethod
+        def get_stored_old_value(cls, instance: model_class, field_id: str, old_value: ValueRepresentation) -> Any:
+            """Get the form in which the old value is stored - a reference if it is derivable from the previous entry."""
+            stored_old_value = cls.get_stored_value(old_value)
+            if not cls.DERIVE_OLD_VALUES:
+                return stored_old_value
+            previous_entries = cls.objects.using(router.db_for_write(cls)).filter(model=instance, field=field_id)
+            previous = previous_entries.order_by('-id').values_list('id', 'new_value').first()
+            if previous is not None and previous[1] == (None if stored_old_value is JSON_NULL else stored_old_value):
+                # the entry is referenced by its id, as entries of concurrent changes may be created before this one
+                return get_previous_value_reference(previous[0])
+            return stored_old_value
+
+        @classmethod
+        def get_value_decoder(cls, field_id: str) -> ValueDecoder:
+            try:
+                return value_decoders_by_class_and_field_id[cls, field_id]
+            except KeyError:
+                field = field_choices_by_id[field_id].field_instance
+                compile_decoder = getattr(cls.FIELD_VALUE_DECODER, 'compile', None)
+                if compile_decoder is not None:
+                    value_decoder = compile_decoder(field)
+                else:
+                    value_decoder = partial(cls.FIELD_VALUE_DECODER, field)
+                value_decoders_by_class_and_field_id[cls, field_id] = value_decoder
+                return value_decoder
+
         @classmethod
         def get_tracked_field_choice_by_name(cls, name: str) -> FieldDescription:
             try:
@@ -201,31 +725,324 @@ def generate_history_class(
 
         @classmethod
         def get_value_representation(cls, name: str, value: FieldValue) -> ValueRepresentation:
-            field = cls.get_tracked_field_choice_by_name(name).field_instance
-            return cls.FIELD_VALUE_MAPPER(field, value)
+            return cls.get_value_mapper(name)(value)
+
+        @classmethod
+        def get_value_mapper(cls, name: str) -> ValueMapper:
+            try:
+                return value_mappers_by_class_and_name[cls, name]
+            except KeyError:
+                field = cls.get_tracked_field_choice_by_name(name).field_instance
+                compile_mapper = getattr(cls.FIELD_VALUE_MAPPER, 'compile', None)
+                if compile_mapper is not None:
+                    value_mapper = compile_mapper(field)
+                else:
+                    value_mapper = partial(cls.FIELD_VALUE_MAPPER, field)
+                value_mappers_by_class_and_name[cls, name] = value_mapper
+                return value_mapper
+
+        @classmethod
+        def get_stored_value(cls, value: ValueRepresentation) -> Any:
+            """Get the form in which the value representation is stored."""
+            if cls.COMPRESSION_THRESHOLD is not None:
+                return compress_value(value, cls.COMPRESSION_THRESHOLD)
+            return value
+
+        @classmethod
+        def get_value_reference(cls, name: str, value: FieldValue) -> Any:
+            """Store the value of content addressed field and get a reference to it.
+
+            Binary values are stored as they are, other values as JSON of their representations.
+            """
+            if value is None:
+                return JSON_NULL
+            if isinstance(cls.get_tracked_field_choice_by_name(name).field_instance, models.BinaryField):
+                return store_bytes(value)
+            return store_representation(cls.get_value_representation(name, value))
+
+        @classmethod
+        def save_entry(
+                cls,
+                instance: model_class,
+                entry: 'EditHistory',
+                update_fields: Optional[List[str]] = None,
+        ) -> Optional[Callable]:
+            """Save the entry - after commit of the transaction of the instance with `write_on_commit` or a history writer.
+
+            Return the callback registered to be run on commit, if any.
+            """
+            write_entry = cls.write_entry
+            if update_fields is None and entry.field in debounce_windows_by_field_id:
+                write_entry = cls.write_debounced_entry
+            if cls.HISTORY_WRITER is not None and update_fields is None:
+                callback = partial(cls.HISTORY_WRITER.submit, cls, entry)
+            elif cls.WRITE_ON_COMMIT:
+                callback = partial(write_entry, entry, update_fields)
+            else:
+                write_entry(entry, update_fields)
+                return None
+            transaction.on_commit(callback, using=instance._state.db)
+            return callback
+
+        @classmethod
+        def write_debounced_entry(cls, entry: 'EditHistory', update_fields: Optional[List[str]] = None):  # pylint: disable=unused-argument
+            if not cls.merge_entry(entry):
+                cls.write_entry(entry)
+
+        @classmethod
+        def merge_entry(cls, entry: 'EditHistory') -> bool:
+            """Merge the entry into the latest entry of the same instance and field, made by the same user within the debounce window.
+
+            The entry is merged with a single conditional update, unless the database cannot select from the updated table in
+            the update or the id of the merged entry is needed for the change feed. The merged entry keeps the date of its first
+            change, so that the window is not moved forward by every merged change.
+            """
+            database = router.db_for_write(cls)
+            open_entries = cls.objects.using(database).filter(
+                model_id=entry.model_id,
+                field=entry.field,
+                user_id=entry.user_id,
+                change_date__gte=entry.change_date - debounce_windows_by_field_id[entry.field],
+            )
+            latest_entries = cls.objects.using(database).filter(model_id=entry.model_id, field=entry.field).order_by('-id').values('id')
+            values = {'new_value': entry.new_value}
+            if numeric_delta_fields:
+                values['delta'] = None if entry.delta is None else models.F('delta') + entry.delta
+            if not cls.CHANGE_FEED and connections[database].features.update_can_self_select:
+                return bool(open_entries.filter(id=models.Subquery(latest_entries[:1])).update(**values))
+            with transaction.atomic(using=database):
+                latest_entry_id = latest_entries.values_list('id', flat=True).first()
+                if latest_entry_id is None:
+                    return False
+                if not open_entries.filter(id=latest_entry_id).update(**values):
+                    return False
+                if cls.CHANGE_FEED:
+                    ChangeFeedEntry.objects.using(router.db_for_write(ChangeFeedEntry)).create(
+                        history_model=cls._meta.label, entry_id=latest_entry_id,
+                    )
+            return True
+
+        @classmethod
+        def write_entry(cls, entry: 'EditHistory', update_fields: Optional[List[str]] = None):
+            if not cls.CHANGE_FEED:
+                cls._save_entry(entry, update_fields)
+                return
+            with transaction.atomic(using=router.db_for_write(cls)):
+                cls._save_entry(entry, update_fields)
+                ChangeFeedEntry.objects.using(router.db_for_write(ChangeFeedEntry)).create(history_model=cls._meta.label, entry_id=entry.pk)
+
+        @staticmethod
+        def _save_entry(entry: 'EditHistory', update_fields: Optional[List[str]]):
+            if update_fields is None:
+                entry.save(force_insert=True)
+            else:
+                entry.save(update_fields=update_fields)
+
+        @classmethod
+        def is_history_paused(cls) -> bool:
+            # changes of relations and deletions are not summarized, so they are tracked in summary pauses
+            history_pause = get_history_pause(model_class, cls)
+            return history_pause is not None and not history_pause.summary
 
         @classmethod
         def create_history(cls, instance: model_class, diff_items: List[ModelDiffItem]):
             # noinspection PyProtectedMember
             # pylint: disable=protected-access
             user = usersmuggler.get_user()
+            if change_predicates:
+                # checked on raw values, before any representation is computed
+                diff_items = [
+                    (field_name, values) for field_name, values in diff_items
+                    if field_name not in change_predicates or change_predicates[field_name](*values)
+                ]
+            if cls.DEFERRED:
+                cls.stage_changes(instance, diff_items, getattr(user, 'pk', None))
+            else:
+                cls.create_entries(instance, diff_items, getattr(user, 'pk', None))
+
+            # ensure this properties are empty for further m2m checks
+            instance._wicked_historian_last_m2m_record = None
+            instance._wicked_historian_m2m_changes = {}
+
+        @classmethod
+        def create_entries(
+                cls,
+                instance: model_class,
+                diff_items: List[ModelDiffItem],
+                user_id: Any,
+                change_date: Optional[datetime] = None,
+        ):
+            # entries are built lazily, so that every entry is saved before the next one reads previous entries
+            for entry in cls.build_entries(instance, diff_items, user_id, change_date):
+                cls.save_entry(instance, entry)
+
+        @classmethod
+        def build_entries(
+                cls,
+                instance: model_class,
+                diff_items: List[ModelDiffItem],
+                user_id: Any,
+                change_date: Optional[datetime] = None,
+        ) -> Iterator['EditHistory']:
             for field_name, values in diff_items:
                 try:
-                    old_value = cls.get_value_representation(field_name, values[0])
-                    new_value = cls.get_value_representation(field_name, values[1])
-                    cls.objects.create(
+                    if field_name in content_addressed_fields:
+                        old_value = cls.get_value_reference(field_name, values[0])
+                        new_value = cls.get_value_reference(field_name, values[1])
+                    else:
+                        old_value = cls.get_value_representation(field_name, values[0])
+                        new_value = cls.get_value_representation(field_name, values[1])
+                    field_id = cls.get_tracked_field_choice_by_name(field_name).id
+                    if field_name in storages_by_name:
+                        old_value, new_value = storages_by_name[field_name].prepare_values(cls, instance, field_id, old_value, new_value)
+                        stored_old_value = cls.get_stored_value(old_value)
+                    else:
+                        stored_old_value = cls.get_stored_old_value(instance, field_id, old_value)
+                    entry = cls(
                         model=instance,
-                        field=cls.get_tracked_field_choice_by_name(field_name).id,
-                        old_value=old_value,
-                        new_value=new_value,
-                        user=user,
+                        field=field_id,
+                        old_value=stored_old_value,
+                        new_value=cls.get_stored_value(new_value),
+                        user_id=user_id,
                     )
+                    if change_date is not None:
+                        entry.change_date = change_date
+                    if field_name in storages_by_name:
+                        entry.delta_digest, entry.delta_depth = get_version(new_value)
+                    if field_name in numeric_delta_fields:
+                        entry.delta = get_numeric_delta(cls.get_tracked_field_choice_by_name(field_name).field_instance, *values)
                 except cls.FieldNotTracked:
-                    pass
+                    continue
+                yield entry
 
-            # ensure this properties are empty for further m2m checks
-            instance._wicked_historian_last_m2m_record = None
-            instance._wicked_historian_m2m_changes = {}
+        @classmethod
+        def stage_changes(
+                cls,
+                instance: model_class,
+                diff_items: List[ModelDiffItem],
+                user_id: Any,
+                represented_items: Optional[List[Tuple[str, Tuple[Any, Any]]]] = None,
+        ):
+            """Store raw values of changes of tracked fields to create history entries from them later.
+
+            Changes of many-to-many and reverse foreign key relations (also `represented_items` - their changes already
+            represented) are stored with representations of related objects, as these objects may change in the meantime.
+            Staged in the order of changes, they get entries in this order.
+            """
+            diff = []
+            relations = [[field_name, old_value, new_value] for field_name, (old_value, new_value) in represented_items or []]
+            for field_name, values in diff_items:
+                try:
+                    field = cls.get_tracked_field_choice_by_name(field_name).field_instance
+                except cls.FieldNotTracked:
+                    continue
+                if field.many_to_many or isinstance(field, ReverseForeignKeyRelation):
+                    relations.append([field_name] + [cls.get_value_representation(field_name, value) for value in values])
+                else:
+                    diff.append([field_name, get_raw_value(values[0]), get_raw_value(values[1])])
+            if not diff and not relations:
+                return
+            payload = {'model': instance.pk, 'user': user_id, 'diff': diff}
+            if relations:
+                payload['relations'] = relations
+            staged_change = StagedChange(history_model=cls._meta.label, payload=json.dumps(payload, default=str))
+            if cls.WRITE_ON_COMMIT:
+                transaction.on_commit(partial(staged_change.save, force_insert=True), using=instance._state.db)
+            else:
+                staged_change.save(force_insert=True)
+
+        @classmethod
+        def create_history_from_staged_changes(cls, staged_changes: List[StagedChange]):
+            """Create history entries from staged changes, loading objects referenced by foreign keys at once.
+
+            Entries are inserted with a single query, unless they are built from previous entries (delta encoded fields, derived
+            old values, debounced fields) or their ids are needed (change feed) - then they are saved one by one.
+            """
+            changes = []
+            pks_by_related_model = {}  # type: Dict[Type[Model], set]
+            for staged_change in staged_changes:
+                payload = json.loads(staged_change.payload)
+                diff_items = []
+                for field_name, old_value, new_value in payload['diff']:
+                    field = cls.get_tracked_field_choice_by_name(field_name).field_instance
+                    values = get_value_from_raw(field, old_value), get_value_from_raw(field, new_value)
+                    if isinstance(field, models.ForeignKey):
+                        pks_by_related_model.setdefault(field.related_model, set()).update(value for value in values if value is not None)
+                    diff_items.append((field_name, values))
+                changes.append((
+                    model_class._meta.pk.to_python(payload['model']), payload['user'], staged_change.change_date, diff_items,
+                    payload.get('relations', []),
+                ))
+
+            existing_pks = set(model_class._base_manager.filter(pk__in={change[0] for change in changes}).values_list('pk', flat=True))
+            related_objects = {}  # type: Dict[Tuple[Type[Model], Any], Model]
+            representations = {}  # type: Dict[Tuple[Type[Model], Any], str]
+            for related_model, pks in pks_by_related_model.items():
+                representation = get_related_object_representation(related_model)
+                if representation is not None:
+                    loaded = representation.get_representations(related_model, pks)
+                    representations.update(((related_model, pk), text) for pk, text in loaded.items())
+                else:
+                    loaded = related_model._default_manager.in_bulk(pks)
+                    related_objects.update(((related_model, pk), obj) for pk, obj in loaded.items())
+                # objects deleted before the change is materialized are represented by their primary keys
+                representations.update(((related_model, pk), force_text(pk)) for pk in pks if pk not in loaded)
+            save_one_by_one = storages_by_name or cls.DERIVE_OLD_VALUES or cls.CHANGE_FEED or debounce_windows_by_field_id
+            entries = []
+            with prefetched_related_objects.prefetch(related_objects, representations):
+                for pk, user_id, change_date, diff_items, relations in changes:
+                    if pk not in existing_pks and cls.HISTORY_ON_DELETE != HISTORY_ON_DELETE_KEEP:
+                        continue  # history of the deleted instance is deleted
+                    instance = model_class(pk=pk)
+                    if save_one_by_one:
+                        cls.create_entries(instance, diff_items, user_id, change_date)
+                    else:
+                        entries.extend(cls.build_entries(instance, diff_items, user_id, change_date))
+                    for field_name, old_value, new_value in relations:
+                        try:
+                            field_id = cls.get_tracked_field_choice_by_name(field_name).id
+                        except cls.FieldNotTracked:
+                            continue
+                        entry = cls(
+                            model=instance,
+                            field=field_id,
+                            old_value=cls.get_stored_old_value(instance, field_id, old_value),
+                            new_value=cls.get_stored_value(new_value),
+                            user_id=user_id,
+                            change_date=change_date,
+                        )
+                        if save_one_by_one:
+                            cls.save_entry(instance, entry)
+                        else:
+                            entries.append(entry)
+            if entries:
+                cls.objects.using(router.db_for_write(cls)).bulk_create(entries)
+
+        @classmethod
+        def delete_history(cls, sender: Type[Model], instance: model_class, **kwargs):  # pylint: disable=unused-argument
+            """Delete history of the instance being deleted with a single query, without loading it."""
+            database = router.db_for_write(cls)
+            cls.objects.using(database).filter(model_id=instance.pk)._raw_delete(database)  # pylint: disable=protected-access
+
+        @classmethod
+        def create_deletion_history(cls, sender: Type[Model], instance: model_class, **kwargs):  # pylint: disable=unused-argument
+            """Create the final entry of the deleted instance - a change of its primary key to null."""
+            if cls.is_history_paused():
+                return
+            pk_name = model_class._meta.pk.name  # pylint: disable=protected-access
+            try:
+                field_id = cls.get_tracked_field_choice_by_name(pk_name).id
+            except cls.FieldNotTracked:
+                return
+            user = usersmuggler._get_stored_user()  # pylint: disable=protected-access
+            cls.save_entry(instance, cls(
+                model_id=instance.pk,
+                field=field_id,
+                old_value=cls.get_stored_old_value(instance, field_id, cls.get_value_representation(pk_name, instance.pk)),
+                new_value=JSON_NULL,
+                # deletions do not require the user (they may cascade from other models or be made by management commands)
+                user=None if user is usersmuggler.NOT_SET else user,
+            ))
 
         @classmethod
         def create_m2m_history(cls, instance: model_class):
@@ -238,21 +1055,32 @@ def generate_history_class(
             m2m_changes = instance._wicked_historian_m2m_changes
             old_fields = m2m_changes['old_value']
             new_fields = m2m_changes['new_value']
+            if cls.DEFERRED:
+                # staged together with changes of fields, so that entries are created in the order of changes (not squashed)
+                if m2m_changes['field_name'] in tracked_fields_choices_by_name:
+                    cls.stage_changes(instance, [], getattr(user, 'pk', None), [(m2m_changes['field_name'], (old_fields, new_fields))])
+                return
 
             last_m2m_record = getattr(instance, '_wicked_historian_last_m2m_record', None)
+            if last_m2m_record is not None and last_m2m_record.pk is None and not is_waiting_for_commit(
+                    instance._wicked_historian_last_m2m_record_callback, instance._state.db):
+                last_m2m_record = None  # the transaction in which the record was to be saved was rolled back
 
             if last_m2m_record and last_m2m_record.field_name == m2m_changes['field_name']:
-                last_m2m_record.new_value = new_fields
-                last_m2m_record.save(update_fields=['new_value'])
+                last_m2m_record.new_value = cls.get_stored_value(new_fields)
+                if last_m2m_record.pk is not None:  # otherwise it is going to be saved on commit with the new value
+                    cls.save_entry(instance, last_m2m_record, update_fields=['new_value'])
             else:
                 try:
-                    instance._wicked_historian_last_m2m_record = cls.objects.create(
+                    field_id = cls.get_tracked_field_choice_by_name(m2m_changes['field_name']).id
+                    instance._wicked_historian_last_m2m_record = cls(
                         model=instance,
-                        field=cls.get_tracked_field_choice_by_name(m2m_changes['field_name']).id,
-                        old_value=old_fields,
-                        new_value=new_fields,
+                        field=field_id,
+                        old_value=cls.get_stored_old_value(instance, field_id, old_fields),
+                        new_value=cls.get_stored_value(new_fields),
                         user=user,
                     )
+                    instance._wicked_historian_last_m2m_record_callback = cls.save_entry(instance, instance._wicked_historian_last_m2m_record)
                 except cls.FieldNotTracked:
                     pass
 
@@ -260,20 +1088,13 @@ def generate_history_class(
         def m2m_changed(cls, sender: Type[Model], **kwargs):
             # pylint: disable=protected-access
 
+            if cls.is_history_paused():
+                return
             action = kwargs['action']
             instance = kwargs['instance']
+            field_name = m2m_field_names_by_through_and_related_model[sender, kwargs['model']]
 
-            if '_' in sender.__name__:
-                field_name = sender.__name__.split('_', 1)[1]
-            else:
-                # We gonna retrieve field name the hard way
-                model = kwargs['model']
-                # noinspection PyProtectedMember
-                field_name = [
-                    field.name for field in instance._meta.many_to_many if field.remote_field.model == model and field.remote_field.through == sender
-                ][0]
-
-            value = list(getattr(instance, field_name).all())
+            value = list(select_representations(getattr(instance, field_name).all()))
 
             if action in ['pre_add', 'pre_remove', 'pre_clear']:
                 instance._wicked_historian_m2m_changes = {
@@ -305,89 +1126,82 @@ def generate_history_class(
 
         @classmethod
         def custom_through_m2m_handlers_factory(cls, model: Type[Model], m2m_field: Type[Field]) -> Tuple[Callable, Callable]:
-            def get_fk_name_to_tracked_model(instance: Model) -> str:
-                """Class to retrieve field name. It handles case, when there is more than one FK to same Model in custom through.
+            through_model = m2m_field.remote_field.through
+            through_fields = m2m_field.remote_field.through_fields
+            # resolved once for the field, as through models may be shared by fields with different through_fields
+            if through_fields is not None:
+                fk_name = through_fields[0]
+            else:
+                # It handles case, when there is more than one FK to same Model in custom through.
+                fk_name = cls.get_foreign_key_field_name(through_model, model)
+            fk_attname = through_model._meta.get_field(fk_name).attname
 
-                :param instance: custom m2m instance
-                :type instance: Model
-                :return: field name of custom m2m which refers to current model.
-                :rtype: str
+            def get_changes_log(through_instance: Model) -> Dict[Any, Dict[str, Any]]:
+                """Get log of tracked instances related to the custom m2m instance, keyed by their primary keys.
+
+                Tracked instances are kept in the log between saves of the same custom m2m instance, so that consecutive changes
+                are squashed into the same history entry.
                 """
-                through_field = getattr(model_class, m2m_field.name).rel.through_fields
-                if through_field is not None:
-                    return through_field[0]
-                else:
-                    return cls.get_foreign_key_field_name(instance.__class__, model)
+                through_instance._wicked_historian_changes_for_related_m2m_models = getattr(
+                    through_instance, '_wicked_historian_changes_for_related_m2m_models', {},
+                )
+                return through_instance._wicked_historian_changes_for_related_m2m_models.setdefault(fk_name, {})
 
-            def get_instance_with_tracked_history(through_instance: Model, field_name: str, fresh_through_instance: Model) -> Model:
-                instance_with_tracked_history = getattr(fresh_through_instance, field_name)
-                # we retrieve an instance from the protected attribute or from the database if there is no data stored for the field
-                instance_from_cache = through_instance._wicked_historian_changes_for_related_m2m_models.get(field_name, {}).get(
-                    instance_with_tracked_history.pk, {}).get('instance')
-                instance_with_tracked_history = instance_from_cache or instance_with_tracked_history
-                return instance_with_tracked_history
+            def get_related_instances(instance_with_tracked_history: Model) -> List[Model]:
+                return list(select_representations(getattr(instance_with_tracked_history, m2m_field.name).all()))
 
-            def get_m2m_value(instance_with_tracked_history: Model) -> ValueRepresentation:
-                related_through_instances = list(getattr(instance_with_tracked_history, m2m_field.name).all())
-                return cls.get_value_representation(m2m_field.name, related_through_instances)
+            def get_related_pks(related_instances: Iterable[Model]) -> List[Any]:
+                return sorted(related_instance.pk for related_instance in related_instances)
 
             def are_signals_excluded(instance: Model) -> bool:
                 """Check if inside model signals exclusion context of this instance and field.
 
                 Used to exclude model signals from handling history creation.
                 """
-                field_name = get_fk_name_to_tracked_model(instance)
-                instance._wicked_historian_changes_for_related_m2m_models = getattr(
-                    instance, '_wicked_historian_changes_for_related_m2m_models', {},
-                )
-                instance_with_tracked_history = get_instance_with_tracked_history(instance, field_name, instance)
-                return signal_exclusion.are_model_signals_excluded(model_class, instance_with_tracked_history.pk, m2m_field.name)
-
-            def fill_wicked_historian_changes_for_related_m2m_models(through_instance: Model, fresh_through_instance: Optional[Model]=None):
-                # fresh_through_instance is other than through_instance only
-                # when custom m2m was pinned from through_instance to fresh_through_instance
-                fresh_through_instance = fresh_through_instance or through_instance
-                field_name = get_fk_name_to_tracked_model(through_instance)
-                through_instance._wicked_historian_changes_for_related_m2m_models = getattr(
-                    through_instance, '_wicked_historian_changes_for_related_m2m_models', {},
-                )
+                return signal_exclusion.are_model_signals_excluded(model_class, getattr(instance, fk_attname), m2m_field.name)
 
-                instance_with_tracked_history = get_instance_with_tracked_history(through_instance, field_name, fresh_through_instance)
-                previous_value = get_m2m_value(instance_with_tracked_history)
+            def store_previous_state(log: Dict[Any, Dict[str, Any]], instance_with_tracked_history: Model):
+                related_instances = get_related_instances(instance_with_tracked_history)
                 if getattr(instance_with_tracked_history, '_wicked_historian_m2m_changes', {}).get('field_name') != m2m_field.name:
+                    # representation of the old value is computed only when the relation turns out to be changed
                     instance_with_tracked_history._wicked_historian_m2m_changes = {
                         'field_name': m2m_field.name,
-                        'old_value': previous_value,
+                        'old_related_instances': related_instances,
                     }
-
-                log = through_instance._wicked_historian_changes_for_related_m2m_models
-                log.setdefault(field_name, {})
-                log[field_name][instance_with_tracked_history.pk] = {
-                    'previous_value': previous_value,  # previous value is used to avoid creating transitions to same state
+                log[instance_with_tracked_history.pk] = {
+                    'previous_pks': get_related_pks(related_instances),  # previous pks are used to avoid creating transitions to same state
                     'instance': instance_with_tracked_history,
                 }
 
             def pre_action(sender: Type[Model], instance: Model, **kwargs):  # pylint: disable=unused-argument
-                if are_signals_excluded(instance):
+                if cls.is_history_paused() or are_signals_excluded(instance):
                     return
-                instance_from_db = cls.get_model_or_none(instance)
+                log = get_changes_log(instance)
+                # we retrieve tracked instances from the log or from the database if there is no data stored for them
+                current_pk = getattr(instance, fk_attname)
+                store_previous_state(log, log.get(current_pk, {}).get('instance') or getattr(instance, fk_name))
+
                 # we have to save changes for old and new instance if m2m was pinned from old to new instance
-                # if m2m wasn't pinned then operation is idempotent
-                fill_wicked_historian_changes_for_related_m2m_models(instance)
-                fill_wicked_historian_changes_for_related_m2m_models(instance, instance_from_db)
+                if instance.pk is not None:
+                    pk_from_db = instance.__class__._default_manager.filter(pk=instance.pk).values_list(fk_attname, flat=True).first()
+                    if pk_from_db is not None and pk_from_db != current_pk:
+                        store_previous_state(log, log.get(pk_from_db, {}).get('instance') or model._base_manager.get(pk=pk_from_db))
 
             def post_action(sender: Type[Model], instance: Model, **kwargs):  # pylint: disable=unused-argument
-                if are_signals_excluded(instance):
+                if cls.is_history_paused() or are_signals_excluded(instance):
                     return
-                field_name = get_fk_name_to_tracked_model(instance)
-                log = instance._wicked_historian_changes_for_related_m2m_models[field_name]
-                for pk, value in log.items():
+                for value in get_changes_log(instance).values():
+                    if 'previous_pks' not in value:
+                        continue  # instance was not touched by this action
+                    previous_pks = value.pop('previous_pks')
                     instance_with_tracked_history = value['instance']
-                    new_value = get_m2m_value(instance_with_tracked_history)
-                    by_pk = lambda x: x['pk']
-                    if sorted(log[instance_with_tracked_history.pk]['previous_value'], key=by_pk) == sorted(new_value, key=by_pk):
+                    related_instances = get_related_instances(instance_with_tracked_history)
+                    if get_related_pks(related_instances) == previous_pks:
                         continue
-                    instance_with_tracked_history._wicked_historian_m2m_changes['new_value'] = new_value
+                    m2m_changes = instance_with_tracked_history._wicked_historian_m2m_changes
+                    if 'old_value' not in m2m_changes:
+                        m2m_changes['old_value'] = cls.get_value_representation(m2m_field.name, m2m_changes.pop('old_related_instances'))
+                    m2m_changes['new_value'] = cls.get_value_representation(m2m_field.name, related_instances)
                     cls.create_m2m_history(instance_with_tracked_history)
 
             return pre_action, post_action
@@ -399,7 +1213,8 @@ def generate_history_class(
                     return None, None
                 tracked_history_instance = getattr(instance, field_for_factory.field.name)
                 if tracked_history_instance is not None:
-                    return tracked_history_instance.pk, list(getattr(tracked_history_instance, field_for_factory.get_accessor_name()).all())
+                    related_objects = getattr(tracked_history_instance, field_for_factory.get_accessor_name()).all()
+                    return tracked_history_instance.pk, list(select_representations(related_objects))
                 return None, None
 
             def set_value(instance, record, name):
@@ -412,6 +1227,8 @@ def generate_history_class(
                 set_value(instance, get_current_value(instance_from_db), 'old_value')
 
             def pre_action(sender: Type[Model], instance: Model, **kwargs):
+                if cls.is_history_paused():
+                    return
                 previous_instance_from_db = cls.get_model_or_none(instance)
                 instance._previous_values = {}
                 instance._previous_instance_from_db = previous_instance_from_db
@@ -419,6 +1236,8 @@ def generate_history_class(
                 _fill_previous_values(instance, instance_from_db=previous_instance_from_db)
 
             def post_action(sender: Type[Model], instance: Model, **kwargs):
+                if cls.is_history_paused():
+                    return
                 set_value(instance, get_current_value(instance), 'new_value')
                 set_value(instance, get_current_value(instance._previous_instance_from_db), 'new_value')
                 for pk, data in instance._previous_values.items():
@@ -440,6 +1259,7 @@ def generate_history_class(
             for field in model_class._meta.get_fields():
                 if field.many_to_many and not field.auto_created:
                     through_model = getattr(getattr(model_class, field.name), 'through')
+                    m2m_field_names_by_through_and_related_model[through_model, field.remote_field.model] = field.name
                     m2m_changed.connect(
                         cls.m2m_changed,
                         sender=through_model,
@@ -512,10 +1332,15 @@ def generate_history_class(
                             decorated_method = bulk_mode_check(method, field.get_accessor_name())
                             setattr(related_descriptor.related_manager_cls, method_name, decorated_method)
 
-
-
             cls.m2m_signals_registered = True
 
+        @classmethod
+        def register_deletion_signals(cls):
+            if history_on_delete == HISTORY_ON_DELETE_DELETE:
+                pre_delete.connect(cls.delete_history, sender=model_class, dispatch_uid='{}__delete_history'.format(cls.__name__))
+            elif history_on_delete == HISTORY_ON_DELETE_KEEP:
+                post_delete.connect(cls.create_deletion_history, sender=model_class, dispatch_uid='{}__keep_history'.format(cls.__name__))
+
         def __str__(self) -> str:
             return u'{0} {1} - {2}: {3} => {4}'.format(
                 self.user,
@@ -544,7 +1369,27 @@ def generate_history_class(
         attributes['Meta'] = AbstractMeta
         prefix = 'Base'
 
-    return type('%s%sEditHistory' % (prefix, model_class.__name__), (EditHistory, ), attributes)
+    history_class = type('%s%sEditHistory' % (prefix, model_class.__name__), (EditHistory, ), attributes)
+    # history of deleted instances depends on these receivers, so they are connected as soon as the history model is created
+    if not abstract:
+        history_class.register_deletion_signals()
+    elif history_on_delete != HISTORY_ON_DELETE_CASCADE:
+
+        def register_deletion_signals(sender: Type[Model], **kwargs):  # pylint: disable=unused-argument
+            if issubclass(sender, history_class) and not sender._meta.abstract:
+                sender.register_deletion_signals()
+
+        class_prepared.connect(
+            register_deletion_signals,
+            weak=False,
+            dispatch_uid='{}.{}__register_deletion_signals'.format(module, history_class.__name__),
+        )
+    return history_class
+
+
+def is_waiting_for_commit(callback: Optional[Callable], using: str) -> bool:
+    """Tell if the callback registered with `transaction.on_commit` is still to be run - callbacks are dropped on rollback."""
+    return callback is not None and any(registered[1] is callback for registered in transaction.get_connection(using).run_on_commit)
 
 
 def method_singledispatch(func: Callable) -> Callable:
@@ -554,6 +1399,7 @@ def method_singledispatch(func: Callable) -> Callable:
         return dispatcher.dispatch(args[1].__class__)(*args, **kw)
 
     wrapper.register = dispatcher.register
+    wrapper.dispatch = dispatcher.dispatch
     update_wrapper(wrapper, func)
     return wrapper
 
@@ -570,6 +1416,87 @@ def handle_none_values(func: Callable) -> Callable:
     return wrapper
 
 
+class PrefetchedRelatedObjects(threading.local):
+
+    """Objects referenced by foreign keys (or their declared representations) loaded at once, used by value mappers instead of
+    loading them one by one."""
+
+    def __init__(self):
+        super().__init__()
+        self.objects = {}  # type: Dict[Tuple[Type[Model], Any], Model]
+        self.representations = {}  # type: Dict[Tuple[Type[Model], Any], str]
+
+    @contextmanager
+    def prefetch(
+            self,
+            objects: Dict[Tuple[Type[Model], Any], Model],
+            representations: Optional[Dict[Tuple[Type[Model], Any], str]] = None,
+    ):
+        previous_objects, previous_representations = self.objects, self.representations
+        self.objects, self.representations = objects, representations or {}
+        try:
+            yield
+        finally:
+            self.objects, self.representations = previous_objects, previous_representations
+
+    def get(self, model: Type[Model], pk: Any) -> Optional[Model]:
+        return self.objects.get((model, pk))
+
+    def get_representation(self, model: Type[Model], pk: Any) -> Optional[str]:
+        return self.representations.get((model, pk))
+
+
+prefetched_related_objects = PrefetchedRelatedObjects()
+
+
+def get_numeric_delta_field(fields: List[models.Field]) -> models.Field:
+    """Get a field for differences between values of the fields - an integer field or a decimal field fitting all of them."""
+    decimal_fields = [field for field in fields if isinstance(field, models.DecimalField)]
+    if not decimal_fields:
+        return models.BigIntegerField(null=True, db_index=True)
+    decimal_places = max(field.decimal_places for field in decimal_fields)
+    integer_digits = max(
+        field.max_digits - field.decimal_places if isinstance(field, models.DecimalField)
+        else INTEGER_DIGITS_BY_INTERNAL_TYPE.get(field.get_internal_type(), INTEGER_DIGITS_BY_INTERNAL_TYPE['BigIntegerField'])
+        for field in fields
+    )
+    # the difference may have one integer digit more than the values
+    return models.DecimalField(max_digits=integer_digits + 1 + decimal_places, decimal_places=decimal_places, null=True, db_index=True)
+
+
+def get_numeric_delta(field: models.Field, old_value: Any, new_value: Any) -> Any:
+    old_value, new_value = field.to_python(old_value), field.to_python(new_value)
+    if old_value is None or new_value is None:
+        return None
+    return new_value - old_value
+
+
+def get_raw_value(value: Any) -> Any:
+    """Get a JSON serializable form of the field value, from which the value can be restored by `get_value_from_raw`."""
+    if value is None:
+        return None
+    if isinstance(value, (bytes, memoryview)):
+        return base64.b64encode(value).decode('utf-8')
+    if isinstance(value, FieldFile):
+        return value.name
+    if isinstance(value, (date, time)):  # datetime is a subclass of date
+        return value.isoformat()
+    if isinstance(value, timedelta):
+        return duration_string(value)
+    if isinstance(value, Decimal):
+        return str(value)
+    return value
+
+
+def get_value_from_raw(field: models.Field, raw_value: Any) -> Any:
+    if raw_value is None:
+        return None
+    value = field.to_python(raw_value)
+    if isinstance(field, models.FileField):
+        return field.attr_class(None, field, value)
+    return value
+
+
 class DefaultFieldValueMapper:
 
     @handle_none_values
@@ -577,11 +1504,37 @@ class DefaultFieldValueMapper:
     def __call__(self, field: models.Field, value: Any) -> ValueRepresentation:
         return value
 
+    def compile(self, field: models.Field) -> ValueMapper:
+        """Resolve the representation method for the field once and return a mapper of its values."""
+        dispatch = getattr(type(self).__call__, 'dispatch', None)
+        if dispatch is None:
+            return partial(self, field)
+        implementation = dispatch(field.__class__)
+
+        def mapper(value: Any) -> ValueRepresentation:
+            if value is None:
+                return JSON_NULL
+            return implementation(self, field, value)
+
+        return mapper
+
     @__call__.register(models.ForeignKey)
     def get_foreign_key_representation(self, field: models.ForeignKey, pk_value: Any) -> ModelInstanceRepresentation:
         # noinspection PyProtectedMember
         # pylint: disable=protected-access
-        related_object = field.related_model._default_manager.get(pk=pk_value)
+        representation = get_related_object_representation(field.related_model)
+        text = prefetched_related_objects.get_representation(field.related_model, pk_value)
+        if text is not None:
+            return self._get_declared_representation(field.related_model, pk_value, text)
+        if representation is not None:
+            try:
+                text = representation.get_representations(field.related_model, [pk_value])[pk_value]
+            except KeyError:
+                raise field.related_model.DoesNotExist()
+            return self._get_declared_representation(field.related_model, pk_value, text)
+        related_object = prefetched_related_objects.get(field.related_model, pk_value)
+        if related_object is None:
+            related_object = field.related_model._default_manager.get(pk=pk_value)
         return self._get_model_instance_representation(related_object)
 
     @__call__.register(models.ManyToManyField)
@@ -590,7 +1543,18 @@ class DefaultFieldValueMapper:
             self,
             field: models.ManyToManyField,   # pylint: disable=unused-argument
             instances: Iterable[models.Model]) -> Iterable[ModelInstanceRepresentation]:
-        return [self._get_model_instance_representation(instance) for instance in sorted(instances, key=lambda instance: instance.pk)]
+        instances = sorted(instances, key=lambda instance: instance.pk)
+        representation = get_related_object_representation(instances[0].__class__) if instances else None
+        if representation is not None:
+            # representations not selected together with the instances are loaded with a single query
+            texts = {instance.pk: representation.get_representation(instance) for instance in instances}
+            missing_pks = [pk for pk, text in texts.items() if text is None]
+            if missing_pks:
+                loaded = representation.get_representations(instances[0].__class__, missing_pks)
+                # objects deleted in the meantime are represented by their primary keys
+                texts.update((pk, loaded.get(pk, force_text(pk))) for pk in missing_pks)
+            return [self._get_declared_representation(instance.__class__, instance.pk, texts[instance.pk]) for instance in instances]
+        return [self._get_model_instance_representation(instance) for instance in instances]
 
     @__call__.register(models.DateField)
     @__call__.register(models.DateTimeField)
@@ -603,11 +1567,8 @@ class DefaultFieldValueMapper:
 
     @__call__.register(models.FileField)
     def get_file_representation(self, _: models.FileField, value: FieldFile) -> str:
-        try:
-            result = value.url
-        except ValueError:
-            result = ''
-        return result
+        # the stored name, not the URL - asking the storage for it is left for reading history (see `file_urls`)
+        return value.name or ''
 
     @__call__.register(models.BinaryField)
     def get_bytes_representation(self, _: models.BinaryField, value: bytes) -> str:
@@ -629,6 +1590,84 @@ class DefaultFieldValueMapper:
             'str': force_text(instance),
         }
 
+    def _get_declared_representation(self, model: Type[models.Model], pk: Any, text: str) -> ModelInstanceRepresentation:
+        # noinspection PyProtectedMember
+        pk_field = model._meta.pk  # pylint: disable=protected-access
+        return {
+            'pk': self(pk_field, pk),
+            'str': text,
+        }
+
+
+def handle_null_representations(func: Callable) -> Callable:
+    """Special decorator for wrapping method_singledispatch in DefaultFieldValueDecoder."""
+
+    def wrapper(self, field, value):
+        if value is None:
+            return None
+        return func(self, field, value)
+
+    update_wrapper(wrapper, func)
+    return wrapper
+
+
+class DefaultFieldValueDecoder:
+
+    """Inverse of DefaultFieldValueMapper - decodes stored representations back to python values.
+
+    Representations of related model instances and files are returned as they are stored.
+    """
+
+    @handle_null_representations
+    @method_singledispatch
+    def __call__(self, field: models.Field, value: ValueRepresentation) -> Any:
+        return value
+
+    def compile(self, field: models.Field) -> ValueDecoder:
+        """Resolve the decoding method for the field once and return a decoder of its representations."""
+        dispatch = getattr(type(self).__call__, 'dispatch', None)
+        if dispatch is None:
+            return partial(self, field)
+        implementation = dispatch(field.__class__)
+
+        def decoder(value: ValueRepresentation) -> Any:
+            if value is None:
+                return None
+            return implementation(self, field, value)
+
+        return decoder
+
+    @__call__.register(models.ForeignKey)
+    @__call__.register(models.ManyToManyField)
+    @__call__.register(ReverseForeignKeyRelation)
+    @__call__.register(models.FileField)
+    def get_stored_representation(self, _: models.Field, value: ValueRepresentation) -> ValueRepresentation:
+        return value
+
+    @__call__.register(models.DateField)
+    def get_date(self, _: models.DateField, value: str) -> date:
+        return parse_date(value)
+
+    @__call__.register(models.DateTimeField)
+    def get_datetime(self, _: models.DateTimeField, value: str) -> datetime:
+        return parse_datetime(value)
+
+    @__call__.register(models.DurationField)
+    def get_timedelta(self, _: models.DurationField, value: int) -> timedelta:
+        return timedelta(milliseconds=value)
+
+    @__call__.register(models.BinaryField)
+    def get_bytes(self, _: models.BinaryField, value: str) -> bytes:
+        return base64.b64decode(value)
+
+    @__call__.register(models.DecimalField)
+    def get_decimal(self, _: models.DecimalField, value: str) -> Decimal:
+        return Decimal(value)
+
+    @__call__.register(models.TimeField)
+    def get_time(self, _: models.TimeField, value: str) -> time:
+        return parse_time(value)
+
 
 def get_concrete_model_subclasses(model: Type[BaseModel]) -> Iterable[Type[BaseModel]]:
     # noinspection PyProtectedMember
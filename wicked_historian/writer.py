@@ -0,0 +1,174 @@
+import atexit
+import logging
+import queue
+import threading
+import time
+from collections import (
+    OrderedDict,
+    namedtuple,
+)
+from typing import (
+    TYPE_CHECKING,
+    List,
+    Optional,
+    Tuple,
+    Type,
+)
+
+from django.conf import settings
+from django.db import (
+    close_old_connections,
+    connections,
+    router,
+)
+
+if TYPE_CHECKING:
+    from .models import BaseEditHistory
+
+
+logger = logging.getLogger(__name__)
+
+HistoryWriterMetrics = namedtuple(
+    'HistoryWriterMetrics',
+    ['queue_depth', 'written_entries', 'dropped_entries', 'failed_batches', 'failed_entries', 'average_latency', 'max_latency'],
+)
+
+# history class, database, entry and time of submission
+QueueItem = Tuple[Type['BaseEditHistory'], str, 'BaseEditHistory', float]
+
+_STOP = object()
+
+
+class HistoryWriter:
+
+    """Writer of history entries in background threads.
+
+    Submitted entries are put into a bounded queue drained by `workers` threads, which write them with multi-row inserts of up to
+    `batch_size` entries. When the queue is full, submitting blocks for `block_timeout` seconds (forever with `None`) and then
+    the entry is dropped. Every worker uses its own database connections.
+    """
+
+    def __init__(self, workers: int = 2, max_queue_size: int = 10000, batch_size: int = 500, block_timeout: Optional[float] = None):
+        self.workers = workers
+        self.batch_size = batch_size
+        self.block_timeout = block_timeout
+        self.queue = queue.Queue(max_queue_size)  # type: queue.Queue
+        self._threads = []  # type: List[threading.Thread]
+        self._lock = threading.Lock()
+        self._written_entries = 0
+        self._dropped_entries = 0
+        self._failed_batches = 0
+        self._failed_entries = 0
+        self._total_latency = 0.0
+        self._max_latency = 0.0
+
+    def start(self):
+        with self._lock:
+            if self._threads:
+                return
+            for number in range(self.workers):
+                thread = threading.Thread(target=self._work, name='wicked-historian-writer-%d' % number, daemon=True)
+                thread.start()
+                self._threads.append(thread)
+            atexit.register(self.shutdown)
+
+    def submit(self, history_class: Type['BaseEditHistory'], entry: 'BaseEditHistory') -> bool:
+        """Put the entry into the queue, return False if it was dropped because the queue was full."""
+        self.start()
+        item = (history_class, router.db_for_write(history_class), entry, time.monotonic())
+        try:
+            if self.block_timeout == 0:
+                self.queue.put_nowait(item)
+            else:
+                self.queue.put(item, timeout=self.block_timeout)
+        except queue.Full:
+            with self._lock:
+                self._dropped_entries += 1
+            logger.warning('History writer queue is full, %s entry has been dropped', history_class._meta.label)
+            return False
+        return True
+
+    def flush(self):
+        """Wait until all submitted entries are written (or failed)."""
+        self.queue.join()
+
+    def shutdown(self, flush: bool = True):
+        """Stop workers, writing all submitted entries first with `flush`."""
+        with self._lock:
+            threads, self._threads = self._threads, []
+        if not threads:
+            return
+        if flush:
+            self.flush()
+        for _ in threads:
+            self.queue.put(_STOP)
+        for thread in threads:
+            thread.join()
+        atexit.unregister(self.shutdown)
+
+    def get_metrics(self) -> HistoryWriterMetrics:
+        with self._lock:
+            written_entries = self._written_entries
+            return HistoryWriterMetrics(
+                queue_depth=self.queue.qsize(),
+                written_entries=written_entries,
+                dropped_entries=self._dropped_entries,
+                failed_batches=self._failed_batches,
+                failed_entries=self._failed_entries,
+                average_latency=self._total_latency / written_entries if written_entries else 0.0,
+                max_latency=self._max_latency,
+            )
+
+    def _work(self):
+        try:
+            while True:
+                item = self.queue.get()
+                if item is _STOP:
+                    self.queue.task_done()
+                    return
+                batch = [item]
+                stop = False
+                while len(batch) < self.batch_size:
+                    try:
+                        item = self.queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if item is _STOP:
+                        stop = True
+                        break
+                    batch.append(item)
+                try:
+                    self.write(batch)
+                finally:
+                    for _ in range(len(batch) + stop):
+                        self.queue.task_done()
+                if stop:
+                    return
+        finally:
+            connections.close_all()
+
+    def write(self, batch: List[QueueItem]):
+        """Write entries of the batch with a single insert per history class and database."""
+        close_old_connections()
+        entries_by_class_and_database = OrderedDict()  # type: OrderedDict
+        for history_class, database, entry, submitted_at in batch:
+            entries_by_class_and_database.setdefault((history_class, database), []).append((entry, submitted_at))
+        for (history_class, database), entries in entries_by_class_and_database.items():
+            try:
+                history_class.objects.using(database).bulk_create([entry for entry, _ in entries])
+            except Exception:  # pylint: disable=broad-except
+                logger.exception('Writing a batch of %d %s entries has failed', len(entries), history_class._meta.label)
+                with self._lock:
+                    self._failed_batches += 1
+                    self._failed_entries += len(entries)
+                continue
+            written_at = time.monotonic()
+            with self._lock:
+                self._written_entries += len(entries)
+                for _, submitted_at in entries:
+                    latency = written_at - submitted_at
+                    self._total_latency += latency
+                    self._max_latency = max(self._max_latency, latency)
+
+
+history_writer = HistoryWriter(**getattr(settings, 'WICKED_HISTORIAN_WRITER', {}))